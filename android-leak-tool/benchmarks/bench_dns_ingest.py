@@ -0,0 +1,79 @@
+# bench_dns_ingest.py
+# Compares the columnar DNS export ingestion in parse_log_file against the old iterrows() path.
+# Usage: python benchmarks/bench_dns_ingest.py [rows]
+import os
+import re
+import sys
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from parsers.parse_log import parse_log_file
+
+
+def legacy_parse_dns(full_log_path):
+    """The row-by-row implementation parse_log_file used before the columnar rewrite."""
+    def is_valid_hostname(domain):
+        return re.match(r"^[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$", domain) is not None
+
+    df_excel = pd.read_csv(full_log_path)
+    parsed_logs = []
+    for _, row in df_excel.iterrows():
+        data = {
+            "timestamp": row.get("Timestamp", ""),
+            "domain": row.get("Query Domain", ""),
+            "record_type": row.get("Record Type", ""),
+            "record_class": row.get("Record Class", ""),
+            "server": row.get("Server", ""),
+            "service": row.get("Service", ""),
+            "client_ip": row.get("Client IP", ""),
+            "port": row.get("Port", ""),
+            "class_method": None,
+            "pid": None,
+            "ip": None
+        }
+        if not is_valid_hostname(str(data["domain"])):
+            data["domain"] = None
+        parsed_logs.append(data)
+    return pd.DataFrame(parsed_logs)
+
+
+def make_export(path, rows):
+    rng = np.random.default_rng(0)
+    domains = np.array(["api.example.com", "cdn.fbcdn.net", "bad_domain", "localhost", "x.googleapis.com"])
+    pd.DataFrame({
+        "Timestamp": pd.date_range("2024-01-01", periods=rows, freq="s").astype(str),
+        "Query Domain": domains[rng.integers(0, len(domains), rows)],
+        "Record Type": "A",
+        "Server": "8.8.8.8",
+        "Client IP": "192.168.1.20",
+        "Port": 53,
+    }).to_csv(path, index=False)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "dns_export.csv")
+        make_export(path, rows)
+
+        old_df, old_time = timed(legacy_parse_dns, path)
+        new_df, new_time = timed(parse_log_file, path)
+
+    same_columns = list(old_df.columns) == list(new_df.columns)
+    same_domains = old_df["domain"].isna().equals(new_df["domain"].isna())
+    print(f"rows:            {rows}")
+    print(f"iterrows path:   {old_time:.2f}s")
+    print(f"columnar path:   {new_time:.2f}s")
+    print(f"speedup:         {old_time / new_time:.1f}x")
+    print(f"same schema:     {same_columns}")
+    print(f"same domains:    {same_domains}")
@@ -0,0 +1,69 @@
+# bench_features.py
+# Times model_func.features.build_features (every feature derived from the log) against the old per-row time
+# features plus groupby nunique counts.
+# Usage: python benchmarks/bench_features.py [rows]
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from model_func.features import build_features, FEATURES
+
+
+def legacy_time_features(df):
+    """The block model_ai, retrain_model and flag_suspicious_ips each carried; the other features stayed 0."""
+    df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
+    df['hour'] = df['timestamp'].dt.hour
+    df['dayofweek'] = df['timestamp'].dt.dayofweek
+    df['is_weekend'] = (df['dayofweek'] >= 5).astype(int)
+    df['flag_odd_hour'] = df['hour'].apply(lambda h: h < 5 or h > 23 if pd.notnull(h) else 0)
+    return df
+
+
+def make_log(rows):
+    rng = np.random.default_rng(0)
+    domains = np.array([f"host{i}.example.{tld}" for i, tld in enumerate(["com", "net", "tk", "xyz", "io"] * 2000)])
+    ips = np.array([f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}" for i in range(50_000)])
+    return pd.DataFrame({
+        "timestamp": pd.date_range("2024-01-01", periods=rows, freq="s").astype(str),
+        "domain": domains[rng.integers(0, len(domains), rows)],
+        "ip": ips[rng.integers(0, len(ips), rows)],
+        "country": np.array(["IN", "US", "CN", "Unknown"])[rng.integers(0, 4, rows)],
+    })
+
+
+def legacy_counts(df):
+    """domain_count / ip_count per row the way a groupby over the log would give them."""
+    return (df.groupby("ip")["domain"].transform("nunique").to_numpy(),
+            df.groupby("domain")["ip"].transform("nunique").to_numpy())
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+
+    df = make_log(rows)
+    old_df, old_time = timed(legacy_time_features, df.copy())
+    (old_domain_count, old_ip_count), count_time = timed(legacy_counts, df)
+    new_df, new_time = timed(build_features, df, home_country="IN")
+
+    same_time = all(
+        old_df[c].fillna(-1).astype(int).equals(new_df[c].fillna(-1).astype(int))
+        for c in ["hour", "dayofweek", "is_weekend", "flag_odd_hour"]
+    )
+    print(f"rows:                  {rows}")
+    print(f"legacy (4 features):   {old_time:.2f}s")
+    print(f"groupby counts (2):    {count_time:.2f}s")
+    print(f"build_features (8):    {new_time:.2f}s")
+    print(f"speedup:               {(old_time + count_time) / new_time:.1f}x")
+    print(f"rows/s:                {rows / new_time:,.0f}")
+    print(f"same time features:    {same_time}")
+    print(f"same counts:           {(old_domain_count == new_df['domain_count']).all() and (old_ip_count == new_df['ip_count']).all()}")
+    print(f"features present:      {set(FEATURES).issubset(new_df.columns)}")
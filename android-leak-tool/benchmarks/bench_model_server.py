@@ -0,0 +1,80 @@
+# bench_model_server.py
+# Cold vs warm inference latency through model_server.predict_frame, against loading the artifacts on every call.
+# Usage: python benchmarks/bench_model_server.py [rows] [repeats]
+import os
+import sys
+import json
+import time
+import tempfile
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from model_func import model_server
+from model_func.features import FEATURES
+
+
+def make_frame(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(rng.integers(0, 24, size=(rows, len(FEATURES))), columns=FEATURES)
+    df["is_suspicious"] = (df["hour"] < 5).astype(int)
+    return df
+
+
+def write_artifacts(model_dir, train_df):
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(train_df[FEATURES])
+    model = RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=-1)
+    model.fit(X_scaled, train_df["is_suspicious"])
+    joblib.dump(model, os.path.join(model_dir, model_server.MODEL_FILE))
+    joblib.dump(scaler, os.path.join(model_dir, model_server.SCALER_FILE))
+    with open(os.path.join(model_dir, model_server.FEATURE_LIST_FILE), "w") as f:
+        json.dump(FEATURES, f)
+
+
+def legacy_predict(df, model_dir):
+    """What flag_suspicious_ips did on every click: load everything, then predict."""
+    model = joblib.load(os.path.join(model_dir, model_server.MODEL_FILE))
+    scaler = joblib.load(os.path.join(model_dir, model_server.SCALER_FILE))
+    with open(os.path.join(model_dir, model_server.FEATURE_LIST_FILE), "r") as f:
+        features = json.load(f)
+    X_scaled = scaler.transform(df[features].fillna(0))
+    df["predicted_suspicious"] = model.predict(X_scaled)
+    df["suspicion_probability"] = model.predict_proba(X_scaled)[:, 1]
+    return df
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        write_artifacts(model_dir, make_frame(20_000, seed=1))
+        df = make_frame(rows)
+
+        legacy = [timed(legacy_predict, df.copy(), model_dir) for _ in range(repeats)]
+        cold = timed(model_server.predict_frame, df.copy(), model_dir)
+        warm = [timed(model_server.predict_frame, df.copy(), model_dir) for _ in range(repeats)]
+
+        # rewriting the artifacts, as a retrain does, swaps the model in on the next call
+        time.sleep(0.01)
+        write_artifacts(model_dir, make_frame(20_000, seed=2))
+        swapped = timed(model_server.predict_frame, df.copy(), model_dir)
+
+    stats = model_server.latency_stats()
+    print(f"rows:                 {rows}")
+    print(f"load per call:        {np.mean(legacy):.3f}s")
+    print(f"cold predict_frame:   {cold:.3f}s")
+    print(f"warm predict_frame:   {np.mean(warm):.3f}s")
+    print(f"after retrain (swap): {swapped:.3f}s")
+    print(f"model loads:          {stats['loads']}")
+    print(f"speedup (warm):       {np.mean(legacy) / np.mean(warm):.1f}x")
@@ -0,0 +1,22 @@
+import os
+import argparse
+from model_func.enrich_func import MODELS_DIR
+from model_func.offline_ipdb import build_offline_db, OfflineIPDB, OFFLINE_DB_DIR
+
+parser = argparse.ArgumentParser(description="Build the offline geo/ASN range database used by enrichment.")
+parser.add_argument("--geo", help="geo range dump: start_ip/end_ip or network, country, optional lat/lon")
+parser.add_argument("--asn", help="ASN range dump: start_ip/end_ip or network, asn, asn_description")
+parser.add_argument("--sep", default=",", help="column separator, e.g. '\\t' for TSV dumps")
+parser.add_argument("--out", default=os.path.join(MODELS_DIR, OFFLINE_DB_DIR), help="database folder")
+cli = parser.parse_args()
+
+if not cli.geo and not cli.asn:
+    parser.error("give --geo and/or --asn")
+
+sep = cli.sep.encode().decode("unicode_escape")
+meta = build_offline_db(cli.out, geo_csv=cli.geo, asn_csv=cli.asn, sep=sep)
+db = OfflineIPDB(cli.out)
+for kind, info in meta.items():
+    rows = sum(len(db.tables[(kind, v)]["start"]) for v in info["versions"])
+    print(f"{kind}: {rows} ranges (IPv{', IPv'.join(map(str, info['versions']))})")
+print(f"✅ Offline IP database written to → {cli.out}")
@@ -7,6 +7,11 @@ from sklearn.metrics import classification_report
 import joblib
 import json
 from model_func.ensure_model_feature import ensure_model_features 
+from model_func.features import build_features
+from model_func.enrich_func import known_countries
+from model_func.training_store import append_case, migrate_csv, TRAINING_STORE_DIR
+from model_func.model_registry import load_model_params
+from model_func.model_server import predict_frame, active_artifact_dir, MODEL_FILE, SCALER_FILE, FEATURE_LIST_FILE
 
 # === User Input - Case Folder ===
 base_path = r"D:\Projects\android-leak-tool\my_android_logs\CASE_FILES_raw_logs"
@@ -22,20 +27,17 @@ print(f"✅ Using log file: {log_file}")
 # === Load the Log Data ===
 df = pd.read_csv(log_file)
 
-# === Timestamp-Based Features ===
+# === Feature Engineering (shared with retraining and the Streamlit app) ===
+# countries of IPs enriched in earlier cases feed flag_foreign_ip; it stays 0 until HOME_COUNTRY is set
+df = build_features(df, countries=known_countries())
 if 'timestamp' in df.columns:
-    df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
-    df['hour'] = df['timestamp'].dt.hour
-    df['dayofweek'] = df['timestamp'].dt.dayofweek
-    df['is_weekend'] = (df['dayofweek'] >= 5).astype(int)
-    df['flag_odd_hour'] = df['hour'].apply(lambda h: h < 5 or h > 23 if pd.notnull(h) else 0)
     print("⏱️ Timestamp-based features enabled.")
 else:
     print("⚠️ No 'timestamp' column found — skipping time-based features.")
 
-#load model features
+#load model features (of the active global model version)
 model_dir= r"D:\Projects\android-leak-tool\my_android_logs\models"
-feature_list_path = os.path.join(model_dir , "feature_list.json")
+feature_list_path = os.path.join(active_artifact_dir(model_dir), FEATURE_LIST_FILE)
 with open(feature_list_path ,"r") as f:
     features = json.load(f)
 
@@ -73,7 +75,7 @@ X_train, X_test, y_train, y_test = train_test_split(
 )
 
 # train rf
-model = RandomForestClassifier(n_estimators=100, random_state=42)
+model = RandomForestClassifier(**load_model_params(model_dir), random_state=42, n_jobs=-1)
 model.fit(X_train, y_train)
 
 # evaluate
@@ -81,23 +83,24 @@ y_pred = model.predict(X_test)
 print("📊 Classification Report:")
 print(classification_report(y_test, y_pred))
 
-# predict all logs
-df['predicted_suspicious'] = model.predict(X_scaled)
-df['suspicion_probability'] = model.predict_proba(X_scaled)[:, 1]
+# === Save Model, Scaler and Feature List to Case Folder ===
+model_path = os.path.join(case_folder, MODEL_FILE)
+scaler_path = os.path.join(case_folder, SCALER_FILE)
+joblib.dump(model, model_path)
+joblib.dump(scaler, scaler_path)
+with open(os.path.join(case_folder, FEATURE_LIST_FILE), "w") as f:
+    json.dump(features, f)
+print(f"📁 Model saved at → {model_path}")
+print(f"📁 Scaler saved at → {scaler_path}")
+
+# predict all logs through the same serving path the Streamlit app uses
+df = predict_frame(df, case_folder)
 
 # Export Flagged Entries to Case Folder 
 flagged_output = os.path.join(case_folder, "ml_flagged_suspicious.csv")
 df[df['predicted_suspicious'] == 1].to_csv(flagged_output, index=False)
 print(f"📁 Saved flagged logs → {flagged_output}")
 
-# === Save Model and Scaler to Case Folder ===
-model_path = os.path.join(case_folder, "suspicious_model.pkl")
-scaler_path = os.path.join(case_folder, "scaler.pkl")
-joblib.dump(model, model_path)
-joblib.dump(scaler, scaler_path)
-print(f"📁 Model saved at → {model_path}")
-print(f"📁 Scaler saved at → {scaler_path}")
-
 # === Rank IPs by Risk (and Timestamp if available) ===
 suspicious_df = df[df['predicted_suspicious'] == 1]
 agg_dict = {'suspicion_probability': 'max'}
@@ -122,8 +125,8 @@ print(f"📁 Ranked suspicious IPs saved → {ranked_ip_path}")
 print("🔝 Top 10 Most Suspicious IPs:")
 print(ip_risk_scores.head(10))
 
-# === Append to Global Training Data ===
-global_data_path = r"D:\Projects\android-leak-tool\my_android_logs\models\global_training_data.csv"
-case_training_data = df[features + ['is_suspicious']].copy()
-case_training_data.to_csv(global_data_path, mode='a', index=False, header=not os.path.exists(global_data_path))
-print(f"📁 Appended case training data to → {global_data_path}")
+# === Add to Global Training Store ===
+training_store = os.path.join(model_dir, TRAINING_STORE_DIR)
+migrate_csv(training_store, os.path.join(model_dir, "global_training_data.csv"))
+added = append_case(training_store, case_name, df, features=features)
+print(f"📁 Added {added} new training rows for case '{case_name}' → {training_store}")
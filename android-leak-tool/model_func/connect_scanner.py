@@ -0,0 +1,102 @@
+import socket
+import asyncio
+
+DEFAULT_MAX_SOCKETS = 256
+CONNECT_TIMEOUT = 1.5
+BANNER_TIMEOUT = 1.0
+BANNER_BYTES = 256
+
+# services that only talk after the client does
+HTTP_PORTS = {80, 8080, 8888}
+HTTP_PROBE = b"HEAD / HTTP/1.0\r\n\r\n"
+
+
+def parse_ports(ports):
+    """Port list from nmap-style "22,80,8000-8010" or any iterable of ints."""
+    if not isinstance(ports, str):
+        return sorted({int(p) for p in ports})
+    result = set()
+    for part in ports.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-", 1)
+            result.update(range(int(start), int(end) + 1))
+        else:
+            result.add(int(part))
+    return sorted(result)
+
+
+def service_name(port):
+    try:
+        return socket.getservbyport(port, "tcp")
+    except OSError:
+        return "unknown"
+
+
+async def _read_banner(reader, writer, port, timeout):
+    if port in HTTP_PORTS:
+        writer.write(HTTP_PROBE)
+        await writer.drain()
+    data = await asyncio.wait_for(reader.read(BANNER_BYTES), timeout)
+    # first line only, the way nmap shows a version string
+    line = data.decode("utf-8", errors="replace").strip().splitlines()
+    return line[0].strip() if line else ""
+
+
+async def _probe(ip, port, semaphore, timeout, grab_banner):
+    """Record for an open port, None when the connect is refused or times out."""
+    from model_func.nmap_scanner import make_record
+
+    async with semaphore:
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), timeout)
+        except (OSError, asyncio.TimeoutError):
+            return None
+
+        banner = ""
+        try:
+            if grab_banner:
+                banner = await _read_banner(reader, writer, port, BANNER_TIMEOUT)
+        except (OSError, asyncio.TimeoutError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+    return make_record(ip, port, service_name(port), banner)
+
+
+async def _scan_all(ip_list, ports, max_sockets, timeout, grab_banner, on_result):
+    # one cap for every socket in flight, however many hosts are being scanned
+    semaphore = asyncio.Semaphore(max_sockets)
+
+    async def scan_host(ip):
+        found = await asyncio.gather(*(_probe(ip, port, semaphore, timeout, grab_banner) for port in ports))
+        records = [r for r in found if r is not None]
+        if on_result:
+            on_result(ip, records)
+        return ip, records
+
+    return dict(await asyncio.gather(*(scan_host(ip) for ip in ip_list)))
+
+
+def connect_scan(ip_list, ports=None, max_sockets=DEFAULT_MAX_SOCKETS, timeout=CONNECT_TIMEOUT,
+                 grab_banner=True, on_result=None):
+    """
+    Full TCP connect scan without nmap: every (ip, port) pair is tried at once, with at most
+    `max_sockets` connections open and each connect bounded by `timeout` seconds.
+    Open ports are reported with the same record schema as nmap_scanner (service from the local
+    services table, banner from whatever the server sends first).
+    `on_result(ip, records)` is called as each host finishes. Returns {ip: [record, ...]}.
+    """
+    from model_func.nmap_scanner import PORT_THREAT_MAP
+
+    port_list = parse_ports(ports if ports is not None else PORT_THREAT_MAP)
+    ip_list = list(dict.fromkeys(ip_list))
+    if not ip_list:
+        return {}
+    return asyncio.run(_scan_all(ip_list, port_list, max_sockets, timeout, grab_banner, on_result))
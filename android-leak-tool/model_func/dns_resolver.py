@@ -0,0 +1,122 @@
+import os
+import time
+import socket
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from model_func.ttl_store import TTLStore
+
+DEFAULT_CONCURRENCY = 64
+DEFAULT_TIMEOUT = 3.0
+
+# the OS resolver does not expose record TTLs, so answers are kept for a fixed time
+DNS_CACHE_NAME = "dns_cache.sqlite"
+DNS_CACHE_TTL = 6 * 3600
+DNS_NEGATIVE_TTL = 10 * 60
+DNS_CACHE_MAX_ENTRIES = 200_000
+
+
+def open_dns_cache(cases_dir, ttl=DNS_CACHE_TTL, max_entries=DNS_CACHE_MAX_ENTRIES):
+    """Resolution cache shared by every case under CASE_FILES_raw_logs."""
+    return TTLStore(os.path.join(cases_dir, DNS_CACHE_NAME), table="dns", default_ttl=ttl, max_entries=max_entries)
+
+
+def system_lookup(domain):
+    """All A/AAAA answers for a domain from the OS resolver, IPv4 first."""
+    infos = socket.getaddrinfo(domain, None, proto=socket.IPPROTO_TCP)
+    v4, v6 = [], []
+    for family, _, _, _, sockaddr in infos:
+        addr = sockaddr[0]
+        bucket = v4 if family == socket.AF_INET else v6
+        if addr not in bucket:
+            bucket.append(addr)
+    return v4 + v6
+
+
+# getaddrinfo errors that are a real "no such name / no such record" answer; anything else is transient
+NEGATIVE_ERRORS = {code for code in (getattr(socket, "EAI_NONAME", None), getattr(socket, "EAI_NODATA", None)) if code}
+
+
+def _release_slot(slots):
+    def done(future):
+        slots.release()
+        # a lookup that fails after its timeout has nobody awaiting it, retrieve the error here
+        if not future.cancelled():
+            future.exception()
+    return done
+
+
+async def _resolve_all(domains, lookup, concurrency, timeout):
+    loop = asyncio.get_running_loop()
+    # one slot per executor thread, held until the lookup really returns, so a job is only submitted
+    # when a thread is free and its timeout never counts time spent queued behind hung lookups
+    slots = asyncio.Semaphore(concurrency)
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+
+    async def resolve_one(domain):
+        await slots.acquire()
+        future = loop.run_in_executor(executor, lookup, domain)
+        future.add_done_callback(_release_slot(slots))
+        try:
+            answers = await asyncio.wait_for(asyncio.shield(future), timeout)
+            return domain, list(answers or [])
+        except asyncio.TimeoutError:
+            return domain, None
+        except socket.gaierror as e:
+            return domain, [] if e.errno in NEGATIVE_ERRORS else None
+        except Exception:
+            return domain, None
+
+    try:
+        results = await asyncio.gather(*(resolve_one(d) for d in domains))
+    finally:
+        # lookups stuck past their timeout are abandoned, not waited on
+        executor.shutdown(wait=False, cancel_futures=True)
+    return dict(results)
+
+
+def resolve_domains(domains, lookup=system_lookup, concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT,
+                    cache=None):
+    """
+    Resolves each distinct domain once, at most `concurrency` lookups in flight, each bounded by `timeout` seconds.
+    `lookup(domain) -> [ip, ...]` can be swapped for a stub resolver in tests.
+    With a `cache` (see open_dns_cache) fresh answers are served from it and only misses hit the network.
+    Returns {domain: [ip, ...]}: an empty list when the name or record does not exist (NXDOMAIN/NODATA),
+    None when the lookup timed out or failed transiently.
+    """
+    unique = list(dict.fromkeys(d for d in domains if isinstance(d, str) and d))
+    if not unique:
+        return {}
+
+    results = {}
+    if cache is not None:
+        results = {d: entry["answers"] for d, entry in cache.get_many(unique).items()}
+
+    pending = [d for d in unique if d not in results]
+    if pending:
+        resolved = asyncio.run(_resolve_all(pending, lookup, concurrency, timeout))
+        results.update(resolved)
+
+        if cache is not None:
+            now = time.time()
+            answered = {d: {"answers": ips, "resolved_at": now} for d, ips in resolved.items() if ips}
+            missing = {d: {"answers": [], "resolved_at": now} for d, ips in resolved.items() if ips == []}
+            cache.put_many(answered)
+            # NXDOMAIN/NODATA is retried sooner; timeouts (None) are not cached at all
+            cache.put_many(missing, ttl=DNS_NEGATIVE_TTL)
+
+    return results
+
+
+def resolve_dataframe(df, domain_col="domain", **kwargs):
+    """
+    Fills `ip` (first answer) and `all_ips` (every A/AAAA answer, ';'-joined) for each row's domain.
+    Keyword arguments are passed to resolve_domains.
+    """
+    answers = resolve_domains(df[domain_col].dropna().unique(), **kwargs)
+
+    first_ip = {d: ips[0] for d, ips in answers.items() if ips}
+    joined = {d: ";".join(ips) for d, ips in answers.items() if ips}
+
+    df["ip"] = df[domain_col].map(first_ip)
+    df["all_ips"] = df[domain_col].map(joined)
+    return df
@@ -0,0 +1,114 @@
+import os
+import json
+import time
+import threading
+from datetime import datetime
+from model_func.ttl_store import TTLStore
+from model_func.network_index import NetworkIndex
+
+ENRICH_CACHE_NAME = "enrichment_cache.sqlite"
+ENRICH_TTL_DAYS = 365
+# cap on cached network ranges, least recently used ones are dropped first
+ENRICH_MAX_NETWORKS = 200_000
+# rows stored this long before the last load are read again, in case another process committed them late
+NETWORK_RELOAD_MARGIN = 60
+
+# network indexes built in this process, per cache file, topped up with new rows instead of rebuilt
+_network_indexes = {}
+_network_indexes_lock = threading.Lock()
+
+
+class EnrichmentCache:
+    """GeoIP and WHOIS records shared by all cases, one SQLite file with a table per provider."""
+
+    def __init__(self, models_dir, ttl_days=ENRICH_TTL_DAYS, max_networks=ENRICH_MAX_NETWORKS):
+        self.path = os.path.join(models_dir, ENRICH_CACHE_NAME)
+        self.ttl = ttl_days * 24 * 3600
+        self.geo = TTLStore(self.path, table="geo", default_ttl=self.ttl)
+        self.whois = TTLStore(self.path, table="whois", default_ttl=self.ttl)
+        # WHOIS records keyed by their network range, for CIDR-aware reuse
+        self.networks = TTLStore(self.path, table="networks", default_ttl=self.ttl, max_entries=max_networks)
+
+    def put_whois(self, records, reused=()):
+        """
+        Stores WHOIS records by IP and by the network range they describe.
+        IPs in `reused` were answered from a cached network and don't extend that network's TTL,
+        but do mark it as recently used so the size cap evicts it last.
+        """
+        self.whois.put_many(records)
+        by_network, used = {}, set()
+        for ip, rec in records.items():
+            key = _network_key(rec)
+            if not key:
+                continue
+            if ip in reused:
+                used.add(key)
+            else:
+                by_network[key] = rec
+        if used:
+            self.networks.get_many(used)
+        self.networks.put_many(by_network)
+
+    def network_index(self):
+        """
+        Index of every unexpired cached network; seeded from the per-IP records the first time.
+        The index is kept for the life of the process and only networks stored since the last call are
+        read; it is rebuilt once any network it holds has expired.
+        """
+        if len(self.networks) == 0:
+            seeded = {}
+            for rec in [rec for _, rec in self.whois.items()]:
+                key = _network_key(rec)
+                if key:
+                    seeded[key] = rec
+            self.networks.put_many(seeded)
+
+        now = time.time()
+        with _network_indexes_lock:
+            cached = _network_indexes.get(self.path)
+            if cached is None or cached["expires_at"] <= now:
+                cached = {"index": NetworkIndex(), "loaded_at": 0.0, "expires_at": float("inf")}
+                _network_indexes[self.path] = cached
+            for _, rec, expires_at in self.networks.entries_since(cached["loaded_at"] - NETWORK_RELOAD_MARGIN):
+                cached["index"].add_whois(rec)
+                cached["expires_at"] = min(cached["expires_at"], expires_at)
+            cached["loaded_at"] = now
+            return cached["index"]
+
+    def compact(self):
+        self.geo.compact()
+        self.whois.compact()
+        self.networks.compact()
+
+    def _remaining_ttl(self, record):
+        # keep the age the JSON caches tracked; records without a usable timestamp get a full TTL
+        try:
+            age = (datetime.now() - datetime.fromisoformat(record.get("timestamp", ""))).total_seconds()
+        except (TypeError, ValueError):
+            return self.ttl
+        return self.ttl - age
+
+    def migrate_json(self, store, json_path):
+        """
+        One-time import of a legacy geo/whois JSON cache into `store`.
+        The JSON file is renamed to *.migrated afterwards so it is not imported again.
+        """
+        if not os.path.exists(json_path):
+            return 0
+        try:
+            with open(json_path, "r") as f:
+                records = json.load(f)
+        except (OSError, ValueError):
+            records = {}
+
+        ttls = {ip: self._remaining_ttl(rec) for ip, rec in records.items()}
+        live = {ip: rec for ip, rec in records.items() if ttls[ip] > 0}
+        store.put_many(live, ttl=ttls)
+        os.replace(json_path, json_path + ".migrated")
+        return len(live)
+
+
+def _network_key(record):
+    if record.get("start_address") and record.get("end_address"):
+        return f"{record['start_address']}-{record['end_address']}"
+    return record.get("cidr") or None
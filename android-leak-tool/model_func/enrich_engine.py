@@ -0,0 +1,251 @@
+import time
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
+from ipwhois import IPWhois
+
+WHOIS_FIELDS = ["asn", "asn_description", "org_name", "cidr", "start_address", "end_address", "created", "updated"]
+
+# ip-api.com free tier: 45 single lookups/min, 15 batch requests/min of up to 100 IPs each
+IP_API_URL = "http://ip-api.com"
+IP_API_BATCH_SIZE = 100
+IP_API_BATCH_PER_MIN = 15
+RDAP_PER_SEC = 2.0
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`."""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def refund(self):
+        """Returns a token taken for a call that ended up not being made."""
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + 1)
+
+    def pause(self, seconds):
+        """Empties the bucket for `seconds`, e.g. when the provider says the quota is used up."""
+        with self._lock:
+            self._tokens = -seconds * self.rate
+            self._updated = time.monotonic()
+
+
+class RetryableError(Exception):
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def empty_geo():
+    return {"lat": None, "lon": None, "country": "Unknown"}
+
+
+def empty_whois():
+    return {k: None for k in WHOIS_FIELDS}
+
+
+def ipwhois_lookup(ip):
+    """RDAP lookup through ipwhois, the same fields enrich_func has always stored."""
+    res = IPWhois(ip).lookup_rdap()
+    return {
+        "asn": res.get("asn"),
+        "asn_description": res.get("asn_description"),
+        "org_name": res["network"].get("name"),
+        "cidr": res["network"].get("cidr"),
+        "start_address": res["network"].get("start_address"),
+        "end_address": res["network"].get("end_address"),
+        "created": str(res["network"].get("created")),
+        "updated": str(res["network"].get("updated"))
+    }
+
+
+def rdap_http_lookup(ip, base_url, timeout=10):
+    """Plain RDAP query against `{base_url}/ip/{ip}`, for RDAP mirrors or a local stand-in."""
+    r = requests.get(f"{base_url.rstrip('/')}/ip/{ip}", timeout=timeout)
+    if r.status_code == 429 or r.status_code >= 500:
+        raise RetryableError(f"RDAP HTTP {r.status_code}", r.headers.get("Retry-After"))
+    r.raise_for_status()
+    data = r.json()
+
+    cidrs = data.get("cidr0_cidrs") or []
+    cidr = ", ".join(f"{c.get('v4prefix') or c.get('v6prefix')}/{c.get('length')}" for c in cidrs) or None
+    events = {e.get("eventAction"): e.get("eventDate") for e in data.get("events", [])}
+    origin = data.get("arin_originas0_originautnums") or []
+    return {
+        "asn": str(origin[0]) if origin else None,
+        "asn_description": data.get("asn_description"),
+        "org_name": data.get("name"),
+        "cidr": cidr,
+        "start_address": data.get("startAddress"),
+        "end_address": data.get("endAddress"),
+        "created": str(events.get("registration")),
+        "updated": str(events.get("last changed"))
+    }
+
+
+class EnrichmentEngine:
+    """
+    Fetches GeoIP and WHOIS data for many IPs concurrently.
+    ip-api lookups go through its batch endpoint, RDAP lookups through a worker pool; each provider
+    has its own token bucket, and failed calls are retried with exponential backoff before falling
+    back to the empty record enrich_func has always used.
+    `geo_url` / `rdap_url` point the engine at a local HTTP stand-in for testing.
+    `rdap_calls` counts the RDAP requests actually sent, retries included.
+    """
+
+    def __init__(self, workers=8, geo_url=IP_API_URL, rdap_url=None,
+                 geo_batch_per_min=IP_API_BATCH_PER_MIN, rdap_per_sec=RDAP_PER_SEC,
+                 retries=3, backoff=1.0, timeout=10, whois_fetch=None):
+        self.workers = workers
+        self.geo_url = geo_url.rstrip("/")
+        self.rdap_url = rdap_url
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.geo_bucket = TokenBucket(geo_batch_per_min / 60.0, capacity=geo_batch_per_min)
+        self.rdap_bucket = TokenBucket(rdap_per_sec, capacity=max(int(rdap_per_sec), 1))
+        self._index_lock = threading.Lock()
+        self._calls_lock = threading.Lock()
+        self.rdap_calls = 0
+        if whois_fetch is not None:
+            self.whois_fetch = whois_fetch
+        elif rdap_url:
+            self.whois_fetch = lambda ip: rdap_http_lookup(ip, rdap_url, timeout)
+        else:
+            self.whois_fetch = ipwhois_lookup
+
+    def _with_retries(self, bucket, func, *args):
+        for attempt in range(self.retries + 1):
+            bucket.acquire()
+            try:
+                return func(*args)
+            except RetryableError as e:
+                if e.retry_after:
+                    bucket.pause(float(e.retry_after))
+                error = e
+            except Exception as e:
+                error = e
+            if attempt < self.retries:
+                time.sleep(self.backoff * (2 ** attempt) * (1 + random.random() * 0.25))
+        raise error
+
+    def _geo_batch_request(self, ips):
+        r = requests.post(
+            f"{self.geo_url}/batch",
+            json=[{"query": ip, "fields": "status,query,lat,lon,countryCode"} for ip in ips],
+            timeout=self.timeout,
+        )
+        if r.status_code == 429 or r.status_code >= 500:
+            raise RetryableError(f"ip-api HTTP {r.status_code}", r.headers.get("X-Ttl"))
+        r.raise_for_status()
+
+        # quota exhausted for this window, hold further batches until it resets
+        if r.headers.get("X-Rl") == "0" and r.headers.get("X-Ttl"):
+            self.geo_bucket.pause(float(r.headers["X-Ttl"]))
+
+        results = {}
+        for item in r.json():
+            results[item.get("query")] = {
+                "lat": item.get("lat"), "lon": item.get("lon"),
+                "country": item.get("countryCode", "Unknown")
+            }
+        return results
+
+    def _geo_batch(self, ips):
+        try:
+            found = self._with_retries(self.geo_bucket, self._geo_batch_request, ips)
+        except Exception as e:
+            logger.warning("GeoIP batch of %d IPs failed: %s", len(ips), e)
+            found = {}
+        return {ip: found.get(ip, empty_geo()) for ip in ips}
+
+    def _known_network(self, network_index, ip):
+        if network_index is None:
+            return None
+        with self._index_lock:
+            record = network_index.lookup(ip)
+        return {k: record.get(k) for k in WHOIS_FIELDS} if record is not None else None
+
+    def _whois_one(self, ip, network_index=None, reused=None):
+        def fetch(ip):
+            # checked again once the rate limiter lets this lookup through, earlier answers may cover it by now
+            known = self._known_network(network_index, ip)
+            if known is not None:
+                self.rdap_bucket.refund()
+                reused.add(ip)
+                return known
+            with self._calls_lock:
+                self.rdap_calls += 1
+            record = self.whois_fetch(ip)
+            if network_index is not None:
+                with self._index_lock:
+                    network_index.add_whois(record)
+            return record
+
+        known = self._known_network(network_index, ip)
+        if known is not None:
+            reused.add(ip)
+            return known
+        try:
+            return self._with_retries(self.rdap_bucket, fetch, ip)
+        except Exception as e:
+            logger.warning("WHOIS failed for %s: %s", ip, e)
+            return empty_whois()
+
+    def enrich(self, geo_ips, whois_ips, progress=None, network_index=None, reused=None):
+        """
+        Looks up GeoIP for `geo_ips` and WHOIS for `whois_ips`, both running at once.
+        `progress(done, total)` is called as lookups complete.
+        With a `network_index` (see EnrichmentCache.network_index) every RDAP answer is added to it as it
+        arrives and each remaining WHOIS lookup is answered from it when its IP falls in a known network;
+        those IPs are added to the `reused` set.
+        Returns (geo_map, whois_map) keyed by IP.
+        """
+        geo_ips = list(dict.fromkeys(geo_ips))
+        whois_ips = list(dict.fromkeys(whois_ips))
+        total = len(geo_ips) + len(whois_ips)
+        done = 0
+        geo_map, whois_map = {}, {}
+        reused = reused if reused is not None else set()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {}
+            for i in range(0, len(geo_ips), IP_API_BATCH_SIZE):
+                batch = geo_ips[i:i + IP_API_BATCH_SIZE]
+                futures[pool.submit(self._geo_batch, batch)] = ("geo", len(batch))
+            for ip in whois_ips:
+                futures[pool.submit(self._whois_one, ip, network_index, reused)] = ("whois", ip)
+
+            for future in as_completed(futures):
+                kind, key = futures[future]
+                if kind == "geo":
+                    geo_map.update(future.result())
+                    done += key
+                else:
+                    whois_map[key] = future.result()
+                    done += 1
+                if progress:
+                    progress(done, total)
+
+        return geo_map, whois_map
@@ -1,151 +1,215 @@
 import pandas as pd
 import os 
 import json
-import requests
-from ipwhois import IPWhois
-from datetime import datetime, timedelta 
-
-def enrich_suspicious_ips(ip_list, case_folder):
+from model_func.enrich_engine import EnrichmentEngine, WHOIS_FIELDS
+from model_func.enrich_cache import EnrichmentCache
+from model_func.offline_ipdb import OfflineIPDB, OFFLINE_DB_DIR
+
+# "online": ip-api + RDAP, "offline": local range database only,
+# "auto": online with the local database filling in failed lookups
+ENRICH_PROVIDERS = ["auto", "online", "offline"]
+
+MODELS_DIR = r"D:\Projects\android-leak-tool\my_android_logs\models"
+MASTER_REPORT_NAME = "master_suspicious_ip_report.csv"
+
+# fixed layout of the master report, so rows can be appended without rewriting the file
+MASTER_REPORT_COLUMNS = [
+    "ip", "country", "latitude", "longitude", "case_name", "timestamp",
+    "risk_level", "suspicion_probability", *WHOIS_FIELDS
+]
+
+def load_master_report(report_path):
+    """The master report is append-only; the last row written for an IP wins."""
+    if not os.path.exists(report_path):
+        return pd.DataFrame(columns=MASTER_REPORT_COLUMNS)
+    return pd.read_csv(report_path).drop_duplicates(subset="ip", keep="last").reset_index(drop=True)
+
+def known_countries(models_dir=None):
+    """{ip: country} for every IP enriched in any case so far, from the master report."""
+    report = load_master_report(os.path.join(models_dir or MODELS_DIR, MASTER_REPORT_NAME))
+    known = report[report["country"].notna() & ~report["country"].isin(["", "Unknown"])]
+    return dict(zip(known["ip"], known["country"]))
+
+def compact_master_report(report_path):
+    """Rewrites the master report with one row per IP."""
+    df = load_master_report(report_path).reindex(columns=MASTER_REPORT_COLUMNS)
+    tmp_path = report_path + ".tmp"
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, report_path)
+    _save_report_meta(report_path, {"compacted_rows": len(df), "appended_rows": 0})
+
+def _report_meta_path(report_path):
+    return os.path.join(os.path.dirname(report_path), "." + os.path.basename(report_path) + ".meta.json")
+
+def _load_report_meta(report_path):
+    try:
+        with open(_report_meta_path(report_path), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _save_report_meta(report_path, meta):
+    with open(_report_meta_path(report_path), "w") as f:
+        json.dump(meta, f)
+
+def upsert_master_report(report_path, rows_df):
+    """
+    Appends this run's rows to the master report instead of rewriting it.
+    The file is compacted once the appended rows outnumber the rows left by the last compaction,
+    which keeps the amortised cost proportional to the rows added.
+    """
+    rows_df = rows_df.reindex(columns=MASTER_REPORT_COLUMNS)
+    meta = _load_report_meta(report_path)
+
+    if os.path.exists(report_path):
+        header = list(pd.read_csv(report_path, nrows=0).columns)
+        if header != MASTER_REPORT_COLUMNS or meta is None:
+            # report from an older version, bring it to the fixed layout first
+            compact_master_report(report_path)
+            meta = _load_report_meta(report_path)
+        rows_df.to_csv(report_path, mode="a", index=False, header=False)
+        meta["appended_rows"] += len(rows_df)
+        _save_report_meta(report_path, meta)
+        if meta["appended_rows"] > max(meta["compacted_rows"], 1000):
+            compact_master_report(report_path)
+    else:
+        rows_df.to_csv(report_path, index=False)
+        _save_report_meta(report_path, {"compacted_rows": len(rows_df), "appended_rows": 0})
+
+def _safe_timestamps(series):
+    """ISO strings for parseable timestamps, None for blanks and garbage."""
+    parsed = pd.to_datetime(series, errors="coerce", format="mixed")
+    return pd.Series(
+        [ts.isoformat() if pd.notna(ts) else None for ts in parsed],
+        index=series.index, dtype=object
+    )
+
+def enrich_suspicious_ips(ip_list, case_folder, progress=None, engine=None, stats=None, provider="auto"):
     # Define all paths
-    models_dir = r"D:\Projects\android-leak-tool\my_android_logs\models"
+    models_dir = MODELS_DIR
     geo_path = os.path.join(case_folder, "geo_cache.json")
     whois_path = os.path.join(case_folder, "whois_cache.json")
     master_geo_path = os.path.join(models_dir, "master_suspicious_geo_cache.json")
     master_whois_path = os.path.join(models_dir, "master_suspicious_whois_cache.json")
-    report_path = os.path.join(models_dir, "master_suspicious_ip_report.csv")
+    report_path = os.path.join(models_dir, MASTER_REPORT_NAME)
     ranked_path = os.path.join(case_folder, "ranked_suspicious_ips.csv")
 
-    # Load all caches
-    def safe_load(path):
-        if not os.path.exists(path): return {}
-        try:
-            with open(path, "r") as f:
-                return json.load(f)
-        except:
-            return {}
-
-    geo_map = safe_load(geo_path)
-    whois_map = safe_load(whois_path)
-    master_geo_map = safe_load(master_geo_path)
-    master_whois_map = safe_load(master_whois_path)
-
-    def is_expired(ts, days=365):
-        try:
-            return datetime.now() - datetime.fromisoformat(ts) > timedelta(days=days)
-        except:
-            return True
-
-    def geoip_lookup(ip):
-        if ip in geo_map and not is_expired(geo_map[ip].get("timestamp", "")):
-            return geo_map[ip]
-        try:
-            r = requests.get(f"http://ip-api.com/json/{ip}", timeout=5).json()
-            result = {
-                "lat": r.get("lat"), "lon": r.get("lon"),
-                "country": r.get("countryCode", "Unknown")
-            }
-        except:
-            result = {"lat": None, "lon": None, "country": "Unknown"}
-        result["timestamp"] = datetime.now().isoformat()
-        return result
-
-    def whois_lookup(ip):
-        if ip in whois_map and not is_expired(whois_map[ip].get("timestamp", "")):
-            return whois_map[ip]
-        try:
-            obj = IPWhois(ip)
-            res = obj.lookup_rdap()
-            info = {
-                "asn": res.get("asn"),
-                "asn_description": res.get("asn_description"),
-                "org_name": res["network"].get("name"),
-                "cidr": res["network"].get("cidr"),
-                "start_address": res["network"].get("start_address"),
-                "end_address": res["network"].get("end_address"),
-                "created": str(res["network"].get("created")),
-                "updated": str(res["network"].get("updated"))
-            }
-        except:
-            info = {k: None for k in ["asn", "asn_description", "org_name", "cidr", "start_address", "end_address", "created", "updated"]}
-        info["timestamp"] = datetime.now().isoformat()
-        return info
-
-    # Load ranked IP metadata
+    # Shared SQLite cache, picking up any JSON caches left from older versions
+    cache = EnrichmentCache(models_dir)
+    migrated = 0
+    for path in [master_geo_path, geo_path]:
+        migrated += cache.migrate_json(cache.geo, path)
+    for path in [master_whois_path, whois_path]:
+        migrated += cache.migrate_json(cache.whois, path)
+    if migrated:
+        cache.compact()
+
+    # Load ranked IP metadata, one row per IP like the first match of the old lookup
     if not os.path.exists(ranked_path):
         raise FileNotFoundError(f"Missing ranked suspicious file at {ranked_path}")
     ranked_df = pd.read_csv(ranked_path)
-    ranked_df = ranked_df[ranked_df['ip'].isin(ip_list)]
-
-    existing = set(master_geo_map.keys())
-    new_ips = [ip for ip in ip_list if ip not in existing]
-
-    rows = []
-    for ip in ip_list:
-        if ip in new_ips:
-            geo = geoip_lookup(ip)
-            whois = whois_lookup(ip)
-
-            matched = ranked_df[ranked_df['ip'] == ip]
-            if matched.empty:
-                continue
-
-            meta = matched.iloc[0].to_dict()
-            original_timestamp = meta.get("timestamp")
-
-            if pd.isna(original_timestamp) or str(original_timestamp).strip().lower() in ("", "nat", "nan"):
-                safe_timestamp = None
-            else:
-                try:
-                    parsed_ts = pd.to_datetime(original_timestamp, errors="coerce")
-                    safe_timestamp = parsed_ts.isoformat() if pd.notna(parsed_ts) else None
-                except:
-                    safe_timestamp = None
-
-            geo["timestamp"] = safe_timestamp
-            whois["timestamp"] = safe_timestamp
-
-            geo_map[ip] = geo
-            whois_map[ip] = whois
-            master_geo_map[ip] = geo
-            master_whois_map[ip] = whois
-        else:
-            geo = geo_map.get(ip, {})
-            whois = whois_map.get(ip, {})
-
-        # This must run for all IPs
-        matched = ranked_df[ranked_df['ip'] == ip]
-        if matched.empty:
-            continue
-
-        meta = matched.iloc[0].to_dict()
-
-        rows.append({
-            "ip": ip,
-            "country": geo.get("country"),
-            "latitude": geo.get("lat"),
-            "longitude": geo.get("lon"),
-            "case_name": os.path.basename(case_folder),
-            "timestamp": meta.get("timestamp"),
-            "risk_level": meta.get("risk_level"),
-            "suspicion_probability": meta.get("suspicion_probability"),
-            **whois
+    for col in ["timestamp", "risk_level", "suspicion_probability"]:
+        if col not in ranked_df.columns:
+            ranked_df[col] = None
+    ranked_df = ranked_df[ranked_df['ip'].isin(ip_list)].drop_duplicates(subset="ip", keep="first")
+
+    geo_map = cache.geo.get_many(ip_list)
+    whois_map = cache.whois.get_many(ip_list)
+    new_ips = [ip for ip in ip_list if ip not in geo_map]
+
+    # IPs inside an already known network reuse its WHOIS record instead of another RDAP call
+    whois_missing = [ip for ip in new_ips if ip not in whois_map]
+    network_hits = {}
+    index = None
+    if whois_missing:
+        index = cache.network_index()
+        for ip in whois_missing:
+            record = index.lookup(ip)
+            if record is not None:
+                network_hits[ip] = {k: record.get(k) for k in WHOIS_FIELDS}
+
+    if provider not in ENRICH_PROVIDERS:
+        raise ValueError(f"Unknown enrichment provider '{provider}'.")
+    offline_db = OfflineIPDB.open(os.path.join(models_dir, OFFLINE_DB_DIR)) if provider != "online" else None
+    if provider == "offline" and offline_db is None:
+        raise FileNotFoundError(f"Offline IP database not found in {os.path.join(models_dir, OFFLINE_DB_DIR)}")
+
+    # Fetch everything the cache can't answer in one pass
+    whois_to_fetch = [ip for ip in whois_missing if ip not in network_hits]
+    # answers from the offline database, per provider since either lookup can fall back on its own
+    offline_geo, offline_whois = set(), set()
+    rdap_calls = 0
+    if provider == "offline":
+        fetched_geo, fetched_whois = offline_db.enrich(new_ips, whois_to_fetch)
+        offline_geo, offline_whois = set(new_ips), set(whois_to_fetch)
+    else:
+        engine = engine or EnrichmentEngine()
+        # networks answered during this run are reused by the lookups still queued
+        reused_in_run = set()
+        calls_before = engine.rdap_calls
+        fetched_geo, fetched_whois = engine.enrich(new_ips, whois_to_fetch, progress=progress,
+                                                   network_index=index, reused=reused_in_run)
+        network_hits.update({ip: fetched_whois[ip] for ip in reused_in_run})
+        rdap_calls = engine.rdap_calls - calls_before
+
+        if offline_db is not None:
+            # online lookups that came back empty fall back to the local database
+            geo_failed = [ip for ip, g in fetched_geo.items() if g.get("country") in (None, "Unknown")]
+            whois_failed = [ip for ip, w in fetched_whois.items() if not any(w.values())]
+            fallback_geo, fallback_whois = offline_db.enrich(geo_failed, whois_failed)
+            fetched_geo.update(fallback_geo)
+            fetched_whois.update(fallback_whois)
+            offline_geo, offline_whois = set(geo_failed), set(whois_failed)
+    fetched_whois.update(network_hits)
+
+    if stats is not None:
+        stats.update({
+            "ips": len(ip_list),
+            "new_ips": len(new_ips),
+            "whois_needed": len(whois_missing),
+            "whois_network_hits": len(network_hits),
+            "whois_rdap_calls": rdap_calls,
+            "network_hit_rate": len(network_hits) / len(whois_missing) if whois_missing else 0.0,
+            "offline_answers": len(offline_geo | offline_whois),
         })
 
-    if rows:
+    # New records carry the first-seen time from the ranked file
+    new_meta = ranked_df[ranked_df['ip'].isin(set(new_ips))]
+    safe_ts = dict(zip(new_meta['ip'], _safe_timestamps(new_meta['timestamp'])))
+    new_geo = {ip: {**fetched_geo.get(ip, geo_map.get(ip, {})), "timestamp": ts} for ip, ts in safe_ts.items()}
+    new_whois = {ip: {**fetched_whois.get(ip, whois_map.get(ip, {})), "timestamp": ts} for ip, ts in safe_ts.items()}
+    geo_map.update(new_geo)
+    whois_map.update(new_whois)
+
+    # Assemble rows with one merge instead of a per-IP lookup, in ip_list order
+    base = pd.DataFrame({"ip": list(dict.fromkeys(ip_list))}).merge(
+        ranked_df[["ip", "timestamp", "risk_level", "suspicion_probability"]], on="ip", how="inner"
+    )
+    geo_df = pd.DataFrame(
+        [{"ip": ip, "country": g.get("country"), "latitude": g.get("lat"), "longitude": g.get("lon")}
+         for ip, g in geo_map.items()],
+        columns=["ip", "country", "latitude", "longitude"]
+    )
+    whois_df = pd.DataFrame(
+        [{"ip": ip, "whois_timestamp": w.get("timestamp"), "has_whois": bool(w), **{k: w.get(k) for k in WHOIS_FIELDS}}
+         for ip, w in whois_map.items()],
+        columns=["ip", "whois_timestamp", "has_whois", *WHOIS_FIELDS]
+    )
+    rows_df = base.merge(geo_df, on="ip", how="left").merge(whois_df, on="ip", how="left")
+    rows_df["case_name"] = os.path.basename(case_folder)
+    # a cached WHOIS record's timestamp replaces the ranked one, as the old dict merge did
+    has_whois = rows_df["has_whois"].fillna(False).astype(bool)
+    rows_df["timestamp"] = rows_df["whois_timestamp"].where(has_whois, rows_df["timestamp"])
+    rows_df = rows_df[MASTER_REPORT_COLUMNS]
+
+    if not rows_df.empty:
         enriched_path = os.path.join(case_folder, "suspicious_ip_geo_whois.csv")
-        pd.DataFrame(rows).to_csv(enriched_path, index=False)
-
-        if os.path.exists(report_path):
-            existing_df = pd.read_csv(report_path)
-            combined = pd.concat([existing_df, pd.DataFrame(rows)], ignore_index=True)
-            combined.drop_duplicates(subset="ip", keep="last").to_csv(report_path, index=False)
-        else:
-            pd.DataFrame(rows).to_csv(report_path, index=False)
-
-    # Save updated caches
-    with open(geo_path, "w") as f: json.dump(geo_map, f)
-    with open(whois_path, "w") as f: json.dump(whois_map, f)
-    with open(master_geo_path, "w") as f: json.dump(master_geo_map, f)
-    with open(master_whois_path, "w") as f: json.dump(master_whois_map, f)
+        rows_df.to_csv(enriched_path, index=False)
+        # every IP of this run, so case, risk and probability follow the latest case that saw it
+        upsert_master_report(report_path, rows_df)
+
+    # Store only this run's online lookups, the offline database is already local
+    cache.geo.put_many({ip: g for ip, g in new_geo.items() if ip not in offline_geo})
+    cache.put_whois({ip: w for ip, w in new_whois.items() if ip not in offline_whois}, reused=set(network_hits))
 
     return len(new_ips)
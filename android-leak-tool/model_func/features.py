@@ -0,0 +1,113 @@
+import os
+import logging
+import numpy as np
+import pandas as pd
+
+# every feature the suspicious-IP model is trained and served on, in model column order
+FEATURES = [
+    'flag_uncommon_tld', 'domain_count', 'ip_count',
+    'flag_foreign_ip', 'abuse_score', 'hour',
+    'dayofweek', 'is_weekend', 'flag_odd_hour'
+]
+
+COMMON_TLDS = {
+    "com", "net", "org", "edu", "gov", "mil", "int", "io", "co", "app", "dev", "info", "biz",
+    "in", "us", "uk", "de", "fr", "jp", "cn", "ru", "br", "au", "ca", "it", "es", "nl", "kr",
+    "se", "ch", "be", "at", "pl", "eu", "me", "tv", "ai", "cloud",
+}
+
+# country code (as enrichment stores it) the device is expected to talk to; anything else is foreign
+HOME_COUNTRY = os.environ.get("HOME_COUNTRY", "")
+
+logger = logging.getLogger(__name__)
+
+
+def _uncommon_tld(domains):
+    """1 where the domain's TLD is not in COMMON_TLDS; evaluated once per distinct domain."""
+    codes, uniques = pd.factorize(domains)
+    if len(uniques) == 0:
+        return np.zeros(len(codes), dtype=np.int64)
+    tlds = pd.Series(uniques, dtype=str).str.rsplit(".", n=1).str[-1].str.lower()
+    per_domain = (~tlds.isin(COMMON_TLDS)).to_numpy(dtype=np.int64)
+    return np.where(codes >= 0, per_domain[np.clip(codes, 0, None)], 0)
+
+
+def _pair_counts(ips, domains):
+    """Per row, distinct domains seen with its IP and distinct IPs seen with its domain, across the frame."""
+    ip_codes, ip_uniques = pd.factorize(ips)
+    domain_codes, domain_uniques = pd.factorize(domains)
+    both = (ip_codes >= 0) & (domain_codes >= 0)
+    width = max(len(domain_uniques), 1)
+    # each (ip, domain) pair once (hash-based, much cheaper than sorting), then count pairs per side
+    pairs = pd.unique(ip_codes[both].astype(np.int64) * width + domain_codes[both])
+    per_ip = np.bincount(pairs // width, minlength=len(ip_uniques))
+    per_domain = np.bincount(pairs % width, minlength=len(domain_uniques))
+    domain_count = np.where(ip_codes >= 0, per_ip[np.clip(ip_codes, 0, None)], 0)
+    ip_count = np.where(domain_codes >= 0, per_domain[np.clip(domain_codes, 0, None)], 0)
+    return domain_count, ip_count
+
+
+def build_features(df, home_country=None, countries=None):
+    """
+    Computes the FEATURES columns that derive from raw log columns on `df` in place and returns it:
+      hour, dayofweek, is_weekend, flag_odd_hour (before 05:00)   from `timestamp`
+      flag_uncommon_tld                                             from `domain`
+      domain_count (distinct domains per IP), ip_count (distinct IPs per domain)   from `ip` and `domain`
+      flag_foreign_ip     from `country`, or from `countries` ({ip: country}, e.g. enrich_func.known_countries)
+                          when the log has no country column, against `home_country` (HOME_COUNTRY by default)
+    abuse_score has no local source (it is a reputation-feed score, 0-100 as trained) and is passed through.
+    A feature whose source column is missing keeps any value already in `df` (e.g. stored training
+    rows) and is 0 otherwise. Without a home country flag_foreign_ip is 0 and a warning is logged.
+    """
+    n = len(df)
+    home_country = home_country if home_country is not None else HOME_COUNTRY
+
+    def keep_or_zero(name):
+        if name in df.columns:
+            return pd.to_numeric(df[name], errors="coerce").fillna(0).to_numpy()
+        return np.zeros(n, dtype=np.int64)
+
+    if "timestamp" in df.columns:
+        ts = df["timestamp"]
+        if not pd.api.types.is_datetime64_any_dtype(ts):
+            ts = pd.to_datetime(ts, errors="coerce")
+            df["timestamp"] = ts
+        hour = ts.dt.hour.to_numpy(dtype=np.float64, na_value=np.nan)
+        dayofweek = ts.dt.dayofweek.to_numpy(dtype=np.float64, na_value=np.nan)
+        df["hour"] = hour
+        df["dayofweek"] = dayofweek
+        df["is_weekend"] = (dayofweek >= 5).astype(np.int64)
+        df["flag_odd_hour"] = (hour < 5).astype(np.int64)
+    else:
+        for name in ["hour", "dayofweek", "is_weekend", "flag_odd_hour"]:
+            df[name] = keep_or_zero(name)
+
+    if "domain" in df.columns:
+        df["flag_uncommon_tld"] = _uncommon_tld(df["domain"])
+    else:
+        df["flag_uncommon_tld"] = keep_or_zero("flag_uncommon_tld")
+
+    if "country" in df.columns:
+        country = df["country"]
+    elif countries and "ip" in df.columns:
+        country = df["ip"].map(countries)
+    else:
+        country = None
+    if country is not None and not home_country:
+        logger.warning("HOME_COUNTRY is not set, flag_foreign_ip is 0 for every row; set it to the country code "
+                       "the device is expected to talk to (e.g. HOME_COUNTRY=IN).")
+        df["flag_foreign_ip"] = np.zeros(n, dtype=np.int64)
+    elif country is not None:
+        known = country.notna() & ~country.isin(["", "Unknown"])
+        df["flag_foreign_ip"] = (known & (country != home_country)).to_numpy(dtype=np.int64)
+    else:
+        df["flag_foreign_ip"] = keep_or_zero("flag_foreign_ip")
+
+    if "ip" in df.columns and "domain" in df.columns:
+        df["domain_count"], df["ip_count"] = _pair_counts(df["ip"], df["domain"])
+    else:
+        for name in ["domain_count", "ip_count"]:
+            df[name] = keep_or_zero(name)
+
+    df["abuse_score"] = keep_or_zero("abuse_score")
+    return df
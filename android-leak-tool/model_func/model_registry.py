@@ -0,0 +1,113 @@
+import os
+import re
+import json
+from datetime import datetime
+import joblib
+from model_func.model_server import MODEL_FILE, SCALER_FILE, FEATURE_LIST_FILE, VERSIONS_DIR, ACTIVE_VERSION_NAME
+
+# every trained model is kept under <models>/versions/<version>; ACTIVE_VERSION_NAME names the one being served
+META_NAME = "meta.json"
+
+# written by select_model.py, read by every script that trains the classifier
+MODEL_CONFIG_NAME = "best_model_config.json"
+DEFAULT_MODEL_PARAMS = {"n_estimators": 100}
+
+VERSION_PATTERN = re.compile(r"^v(\d+)-")
+
+
+def load_model_params(model_dir):
+    """RandomForestClassifier parameters chosen by the last model selection run, or the old defaults."""
+    path = os.path.join(model_dir, MODEL_CONFIG_NAME)
+    if not os.path.exists(path):
+        return dict(DEFAULT_MODEL_PARAMS)
+    with open(path, "r") as f:
+        return json.load(f)["params"]
+
+
+def save_model_config(model_dir, params, results):
+    record = {"model": "RandomForestClassifier", "params": params, "selected_at": datetime.now().isoformat(), **results}
+    path = os.path.join(model_dir, MODEL_CONFIG_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(record, f, indent=4)
+    os.replace(tmp_path, path)
+    return path
+
+
+def list_versions(model_dir):
+    """Metadata of every saved version, oldest first."""
+    root = os.path.join(model_dir, VERSIONS_DIR)
+    if not os.path.isdir(root):
+        return []
+    versions = []
+    for name in sorted(os.listdir(root)):
+        meta_path = os.path.join(root, name, META_NAME)
+        if os.path.exists(meta_path):
+            with open(meta_path, "r") as f:
+                versions.append(json.load(f))
+    return versions
+
+
+def save_version(model_dir, model, scaler, features, mode, meta=None):
+    """
+    Stores a trained model as a new version tagged with `mode` ("full" or "incremental").
+    `meta` holds anything worth keeping with it (store revision, metrics, timings). Returns the version id.
+    Numbers follow the highest version folder on disk, including ones a crashed run left without metadata,
+    so an existing folder is never reused.
+    """
+    root = os.path.join(model_dir, VERSIONS_DIR)
+    os.makedirs(root, exist_ok=True)
+    taken = [int(m.group(1)) for m in map(VERSION_PATTERN.match, os.listdir(root)) if m]
+    number = max(taken, default=0) + 1
+    while True:
+        version = f"v{number:04d}-{mode}"
+        version_dir = os.path.join(root, version)
+        try:
+            os.makedirs(version_dir)
+            break
+        except FileExistsError:
+            # another run claimed this number first
+            number += 1
+
+    joblib.dump(model, os.path.join(version_dir, MODEL_FILE))
+    joblib.dump(scaler, os.path.join(version_dir, SCALER_FILE))
+    with open(os.path.join(version_dir, FEATURE_LIST_FILE), "w") as f:
+        json.dump(list(features), f)
+
+    record = {"version": version, "mode": mode, "created_at": datetime.now().isoformat(), **(meta or {})}
+    with open(os.path.join(version_dir, META_NAME), "w") as f:
+        json.dump(record, f, indent=4)
+    return version
+
+
+def activate_version(model_dir, version):
+    """
+    Makes `version` the one model_server and the app load, by atomically replacing the active-version file
+    that points at its folder. model_server picks the new version up on its next call.
+    """
+    version_dir = os.path.join(model_dir, VERSIONS_DIR, version)
+    with open(os.path.join(version_dir, META_NAME), "r") as f:
+        record = json.load(f)
+    path = os.path.join(model_dir, ACTIVE_VERSION_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(record, f, indent=4)
+    os.replace(tmp_path, path)
+    return record
+
+
+def active_version(model_dir):
+    """Metadata of the active version, None for a model trained before versioning."""
+    path = os.path.join(model_dir, ACTIVE_VERSION_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def load_version(model_dir, version):
+    """(model, scaler, features) of a saved version."""
+    version_dir = os.path.join(model_dir, VERSIONS_DIR, version)
+    with open(os.path.join(version_dir, FEATURE_LIST_FILE), "r") as f:
+        features = json.load(f)
+    return joblib.load(os.path.join(version_dir, MODEL_FILE)), joblib.load(os.path.join(version_dir, SCALER_FILE)), features
@@ -0,0 +1,136 @@
+import os
+import json
+import time
+import threading
+import joblib
+import pandas as pd
+
+DEFAULT_MODEL_DIR = r"D:\Projects\android-leak-tool\my_android_logs\models"
+MODEL_FILE = "suspicious_model.pkl"
+SCALER_FILE = "scaler.pkl"
+FEATURE_LIST_FILE = "feature_list.json"
+
+# model_registry keeps every version under <models>/versions/<version> and names the active one in this file
+VERSIONS_DIR = "versions"
+ACTIVE_VERSION_NAME = "model_version.json"
+
+# one loaded model per model folder for the whole process, shared by every Streamlit session
+_lock = threading.Lock()
+_bundles = {}
+_stats = {"loads": 0, "last_load_seconds": None, "cold_predicts": [], "warm_predicts": []}
+
+
+class ModelBundle:
+    """Model, scaler and feature list loaded from one artifact folder, tagged with the artifacts' version."""
+
+    def __init__(self, model_dir, version):
+        started = time.perf_counter()
+        self.model_dir = model_dir
+        self.version = version
+        self.model = joblib.load(os.path.join(model_dir, MODEL_FILE))
+        self.scaler = joblib.load(os.path.join(model_dir, SCALER_FILE))
+
+        feature_list_path = os.path.join(model_dir, FEATURE_LIST_FILE)
+        if os.path.exists(feature_list_path):
+            with open(feature_list_path, "r") as f:
+                self.features = json.load(f)
+        elif hasattr(self.scaler, "feature_names_in_"):
+            self.features = list(self.scaler.feature_names_in_)
+        else:
+            raise FileNotFoundError(f"{FEATURE_LIST_FILE} not found in {model_dir}")
+        self.load_seconds = time.perf_counter() - started
+        self.warm = False
+
+
+def active_artifact_dir(model_dir):
+    """
+    Folder to load `model_dir`'s model from: the version named in its active-version file, or `model_dir`
+    itself for a model trained before versioning. Activating a version only replaces that one file, so the
+    model, scaler and feature list always come from the same version.
+    """
+    pointer_path = os.path.join(model_dir, ACTIVE_VERSION_NAME)
+    if not os.path.exists(pointer_path):
+        return model_dir
+    with open(pointer_path, "r") as f:
+        version = json.load(f)["version"]
+    return os.path.join(model_dir, VERSIONS_DIR, version)
+
+
+def artifact_version(artifact_dir):
+    """Changes whenever the active version or any artifact in it is rewritten, e.g. by retrain_model.py."""
+    parts = [artifact_dir]
+    for name in [MODEL_FILE, SCALER_FILE, FEATURE_LIST_FILE]:
+        path = os.path.join(artifact_dir, name)
+        if os.path.exists(path):
+            st = os.stat(path)
+            parts.append(f"{name}:{st.st_mtime_ns}:{st.st_size}")
+    return "|".join(parts)
+
+
+def get_model(model_dir=DEFAULT_MODEL_DIR):
+    """The loaded bundle for `model_dir`, reloaded only when the active version or its artifacts change."""
+    artifact_dir = active_artifact_dir(model_dir)
+    version = artifact_version(artifact_dir)
+    bundle = _bundles.get(model_dir)
+    if bundle is not None and bundle.version == version:
+        return bundle
+
+    with _lock:
+        # another session may have reloaded it while we waited
+        bundle = _bundles.get(model_dir)
+        if bundle is None or bundle.version != version:
+            bundle = ModelBundle(artifact_dir, version)
+            _bundles[model_dir] = bundle
+            _stats["loads"] += 1
+            _stats["last_load_seconds"] = bundle.load_seconds
+    return bundle
+
+
+def predict_frame(df, model_dir=DEFAULT_MODEL_DIR, bundle=None):
+    """
+    Adds `predicted_suspicious` and `suspicion_probability` to `df` using the model in `model_dir`.
+    Pass the `bundle` from get_model to predict with exactly the model whose features the caller uses,
+    even if the model is retrained in between.
+    Features the model expects but `df` lacks are added as 0, as ensure_model_features does.
+    """
+    started = time.perf_counter()
+    bundle = bundle or get_model(model_dir)
+
+    for feat in bundle.features:
+        if feat not in df.columns:
+            df[feat] = 0
+    X = df[bundle.features].fillna(0)
+    if len(X):
+        X_scaled = bundle.scaler.transform(X)
+        probabilities = bundle.model.predict_proba(X_scaled)
+        positive = list(bundle.model.classes_).index(1) if 1 in bundle.model.classes_ else None
+        df["suspicion_probability"] = probabilities[:, positive] if positive is not None else 0.0
+        df["predicted_suspicious"] = bundle.model.classes_[probabilities.argmax(axis=1)]
+    else:
+        df["suspicion_probability"] = pd.Series(dtype=float)
+        df["predicted_suspicious"] = pd.Series(dtype=int)
+
+    elapsed = time.perf_counter() - started
+    # the first prediction after a (re)load pays for loading, later ones are warm
+    _stats["warm_predicts" if bundle.warm else "cold_predicts"].append(elapsed)
+    bundle.warm = True
+    return df
+
+
+def latency_stats():
+    """Load count and cold/warm predict_frame latencies (seconds) for this process."""
+    def mean(values):
+        return sum(values) / len(values) if values else None
+
+    return {
+        "loads": _stats["loads"],
+        "last_load_seconds": _stats["last_load_seconds"],
+        "cold_predict_seconds": mean(_stats["cold_predicts"]),
+        "warm_predict_seconds": mean(_stats["warm_predicts"]),
+        "predictions": len(_stats["cold_predicts"]) + len(_stats["warm_predicts"]),
+    }
+
+
+def clear_cache():
+    with _lock:
+        _bundles.clear()
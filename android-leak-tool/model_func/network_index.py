@@ -0,0 +1,59 @@
+import ipaddress
+
+
+class NetworkIndex:
+    """
+    Longest-prefix-match index over IP ranges, IPv4 and IPv6.
+    Each range is split into CIDR blocks and stored in one hash table per prefix length,
+    so a lookup costs at most one probe per distinct prefix length (a flattened radix tree).
+    """
+
+    def __init__(self):
+        self._tables = {4: {}, 6: {}}
+        self._prefixes = {4: [], 6: []}
+        self.networks = 0
+
+    def add_range(self, start, end, record):
+        first, last = ipaddress.ip_address(start), ipaddress.ip_address(end)
+        for net in ipaddress.summarize_address_range(first, last):
+            self._add(net, record)
+        self.networks += 1
+
+    def add_cidr(self, cidr, record):
+        self._add(ipaddress.ip_network(cidr, strict=False), record)
+        self.networks += 1
+
+    def _add(self, net, record):
+        table = self._tables[net.version].setdefault(net.prefixlen, {})
+        table[int(net.network_address)] = record
+        self._prefixes[net.version] = sorted(self._tables[net.version], reverse=True)
+
+    def add_whois(self, whois):
+        """Indexes a WHOIS/RDAP record by its start/end addresses, or its cidr list when those are missing."""
+        try:
+            if whois.get("start_address") and whois.get("end_address"):
+                self.add_range(whois["start_address"], whois["end_address"], whois)
+                return True
+            if whois.get("cidr"):
+                for cidr in str(whois["cidr"]).split(","):
+                    self.add_cidr(cidr.strip(), whois)
+                return True
+        except ValueError:
+            pass
+        return False
+
+    def lookup(self, ip):
+        """Record of the most specific indexed network containing `ip`, or None."""
+        try:
+            addr = ipaddress.ip_address(ip)
+        except ValueError:
+            return None
+        value = int(addr)
+        bits = addr.max_prefixlen
+        tables = self._tables[addr.version]
+        for prefixlen in self._prefixes[addr.version]:
+            mask = ((1 << prefixlen) - 1) << (bits - prefixlen)
+            record = tables[prefixlen].get(value & mask)
+            if record is not None:
+                return record
+        return None
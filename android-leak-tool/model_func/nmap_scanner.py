@@ -3,6 +3,15 @@ import subprocess
 import re
 import pandas as pd
 import json
+import time
+import shutil
+import hashlib
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from model_func.ttl_store import TTLStore
+
+# nmap binary, override with the NMAP environment variable (e.g. a fake nmap in tests)
+NMAP = os.environ.get("NMAP", "nmap")
 
 
 # === Define Suspicious Ports and Their Threats ===
@@ -33,11 +42,33 @@ PORT_THREAT_MAP = {
 }
 
 DEFAULT_PORTS = ",".join(str(p) for p in PORT_THREAT_MAP)
+DEFAULT_WORKERS = 4
+DEFAULT_BATCH_SIZE = 4
+# per-host budget; one nmap run gets this times the number of hosts it scans
+HOST_TIMEOUT_SECONDS = 60
+
+# closed and filtered ports carry no information for triage; open|filtered is kept but not rated
+REPORTED_STATES = {"open", "open|filtered"}
+# scan results shared by every case under CASE_FILES_raw_logs
+SCAN_CACHE_NAME = "port_scan_cache.sqlite"
+SCAN_CACHE_TTL = 7 * 24 * 3600
+# a host with nothing open may just have been unreachable, look again sooner
+SCAN_EMPTY_TTL = 3600
+# cache profile of the built-in connect scanner, whose results don't depend on nmap options
+CONNECT_PROFILE = "connect"
+DEFAULT_SCAN_ARGS = ("-sV", "-T4")
+
+# two-phase profile: a plain SYN/connect sweep over many hosts per nmap run, then -sV on open ports only
+DISCOVERY_ARGS = ("-T4", "--open")
+DISCOVERY_BATCH_SIZE = 32
+SCAN_PROFILES = ["full", "two-phase"]
+
+RECORD_COLUMNS = ["ip", "port", "protocol", "state", "service", "banner", "threat", "tag", "risk_level", "scripts"]
 # Nmap Scan Functions
 def scan_ip(ip, ports=DEFAULT_PORTS):
     try:
         result = subprocess.run(
-            ["nmap", "-p", ports, "-sV", "-T4", "--host-timeout", "25s", ip],
+            [NMAP, "-p", ports, "-sV", "-T4", "--host-timeout", "25s", ip],
             capture_output=True, text=True, timeout=60
         )
         return result.stdout
@@ -58,6 +89,22 @@ def get_risk_level(port):
     else:
         return "info"
 
+def make_record(ip, port, service, banner, protocol="tcp", state="open", scripts=""):
+    # a port not confirmed open is listed for context, it is only rated once it answers
+    confirmed = state == "open"
+    return {
+        "ip": ip,
+        "port": port,
+        "protocol": protocol,
+        "state": state,
+        "service": service,
+        "banner": banner,
+        "threat": PORT_THREAT_MAP.get(port, ""),
+        "tag": "suspicious" if confirmed and port in PORT_THREAT_MAP else "normal",
+        "risk_level": get_risk_level(port) if confirmed else "info",
+        "scripts": scripts
+    }
+
 # formating raw output
 def parse_nmap_output(ip, raw_output):
     records = []
@@ -67,21 +114,305 @@ def parse_nmap_output(ip, raw_output):
             port = int(match.group(1))
             service = match.group(2)
             banner = match.group(3).strip()
-            tag = "suspicious" if port in PORT_THREAT_MAP else "normal"
-            threat = PORT_THREAT_MAP.get(port, "")
-            risk = get_risk_level(port)
-            records.append({
-                "ip": ip,
-                "port": port,
-                "service": service,
-                "banner": banner,
-                "threat": threat,
-                "tag": tag,
-                "risk_level": risk
-            })
+            records.append(make_record(ip, port, service, banner))
     return records
 
-def scan_ips_from_file(ip_input_file, output_csv, ):
+def parse_nmap_xml(xml_text):
+    """Records for every host in nmap `-oX` output, keyed by IP; hosts without reported ports map to []."""
+    results = {}
+    if not xml_text.strip():
+        return results
+    root = ET.fromstring(xml_text)
+    for host in root.iter("host"):
+        addr = host.find("address[@addrtype='ipv4']")
+        if addr is None:
+            addr = host.find("address[@addrtype='ipv6']")
+        if addr is None:
+            continue
+        ip = addr.get("addr")
+        records = results.setdefault(ip, [])
+
+        for port_el in host.iter("port"):
+            state_el = port_el.find("state")
+            state = state_el.get("state") if state_el is not None else ""
+            if state not in REPORTED_STATES:
+                continue
+
+            service_el = port_el.find("service")
+            service, banner = "", ""
+            if service_el is not None:
+                service = service_el.get("name", "")
+                banner = " ".join(
+                    v for v in [service_el.get("product"), service_el.get("version"),
+                                f"({service_el.get('extrainfo')})" if service_el.get("extrainfo") else None] if v
+                )
+            scripts = "; ".join(
+                f"{sc.get('id')}: {' '.join(sc.get('output', '').split())}" for sc in port_el.findall("script")
+            )
+            records.append(make_record(
+                ip, int(port_el.get("portid")), service, banner,
+                protocol=port_el.get("protocol", "tcp"), state=state, scripts=scripts
+            ))
+    return results
+
+def run_nmap_xml(targets, ports=DEFAULT_PORTS, args=("-sV", "-T4"), host_timeout="25s", timeout=None):
+    """Runs one nmap invocation over several targets and returns its XML report."""
+    timeout = timeout or HOST_TIMEOUT_SECONDS * len(targets)
+    result = subprocess.run(
+        [NMAP, "-p", ports, *args, "--host-timeout", host_timeout, "-oX", "-", *targets],
+        capture_output=True, text=True, timeout=timeout
+    )
+    if result.returncode != 0 and not result.stdout.strip():
+        raise RuntimeError(result.stderr.strip() or f"nmap exited with {result.returncode}")
+    return result.stdout
+
+def nmap_available():
+    return shutil.which(NMAP) is not None
+
+def scan_hosts(ip_list, ports=DEFAULT_PORTS, workers=DEFAULT_WORKERS, batch_size=DEFAULT_BATCH_SIZE,
+               args=("-sV", "-T4"), on_result=None, fallback=True, host_timeout="25s", timeout=None, sources=None):
+    """
+    Scans hosts with up to `workers` nmap processes at once, `batch_size` targets per process.
+    `on_result(ip, records)` is called for every host as its batch finishes.
+    With `fallback`, hosts are connect-scanned in Python when nmap is missing or their batch fails.
+    `sources`, when given, gets the scanner behind each result ("nmap" or "connect") before on_result runs.
+    Returns {ip: [record, ...]}; hosts whose scan failed are missing from the result.
+    """
+    from model_func.connect_scanner import connect_scan
+
+    sources = sources if sources is not None else {}
+    if not ip_list:
+        return {}
+    if not nmap_available():
+        if not fallback:
+            raise RuntimeError(f"nmap not found ({NMAP})")
+        print("[!] nmap not found, using the built-in connect scanner")
+        sources.update(dict.fromkeys(ip_list, CONNECT_PROFILE))
+        return connect_scan(ip_list, ports=ports, on_result=on_result)
+
+    batches = [ip_list[i:i + batch_size] for i in range(0, len(ip_list), batch_size)]
+    results = {}
+    failed = []
+
+    def scan_batch(batch):
+        xml_text = run_nmap_xml(batch, ports=ports, args=args, host_timeout=host_timeout, timeout=timeout)
+        return batch, parse_nmap_xml(xml_text)
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        futures = {pool.submit(scan_batch, batch): batch for batch in batches}
+        for future in as_completed(futures):
+            try:
+                batch, parsed = future.result()
+            except subprocess.TimeoutExpired:
+                print(f"[Timeout] {', '.join(futures[future])}")
+                failed.extend(futures[future])
+                continue
+            except Exception as e:
+                print(f"[Error] {', '.join(futures[future])}: {e}")
+                failed.extend(futures[future])
+                continue
+            for ip in batch:
+                records = parsed.get(ip, [])
+                results[ip] = records
+                sources[ip] = "nmap"
+                if on_result:
+                    on_result(ip, records)
+
+    if failed and fallback:
+        sources.update(dict.fromkeys(failed, CONNECT_PROFILE))
+        results.update(connect_scan(failed, ports=ports, on_result=on_result))
+    return results
+
+def two_phase_scan(ip_list, ports=DEFAULT_PORTS, workers=DEFAULT_WORKERS, batch_size=DEFAULT_BATCH_SIZE,
+                   version_args=DEFAULT_SCAN_ARGS, on_result=None, timings=None, sources=None,
+                   host_timeout="25s", timeout=None, fallback=True):
+    """
+    Phase one sweeps every host for open ports without service probes; phase two runs version
+    detection only on the ports found open. Hosts are sorted by their open-port set and batched
+    `batch_size` at a time, each batch probing the union of its hosts' open ports, and all batches
+    share one pool of `workers` nmap processes.
+    `timings`, when given, is filled with the seconds spent in each phase and the open-port counts.
+    `sources` is filled as in scan_hosts; hosts whose version scan failed are marked "discovery".
+    `timeout`, when given, bounds both phases together: the version runs get what discovery left.
+    `fallback` applies to the discovery phase as in scan_hosts.
+    Returns {ip: [record, ...]} like scan_hosts.
+    """
+    sources = sources if sources is not None else {}
+    started = time.perf_counter()
+    results = scan_hosts(ip_list, ports=ports, workers=workers,
+                         batch_size=max(batch_size, DISCOVERY_BATCH_SIZE), args=DISCOVERY_ARGS, sources=sources,
+                         host_timeout=host_timeout, timeout=timeout, fallback=fallback)
+    discovery_seconds = time.perf_counter() - started
+    version_timeout = max(timeout - discovery_seconds, 1) if timeout else None
+
+    open_ports = {}
+    for ip, records in results.items():
+        found = sorted({r["port"] for r in records if r["state"] == "open"})
+        if found:
+            open_ports[ip] = found
+        elif on_result:
+            # nothing left to probe on this host
+            on_result(ip, records)
+
+    started = time.perf_counter()
+    version_runs = 0
+    if nmap_available():
+        # hosts with the same or similar open ports end up in the same batch, keeping the unions small
+        hosts = sorted(open_ports, key=lambda ip: open_ports[ip])
+        batches = [hosts[i:i + batch_size] for i in range(0, len(hosts), batch_size)]
+        version_runs = len(batches)
+
+        def version_batch(batch):
+            batch_ports = ",".join(map(str, sorted({p for ip in batch for p in open_ports[ip]})))
+            return parse_nmap_xml(run_nmap_xml(batch, ports=batch_ports, args=version_args,
+                                               host_timeout=host_timeout, timeout=version_timeout))
+
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+            futures = {pool.submit(version_batch, batch): batch for batch in batches}
+            for future in as_completed(futures):
+                batch = futures[future]
+                try:
+                    parsed = future.result()
+                except Exception as e:
+                    # these hosts keep their discovery records
+                    print(f"[Error] version scan {', '.join(batch)}: {e}")
+                    parsed = None
+                for ip in batch:
+                    if parsed is None:
+                        sources[ip] = "discovery"
+                    else:
+                        # ports outside this host's open set and open|filtered ports keep their discovery records
+                        versioned = [r for r in parsed.get(ip, []) if r["port"] in open_ports[ip]]
+                        probed = {(r["port"], r["protocol"]) for r in versioned}
+                        results[ip] = versioned + [r for r in results[ip] if (r["port"], r["protocol"]) not in probed]
+                    if on_result:
+                        on_result(ip, results[ip])
+    elif on_result:
+        # without nmap discovery was a connect scan that already grabbed banners
+        for ip in open_ports:
+            on_result(ip, results[ip])
+    version_seconds = time.perf_counter() - started
+
+    if timings is not None:
+        timings.update({
+            "discovery_seconds": round(discovery_seconds, 2),
+            "version_seconds": round(version_seconds, 2),
+            "version_runs": version_runs,
+            "hosts_discovered": len(results),
+            "hosts_with_open_ports": len(open_ports),
+            "open_ports": sum(len(p) for p in open_ports.values()),
+        })
+    return results
+
+class ScanOutputWriter:
+    """
+    Appends each host's records to the output CSV as soon as the host is done and keeps a checkpoint
+    (`<output>_checkpoint.json`) of finished hosts, so an interrupted run can pick up where it stopped.
+    A checkpoint is only resumed for the same `run_key` (ports and scan options).
+    """
+
+    def __init__(self, output_csv, run_key, resume=True):
+        self.output_csv = output_csv
+        self.checkpoint_path = os.path.splitext(output_csv)[0] + "_checkpoint.json"
+        self.run_key = run_key
+        self.done = {}
+
+        checkpoint = None
+        if resume and os.path.exists(self.checkpoint_path) and os.path.exists(output_csv):
+            with open(self.checkpoint_path, "r") as f:
+                checkpoint = json.load(f)
+            if checkpoint.get("run_key") != run_key:
+                checkpoint = None
+
+        if checkpoint is None:
+            pd.DataFrame(columns=RECORD_COLUMNS).to_csv(output_csv, index=False)
+        else:
+            prior = pd.read_csv(output_csv, dtype={"banner": str, "scripts": str}).fillna("")
+            # rows appended after the last checkpoint save belong to hosts that will be scanned again
+            prior = prior[prior["ip"].isin(checkpoint["done"])]
+            prior.to_csv(output_csv, index=False)
+            self.done = {ip: [] for ip in checkpoint["done"]}
+            for record in prior.to_dict("records"):
+                self.done[record["ip"]].append(record)
+        self._save_checkpoint()
+
+    def _save_checkpoint(self):
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"run_key": self.run_key, "done": list(self.done)}, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def add(self, ip, records):
+        if ip in self.done:
+            return
+        if records:
+            pd.DataFrame(records, columns=RECORD_COLUMNS).to_csv(self.output_csv, mode="a", header=False, index=False)
+        self.done[ip] = records
+        self._save_checkpoint()
+
+    def finish(self, ip_order):
+        """Rewrites the output in input order and drops the checkpoint; returns the full DataFrame."""
+        df = pd.DataFrame([r for ip in ip_order for r in self.done.get(ip, [])], columns=RECORD_COLUMNS)
+        df.to_csv(self.output_csv, index=False)
+        os.remove(self.checkpoint_path)
+        return df
+
+def open_scan_cache(cases_dir, ttl=SCAN_CACHE_TTL):
+    return TTLStore(os.path.join(cases_dir, SCAN_CACHE_NAME), table="port_scans", default_ttl=ttl)
+
+def scan_cache_key(ip, ports, profile):
+    """Results are only reusable for the same port set and scan options."""
+    port_set = ",".join(sorted(ports.split(","), key=lambda p: (len(p), p)))
+    digest = hashlib.sha1(f"{port_set}|{profile}".encode()).hexdigest()[:16]
+    return f"{ip}|{digest}"
+
+def cached_scan_results(cache, ip_list, ports, run_profile):
+    """
+    {ip: records} of unexpired cached results for this port set and profile.
+    Connect-scan results only stand in for nmap ones while nmap is unavailable.
+    """
+    if cache is None or not ip_list:
+        return {}
+    profiles = [run_profile] if nmap_available() else [run_profile, CONNECT_PROFILE]
+    keys = {(ip, profile): scan_cache_key(ip, ports, profile) for ip in ip_list for profile in profiles}
+    found = cache.get_many(keys.values())
+    results = {}
+    for ip in ip_list:
+        for profile in profiles:
+            if keys[(ip, profile)] in found:
+                results[ip] = found[keys[(ip, profile)]]
+                break
+    return results
+
+def cache_scan_results(cache, results, sources, ports, run_profile):
+    """
+    Stores freshly scanned hosts under the profile of the scanner that produced them.
+    Empty results expire after SCAN_EMPTY_TTL; partial results (see two_phase_scan) are not stored.
+    """
+    if cache is None:
+        return
+    items, ttls = {}, {}
+    for ip, records in results.items():
+        source = sources.get(ip)
+        if source == "nmap":
+            key = scan_cache_key(ip, ports, run_profile)
+        elif source == CONNECT_PROFILE:
+            key = scan_cache_key(ip, ports, CONNECT_PROFILE)
+        else:
+            continue
+        items[key] = records
+        if not records:
+            ttls[key] = SCAN_EMPTY_TTL
+    cache.put_many(items, ttl=ttls)
+
+def scan_ips_from_file(ip_input_file, output_csv, workers=DEFAULT_WORKERS, batch_size=DEFAULT_BATCH_SIZE,
+                       cache=None, ports=DEFAULT_PORTS, args=DEFAULT_SCAN_ARGS, profile="full", stats=None,
+                       progress=None, resume=True):
+    """
+    Scans every IP in the input file and writes the records to `output_csv` host by host.
+    `progress(done, total, records)` is called as each host finishes (records are that host's rows);
+    with `resume` a run interrupted part-way skips the hosts its checkpoint lists as done.
+    """
     if not os.path.exists(ip_input_file):
         print(f"[ERROR] Input file does not exist: {ip_input_file}")
         return pd.DataFrame()
@@ -93,19 +424,50 @@ def scan_ips_from_file(ip_input_file, output_csv, ):
     if not os.path.exists(case_folder):
         os.makedirs(case_folder)
 
-    all_results = []
-    for ip in ip_list:
-        raw = scan_ip(ip)
-        parsed = parse_nmap_output(ip, raw)
-        if parsed:
-            all_results.extend(parsed)
+    run_profile = f"{profile} {' '.join(args)}"
+    writer = ScanOutputWriter(output_csv, run_key=f"{run_profile}|{ports}", resume=resume)
+    resumed = len(writer.done)
+
+    def host_done(ip, records):
+        writer.add(ip, records)
+        if progress:
+            progress(len(writer.done), len(ip_list), records)
+
+    if progress and resumed:
+        progress(resumed, len(ip_list), [r for records in writer.done.values() for r in records])
+
+    # Reuse unexpired results for the same ports and options, scan only new or expired hosts
+    remaining = [ip for ip in ip_list if ip not in writer.done]
+    cached = cached_scan_results(cache, remaining, ports, run_profile)
+    for ip in remaining:
+        if ip in cached:
+            host_done(ip, cached[ip])
+
+    to_scan = [ip for ip in remaining if ip not in writer.done]
+    sources = {}
+
+    def host_scanned(ip, records):
+        # cached as each host finishes, so an interrupted run keeps what it scanned
+        cache_scan_results(cache, {ip: records}, sources, ports, run_profile)
+        host_done(ip, records)
+
+    timings = {}
+    started = time.perf_counter()
+    if profile == "two-phase":
+        two_phase_scan(to_scan, ports=ports, workers=workers, batch_size=batch_size,
+                       version_args=args, on_result=host_scanned, timings=timings, sources=sources)
+    else:
+        scan_hosts(to_scan, ports=ports, workers=workers, batch_size=batch_size, args=args,
+                   on_result=host_scanned, sources=sources)
+    timings["total_seconds"] = round(time.perf_counter() - started, 2)
 
-       
+    if stats is not None:
+        stats.update({"profile": profile, "scanned": len(to_scan), "from_cache": len(cached),
+                      "resumed": resumed, **timings})
 
-    df = pd.DataFrame(all_results)
+    df = writer.finish(ip_list)
     if not df.empty:
-        df.to_csv(output_csv, index=False)
-        return df,f"Scan complete. Results saved to: {output_csv}"      #remove path 
+        return df,f"Scan complete ({len(to_scan)} scanned, {len(cached)} from cache, {resumed} resumed). Results saved to: {output_csv}"      #remove path 
     else:
         return df, "No open ports found or all scans failed."
 
@@ -0,0 +1,251 @@
+import os
+import json
+import ipaddress
+import numpy as np
+import pandas as pd
+
+OFFLINE_DB_DIR = "ipdb"
+
+# accepted header names for each field in the source range dumps
+COLUMN_ALIASES = {
+    "start_ip": ["start_ip", "range_start", "ip_start", "start", "first_ip"],
+    "end_ip": ["end_ip", "range_end", "ip_end", "end", "last_ip"],
+    "network": ["network", "cidr"],
+    "country": ["country", "country_code", "countrycode", "country_iso_code"],
+    "lat": ["lat", "latitude"],
+    "lon": ["lon", "longitude"],
+    "asn": ["asn", "as_number", "autonomous_system_number"],
+    "asn_description": ["asn_description", "as_description", "as_org", "autonomous_system_organization", "org"],
+}
+DATASET_FIELDS = {
+    "geo": {"country": "label", "lat": "float", "lon": "float"},
+    "asn": {"asn": "label", "asn_description": "label"},
+}
+_IPV4_PATTERN = r"\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}"
+
+
+def _normalise_columns(df):
+    lower = {c.lower().strip(): c for c in df.columns}
+    renamed = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in lower:
+                renamed[lower[alias]] = field
+                break
+    return df.rename(columns=renamed)
+
+
+def _ranges_from_frame(df):
+    """(start, end) ipaddress objects for each row, from start/end columns or a CIDR column."""
+    if "start_ip" in df.columns and "end_ip" in df.columns:
+        starts = [ipaddress.ip_address(str(v).strip()) for v in df["start_ip"]]
+        ends = [ipaddress.ip_address(str(v).strip()) for v in df["end_ip"]]
+        return starts, ends
+    if "network" in df.columns:
+        nets = [ipaddress.ip_network(str(v).strip(), strict=False) for v in df["network"]]
+        return [n.network_address for n in nets], [n.broadcast_address for n in nets]
+    raise ValueError("Range dataset needs start_ip/end_ip or network columns.")
+
+
+def _pack(addresses, version):
+    if version == 4:
+        return np.array([int(a) for a in addresses], dtype=np.uint32)
+    # 16-byte big-endian strings sort in numeric order, numpy compares them bytewise
+    return np.array([a.packed for a in addresses], dtype="S16")
+
+
+def _enclosing_ranges(starts, ends, source):
+    """
+    Index of the nearest range enclosing each range (-1 for none), for ranges sorted by start and
+    then by end descending. Ranges may nest but not partially overlap, otherwise lookups are ambiguous.
+    """
+    parent = np.full(len(starts), -1, dtype=np.int64)
+    open_ranges = []
+    for i, (start, end) in enumerate(zip(starts.tolist(), ends.tolist())):
+        while open_ranges and ends[open_ranges[-1]] < start:
+            open_ranges.pop()
+        if open_ranges:
+            if end > ends[open_ranges[-1]]:
+                raise ValueError(f"{source}: two ranges overlap without one containing the other.")
+            parent[i] = open_ranges[-1]
+        open_ranges.append(i)
+    return parent
+
+
+def build_offline_db(out_dir, geo_csv=None, asn_csv=None, sep=","):
+    """
+    Compiles geo and/or ASN range dumps (CSV/TSV with a header row) into sorted numpy arrays under `out_dir`.
+    Geo rows need a range plus country (lat/lon optional); ASN rows need a range plus asn/asn_description.
+    Ranges are start_ip/end_ip columns or a CIDR `network` column, IPv4 and IPv6 may be mixed.
+    Ranges may be nested (the most specific one answers) but must not partially overlap.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    meta = {}
+    for kind, path in [("geo", geo_csv), ("asn", asn_csv)]:
+        if not path:
+            continue
+        df = _normalise_columns(pd.read_csv(path, sep=sep, dtype=str, keep_default_na=False))
+        starts, ends = _ranges_from_frame(df)
+        versions = np.array([a.version for a in starts])
+        fields = DATASET_FIELDS[kind]
+        meta[kind] = {"fields": fields, "versions": []}
+
+        labels = {}
+        for field, ftype in fields.items():
+            if ftype == "label":
+                values = df[field] if field in df.columns else pd.Series([""] * len(df))
+                codes, uniques = pd.factorize(values.astype(str))
+                labels[field] = codes.astype(np.int32)
+                with open(os.path.join(out_dir, f"{kind}_{field}_labels.json"), "w") as f:
+                    json.dump(list(uniques), f)
+
+        for version in (4, 6):
+            rows = np.flatnonzero(versions == version)
+            if len(rows) == 0:
+                continue
+            start_arr = _pack([starts[i] for i in rows], version)
+            end_arr = _pack([ends[i] for i in rows], version)
+            # by start, and an enclosing range before the ranges nested in it
+            _, ranks = np.unique(np.concatenate([start_arr, end_arr]), return_inverse=True)
+            start_rank, end_rank = ranks[:len(rows)], ranks[len(rows):]
+            order = np.lexsort((-end_rank, start_rank))
+            prefix = os.path.join(out_dir, f"{kind}_v{version}")
+            np.save(prefix + "_start.npy", start_arr[order])
+            np.save(prefix + "_end.npy", end_arr[order])
+            np.save(prefix + "_parent.npy", _enclosing_ranges(start_rank[order], end_rank[order], path))
+            for field, ftype in fields.items():
+                if ftype == "label":
+                    column = labels[field][rows]
+                else:
+                    column = pd.to_numeric(df[field], errors="coerce").to_numpy(dtype=np.float64)[rows] \
+                        if field in df.columns else np.full(len(rows), np.nan)
+                np.save(f"{prefix}_{field}.npy", column[order])
+            meta[kind]["versions"].append(version)
+
+    with open(os.path.join(out_dir, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=4)
+    return meta
+
+
+class OfflineIPDB:
+    """
+    Read-only geo/ASN lookups over arrays built by build_offline_db.
+    Arrays are memory-mapped, so opening is instant and pages are shared between processes;
+    each lookup is a binary search over range starts.
+    """
+
+    def __init__(self, db_dir):
+        with open(os.path.join(db_dir, "meta.json"), "r") as f:
+            self.meta = json.load(f)
+        self.tables = {}
+        self.labels = {}
+        for kind, info in self.meta.items():
+            for field, ftype in info["fields"].items():
+                if ftype == "label":
+                    with open(os.path.join(db_dir, f"{kind}_{field}_labels.json"), "r") as f:
+                        self.labels[(kind, field)] = np.array(json.load(f), dtype=object)
+            for version in info["versions"]:
+                prefix = os.path.join(db_dir, f"{kind}_v{version}")
+                table = {
+                    "start": np.load(prefix + "_start.npy", mmap_mode="r"),
+                    "end": np.load(prefix + "_end.npy", mmap_mode="r"),
+                    # missing in databases built before nested ranges were supported
+                    "parent": np.load(prefix + "_parent.npy", mmap_mode="r")
+                    if os.path.exists(prefix + "_parent.npy") else None,
+                }
+                for field in info["fields"]:
+                    table[field] = np.load(f"{prefix}_{field}.npy", mmap_mode="r")
+                self.tables[(kind, version)] = table
+
+    @classmethod
+    def open(cls, db_dir):
+        """The database in `db_dir`, or None when it hasn't been built."""
+        if not os.path.exists(os.path.join(db_dir, "meta.json")):
+            return None
+        return cls(db_dir)
+
+    def _search(self, kind, version, keys):
+        """Row index of the range containing each key, -1 where none does."""
+        table = self.tables.get((kind, version))
+        if table is None or len(keys) == 0:
+            return np.full(len(keys), -1)
+        idx = np.searchsorted(table["start"], keys, side="right") - 1
+        end = table["end"]
+        if table["parent"] is not None:
+            # past the end of the last range starting before it: try the ranges that range is nested in
+            parent = np.asarray(table["parent"])
+            while True:
+                outside = (idx >= 0) & (keys > end[np.clip(idx, 0, None)])
+                if not outside.any():
+                    break
+                idx[outside] = parent[idx[outside]]
+        safe = np.clip(idx, 0, None)
+        hit = (idx >= 0) & (keys <= end[safe])
+        return np.where(hit, idx, -1)
+
+    def lookup_frame(self, ips):
+        """
+        Vectorised lookup for a whole column of IPs.
+        Returns a DataFrame aligned with `ips` holding country, lat, lon, asn and asn_description (NaN when unknown).
+        """
+        ips = pd.Series(ips, dtype=object).reset_index(drop=True).astype(str).str.strip()
+        out = pd.DataFrame(index=ips.index, columns=["country", "lat", "lon", "asn", "asn_description"], dtype=object)
+
+        is_v4 = ips.str.fullmatch(_IPV4_PATTERN)
+        v4_pos = np.flatnonzero(is_v4.to_numpy())
+        v4_keys = np.array([], dtype=np.uint32)
+        if len(v4_pos):
+            octets = ips[is_v4].str.split(".", expand=True).to_numpy(dtype=np.uint64)
+            in_range = (octets <= 255).all(axis=1)
+            v4_pos, octets = v4_pos[in_range], octets[in_range]
+            v4_keys = ((octets[:, 0] << 24) | (octets[:, 1] << 16) | (octets[:, 2] << 8) | octets[:, 3]).astype(np.uint32)
+
+        # IPv6 (and anything odd) goes through ipaddress, there are far fewer of them
+        v6_pos, v6_keys = [], []
+        for pos in np.flatnonzero(~is_v4.to_numpy()):
+            try:
+                addr = ipaddress.ip_address(ips.iat[pos])
+            except ValueError:
+                continue
+            if addr.version == 6:
+                v6_pos.append(pos)
+                v6_keys.append(addr.packed)
+        v6_pos = np.array(v6_pos, dtype=int)
+        v6_keys = np.array(v6_keys, dtype="S16")
+
+        for kind, info in self.meta.items():
+            for version, positions, keys in [(4, v4_pos, v4_keys), (6, v6_pos, v6_keys)]:
+                rows = self._search(kind, version, keys)
+                found = rows >= 0
+                if not found.any():
+                    continue
+                table = self.tables[(kind, version)]
+                target = positions[found]
+                for field, ftype in info["fields"].items():
+                    values = np.asarray(table[field])[rows[found]]
+                    if ftype == "label":
+                        values = self.labels[(kind, field)][values]
+                    out.loc[target, field] = values
+        return out
+
+    def lookup(self, ip):
+        row = self.lookup_frame([ip]).iloc[0]
+        return {k: (None if pd.isna(v) else v) for k, v in row.items()}
+
+    def enrich(self, geo_ips, whois_ips):
+        """Same shape as EnrichmentEngine.enrich: ({ip: geo}, {ip: whois})."""
+        geo_ips, whois_ips = list(geo_ips), list(whois_ips)
+        frame = self.lookup_frame(geo_ips + whois_ips)
+        records = [{k: (None if pd.isna(v) else v) for k, v in row.items()} for row in frame.to_dict("records")]
+
+        geo_map = {}
+        for ip, rec in zip(geo_ips, records[:len(geo_ips)]):
+            geo_map[ip] = {"lat": rec["lat"], "lon": rec["lon"], "country": rec["country"] or "Unknown"}
+        whois_map = {}
+        for ip, rec in zip(whois_ips, records[len(geo_ips):]):
+            whois_map[ip] = {
+                "asn": rec["asn"] or None, "asn_description": rec["asn_description"] or None,
+                "org_name": rec["asn_description"] or None, "cidr": None,
+                "start_address": None, "end_address": None, "created": None, "updated": None
+            }
+        return geo_map, whois_map
@@ -0,0 +1,182 @@
+import os
+import time
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from model_func.nmap_scanner import (
+    scan_hosts, two_phase_scan, cached_scan_results, cache_scan_results, nmap_available, ScanOutputWriter,
+    DEFAULT_PORTS, DEFAULT_SCAN_ARGS, DEFAULT_WORKERS, DEFAULT_BATCH_SIZE
+)
+
+DEFAULT_BUDGET_SECONDS = 10 * 60
+RISK_ORDER = {"High": 0, "Medium": 1, "Low": 2}
+
+# per-host nmap timeout follows the observed scan times: a multiple of their moving average, within bounds
+EWMA_ALPHA = 0.3
+TIMEOUT_FACTOR = 3.0
+MIN_HOST_TIMEOUT = 5
+MAX_HOST_TIMEOUT = 60
+INITIAL_HOST_TIMEOUT = 25
+
+UNSCANNED_COLUMNS = ["ip", "risk_level", "suspicion_probability", "reason"]
+
+
+def prioritize_targets(ip_list, ranked_csv=None):
+    """
+    Orders IPs most dangerous first: risk_level (High, Medium, Low) then suspicion_probability,
+    both from ranked_suspicious_ips.csv. IPs missing from the ranking go last, in input order.
+    Returns a DataFrame with ip, risk_level and suspicion_probability.
+    """
+    targets = pd.DataFrame({"ip": list(dict.fromkeys(ip_list))})
+    if ranked_csv and os.path.exists(ranked_csv):
+        ranked = pd.read_csv(ranked_csv, usecols=lambda c: c in {"ip", "risk_level", "suspicion_probability"})
+        targets = targets.merge(ranked.drop_duplicates("ip"), on="ip", how="left")
+    for col in ["risk_level", "suspicion_probability"]:
+        if col not in targets.columns:
+            targets[col] = None
+
+    targets["_rank"] = targets["risk_level"].map(RISK_ORDER).fillna(len(RISK_ORDER))
+    targets["_prob"] = pd.to_numeric(targets["suspicion_probability"], errors="coerce").fillna(-1)
+    targets = targets.sort_values(["_rank", "_prob"], ascending=[True, False], kind="stable")
+    return targets.drop(columns=["_rank", "_prob"]).reset_index(drop=True)
+
+
+class AdaptiveTimeout:
+    """Per-host timeout from an exponentially weighted average of observed host scan durations."""
+
+    def __init__(self, initial=INITIAL_HOST_TIMEOUT, alpha=EWMA_ALPHA, factor=TIMEOUT_FACTOR,
+                 minimum=MIN_HOST_TIMEOUT, maximum=MAX_HOST_TIMEOUT):
+        self.alpha = alpha
+        self.factor = factor
+        self.minimum = minimum
+        self.maximum = maximum
+        self.average = None
+        self.initial = initial
+
+    def observe(self, seconds):
+        self.average = seconds if self.average is None else self.alpha * seconds + (1 - self.alpha) * self.average
+
+    def host_timeout(self):
+        if self.average is None:
+            return self.initial
+        return int(min(max(self.average * self.factor, self.minimum), self.maximum))
+
+
+def scheduled_scan(ip_input_file, output_csv, ranked_csv=None, budget_seconds=DEFAULT_BUDGET_SECONDS,
+                   workers=DEFAULT_WORKERS, batch_size=DEFAULT_BATCH_SIZE, cache=None,
+                   ports=DEFAULT_PORTS, args=DEFAULT_SCAN_ARGS, profile="full", stats=None, progress=None,
+                   resume=True):
+    """
+    Scans the most dangerous IPs first and stops starting new batches once `budget_seconds` is used up;
+    running batches are cut off at the deadline. Results so far go to `output_csv` and every target
+    that was not scanned to `<output>_unscanned.csv`, with reason "budget" when the deadline stopped it
+    and "failed" when its scan failed in time. Each batch is scanned with `profile` ("full" or "two-phase").
+    Output is streamed and checkpointed as in scan_ips_from_file, `progress` and `resume` behave the same.
+    Returns (df, msg) like scan_ips_from_file.
+    """
+    started = time.monotonic()
+    deadline = started + budget_seconds
+
+    df_ips = pd.read_csv(ip_input_file)
+    targets = prioritize_targets(df_ips["ip"].dropna().unique().tolist(), ranked_csv)
+    order = targets["ip"].tolist()
+
+    case_folder = os.path.dirname(output_csv)
+    if not os.path.exists(case_folder):
+        os.makedirs(case_folder)
+
+    run_profile = f"{profile} {' '.join(args)}"
+    writer = ScanOutputWriter(output_csv, run_key=f"{run_profile}|{ports}", resume=resume)
+    resumed = len(writer.done)
+    results = writer.done
+
+    def host_done(ip, records):
+        writer.add(ip, records)
+        if progress:
+            progress(len(writer.done), len(order), records)
+
+    if progress and resumed:
+        progress(resumed, len(order), [r for records in writer.done.values() for r in records])
+
+    remaining = [ip for ip in order if ip not in writer.done]
+    cached = cached_scan_results(cache, remaining, ports, run_profile)
+    for ip in remaining:
+        if ip in cached:
+            host_done(ip, cached[ip])
+    pending = [ip for ip in remaining if ip not in writer.done]
+    batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+
+    timeouts = AdaptiveTimeout()
+    failed = set()
+
+    def scan_batch(batch, host_timeout, run_timeout):
+        batch_started = time.monotonic()
+        sources = {}
+        if profile == "two-phase":
+            found = two_phase_scan(batch, ports=ports, workers=1, batch_size=len(batch), version_args=args,
+                                   fallback=not nmap_available(), host_timeout=f"{host_timeout}s",
+                                   timeout=run_timeout, sources=sources)
+        else:
+            found = scan_hosts(batch, ports=ports, workers=1, batch_size=len(batch), args=args,
+                               fallback=not nmap_available(), host_timeout=f"{host_timeout}s", timeout=run_timeout,
+                               sources=sources)
+        return found, sources, time.monotonic() - batch_started
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        running = {}
+        next_batch = 0
+        while next_batch < len(batches) or running:
+            # keep every worker busy while there is budget left to start a batch
+            while next_batch < len(batches) and len(running) < workers:
+                remaining = deadline - time.monotonic()
+                host_timeout = timeouts.host_timeout()
+                # not worth starting a batch that would most likely be cut off
+                if remaining <= (timeouts.average or 0):
+                    break
+                run_timeout = min(host_timeout * len(batches[next_batch]), remaining)
+                future = pool.submit(scan_batch, batches[next_batch], host_timeout, run_timeout)
+                # a batch whose run time was shortened to fit the budget and then missed hosts ran out of budget
+                running[future] = (batches[next_batch], run_timeout < host_timeout * len(batches[next_batch]))
+                next_batch += 1
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch, capped = running.pop(future)
+                found, sources, elapsed = future.result()
+                for ip in batch:
+                    if ip in found:
+                        host_done(ip, found[ip])
+                if not capped:
+                    failed.update(ip for ip in batch if ip not in found)
+                if found:
+                    # nmap scans a batch's hosts in parallel, so the batch time is a host's time
+                    timeouts.observe(elapsed)
+                cache_scan_results(cache, found, sources, ports, run_profile)
+
+    df = writer.finish(order)
+
+    unscanned = targets[~targets["ip"].isin(results.keys())].copy()
+    unscanned["reason"] = unscanned["ip"].map(lambda ip: "failed" if ip in failed else "budget")
+    unscanned_csv = os.path.splitext(output_csv)[0] + "_unscanned.csv"
+    unscanned[UNSCANNED_COLUMNS].to_csv(unscanned_csv, index=False)
+
+    elapsed = time.monotonic() - started
+    if stats is not None:
+        stats.update({
+            "profile": "budgeted",
+            "scan_profile": profile,
+            "failed": len(failed),
+            "scanned": len(results) - len(cached) - resumed,
+            "from_cache": len(cached),
+            "resumed": resumed,
+            "unscanned": len(unscanned),
+            "budget_seconds": budget_seconds,
+            "total_seconds": round(elapsed, 2),
+            "host_timeout": timeouts.host_timeout(),
+        })
+
+    msg = f"Scanned {len(results)} of {len(order)} IPs in {elapsed:.0f}s. Results saved to: {output_csv}"
+    if len(unscanned):
+        msg += f" ({len(unscanned)} not scanned, listed in {os.path.basename(unscanned_csv)})"
+    return df, msg
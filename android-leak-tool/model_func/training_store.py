@@ -0,0 +1,176 @@
+import os
+import re
+import json
+from datetime import datetime
+import pandas as pd
+from model_func.features import FEATURES
+
+# Parquet partitions of labelled feature rows, one per case, replacing global_training_data.csv
+TRAINING_STORE_DIR = "training_store"
+LABEL_COLUMN = "is_suspicious"
+INDEX_NAME = "partitions.json"
+LEGACY_CASE_ID = "legacy_global_csv"
+
+
+def partition_key(case_id):
+    """The name a case is stored and indexed under; case ids that differ only in unsafe characters share it."""
+    return re.sub(r"[^\w.-]", "_", str(case_id))
+
+
+def _partition_dir(store_dir, case_id):
+    return os.path.join(store_dir, f"case={partition_key(case_id)}")
+
+
+def _load_index(store_dir):
+    path = os.path.join(store_dir, INDEX_NAME)
+    if not os.path.exists(path):
+        return {"revision": 0, "partitions": {}}
+    with open(path, "r") as f:
+        index = json.load(f)
+    # indexes written before keys were sanitized may hold several entries for one partition, the latest is right
+    partitions = {}
+    for case, info in sorted(index["partitions"].items(), key=lambda item: item[1]["revision"]):
+        partitions[partition_key(case)] = info
+    index["partitions"] = partitions
+    return index
+
+
+def _save_index(store_dir, index):
+    path = os.path.join(store_dir, INDEX_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(index, f, indent=4)
+    os.replace(tmp_path, path)
+
+
+def row_fingerprints(df, columns):
+    """64-bit hash of each row's values in `columns`, identical rows hash the same."""
+    return pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+
+
+def _feature_rows(df, features):
+    """Feature and label columns in storage dtypes plus a fingerprint column, duplicates dropped."""
+    columns = list(features) + [LABEL_COLUMN]
+    rows = df[columns].copy()
+    rows[features] = rows[features].apply(pd.to_numeric, errors="coerce").fillna(0).astype("float64")
+    rows[LABEL_COLUMN] = rows[LABEL_COLUMN].astype("int8")
+    rows["fingerprint"] = row_fingerprints(rows, columns)
+    return rows.drop_duplicates("fingerprint")
+
+
+def append_case(store_dir, case_id, df, features=FEATURES):
+    """
+    Adds a case's labelled feature rows to its partition. Rows already stored for the case (same
+    fingerprint over features and label) are skipped, so re-flagging a case adds nothing twice.
+    Returns the number of new rows.
+    """
+    return _write_partition(store_dir, case_id, _feature_rows(df, features))
+
+
+def _write_partition(store_dir, case_id, rows):
+    os.makedirs(store_dir, exist_ok=True)
+    part_dir = _partition_dir(store_dir, case_id)
+    part_path = os.path.join(part_dir, "part.parquet")
+    if os.path.exists(part_path):
+        existing = pd.read_parquet(part_path)
+        new_rows = rows[~rows["fingerprint"].isin(existing["fingerprint"])]
+        combined = pd.concat([existing, new_rows], ignore_index=True)
+    else:
+        new_rows = rows
+        combined = rows
+    if new_rows.empty:
+        return 0
+
+    os.makedirs(part_dir, exist_ok=True)
+    tmp_path = part_path + ".tmp"
+    combined.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, part_path)
+
+    # the revision lets incremental retraining find partitions changed since a model was built
+    index = _load_index(store_dir)
+    index["revision"] += 1
+    index["partitions"][partition_key(case_id)] = {
+        "path": os.path.relpath(part_path, store_dir),
+        "rows": len(combined),
+        "revision": index["revision"],
+        "updated_at": datetime.now().isoformat(),
+    }
+    _save_index(store_dir, index)
+    return len(new_rows)
+
+
+def list_partitions(store_dir, since_revision=0):
+    """{case_id: partition info} for partitions written after `since_revision`."""
+    index = _load_index(store_dir)
+    return {case: info for case, info in index["partitions"].items() if info["revision"] > since_revision}
+
+
+def store_revision(store_dir):
+    return _load_index(store_dir)["revision"]
+
+
+def partition_rows(store_dir):
+    """{case_id: stored row count}, e.g. to record what a model was trained on."""
+    return {case: info["rows"] for case, info in _load_index(store_dir)["partitions"].items()}
+
+
+def read_training_data(store_dir, features=FEATURES, cases=None, sample_frac=None, max_rows=None, random_state=42,
+                       since_rows=None, with_case=False):
+    """
+    Feature and label columns only, from every partition or just `cases`.
+    `sample_frac` / `max_rows` down-sample each partition proportionally before concatenating,
+    so memory follows the sample size rather than the history size.
+    `since_rows` ({case_id: rows}, see partition_rows) skips rows already seen; rows are only ever
+    appended to a partition, so those are its first rows. `with_case` adds a case_id column.
+    """
+    partitions = _load_index(store_dir)["partitions"]
+    if cases is not None:
+        keys = [partition_key(c) for c in cases]
+        partitions = {c: partitions[c] for c in keys if c in partitions}
+    seen_rows = {}
+    for case, rows in (since_rows or {}).items():
+        # model versions recorded before keys were sanitized
+        seen_rows[partition_key(case)] = max(rows, seen_rows.get(partition_key(case), 0))
+    since_rows = seen_rows
+    columns = list(features) + [LABEL_COLUMN]
+    if not partitions:
+        return pd.DataFrame(columns=columns + (["case_id"] if with_case else []))
+
+    total_rows = sum(info["rows"] - since_rows.get(case, 0) for case, info in partitions.items())
+    if max_rows is not None and total_rows > max_rows:
+        sample_frac = min(sample_frac or 1.0, max_rows / total_rows)
+
+    frames = []
+    for case, info in partitions.items():
+        part = pd.read_parquet(os.path.join(store_dir, info["path"]), columns=columns)
+        part = part.iloc[since_rows.get(case, 0):]
+        if sample_frac is not None and sample_frac < 1.0:
+            part = part.sample(frac=sample_frac, random_state=random_state)
+        if with_case:
+            part = part.assign(case_id=case)
+        frames.append(part)
+    return pd.concat(frames, ignore_index=True)
+
+
+def migrate_csv(store_dir, csv_path, chunksize=500_000):
+    """
+    One-time import of the legacy global_training_data.csv into a single partition, deduplicated.
+    Chunks are deduplicated as they are read and the partition is written once at the end.
+    The CSV is renamed to *.migrated afterwards so it is not imported again. Returns the rows kept.
+    """
+    if not os.path.exists(csv_path):
+        return 0
+    frames = []
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+        if LABEL_COLUMN not in chunk.columns:
+            raise ValueError(f"'{LABEL_COLUMN}' column not found in {csv_path}")
+        for feat in FEATURES:
+            if feat not in chunk.columns:
+                chunk[feat] = 0
+        frames.append(_feature_rows(chunk, FEATURES))
+    added = 0
+    if frames:
+        rows = pd.concat(frames, ignore_index=True).drop_duplicates("fingerprint")
+        added = _write_partition(store_dir, LEGACY_CASE_ID, rows)
+    os.replace(csv_path, csv_path + ".migrated")
+    return added
@@ -0,0 +1,188 @@
+import os
+import time
+import json
+import sqlite3
+from contextlib import contextmanager
+
+# keep IN (...) lists well under SQLite's bound-parameter limit
+_BATCH = 500
+
+
+class TTLStore:
+    """
+    Small persistent key -> JSON value cache on SQLite.
+    Every entry carries its own expiry, reads refresh a last-access stamp used for LRU eviction
+    once `max_entries` is exceeded, and hit/miss counts are kept per store.
+    Several processes can read and write the same file; SQLite's WAL journal serialises the writers.
+    """
+
+    def __init__(self, db_path, table="entries", default_ttl=24 * 3600, max_entries=None):
+        self.db_path = db_path
+        self.table = table
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with self._session() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "stored_at REAL NOT NULL, expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_expires ON {table} (expires_at)")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_access ON {table} (last_access)")
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {table}_stats (name TEXT PRIMARY KEY, count INTEGER NOT NULL)")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    @contextmanager
+    def _session(self):
+        """One transaction on a fresh connection, committed on success and always closed."""
+        conn = self._connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _count(self, conn, name, n):
+        if n:
+            conn.execute(
+                f"INSERT INTO {self.table}_stats (name, count) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET count = count + excluded.count",
+                (name, n),
+            )
+
+    def get_many(self, keys):
+        """Returns {key: value} for keys with an unexpired entry."""
+        keys = list(dict.fromkeys(keys))
+        now = time.time()
+        found = {}
+        with self._session() as conn:
+            for i in range(0, len(keys), _BATCH):
+                batch = keys[i:i + _BATCH]
+                marks = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT key, value FROM {self.table} WHERE key IN ({marks}) AND expires_at > ?",
+                    (*batch, now),
+                ).fetchall()
+                for key, value in rows:
+                    found[key] = json.loads(value)
+                if rows:
+                    conn.execute(
+                        f"UPDATE {self.table} SET last_access = ? WHERE key IN ({','.join('?' * len(rows))})",
+                        (now, *[key for key, _ in rows]),
+                    )
+
+            hits = len(found)
+            self.hits += hits
+            self.misses += len(keys) - hits
+            self._count(conn, "hits", hits)
+            self._count(conn, "misses", len(keys) - hits)
+        return found
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items, ttl=None):
+        """Upserts {key: value}; `ttl` in seconds (or a {key: seconds} dict) overrides the store default."""
+        if not items:
+            return
+        now = time.time()
+
+        def expiry(key):
+            seconds = ttl.get(key) if isinstance(ttl, dict) else ttl
+            return now + (self.default_ttl if seconds is None else seconds)
+
+        rows = [(key, json.dumps(value), now, expiry(key), now) for key, value in items.items()]
+        with self._session() as conn:
+            conn.executemany(
+                f"INSERT INTO {self.table} (key, value, stored_at, expires_at, last_access) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, stored_at = excluded.stored_at, "
+                "expires_at = excluded.expires_at, last_access = excluded.last_access",
+                rows,
+            )
+            self._evict(conn)
+
+    def put(self, key, value, ttl=None):
+        self.put_many({key: value}, ttl=ttl)
+
+    def delete(self, keys):
+        keys = list(keys)
+        with self._session() as conn:
+            for i in range(0, len(keys), _BATCH):
+                batch = keys[i:i + _BATCH]
+                conn.execute(f"DELETE FROM {self.table} WHERE key IN ({','.join('?' * len(batch))})", batch)
+
+    def entry(self, key):
+        """Stored value with its bookkeeping (stored_at, expires_at, last_access), expired or not."""
+        with self._session() as conn:
+            row = conn.execute(
+                f"SELECT value, stored_at, expires_at, last_access FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"value": json.loads(row[0]), "stored_at": row[1], "expires_at": row[2], "last_access": row[3]}
+
+    def items(self):
+        """All unexpired (key, value) pairs; does not count as hits or refresh access times."""
+        with self._session() as conn:
+            rows = conn.execute(
+                f"SELECT key, value FROM {self.table} WHERE expires_at > ?", (time.time(),)
+            ).fetchall()
+        return [(key, json.loads(value)) for key, value in rows]
+
+    def entries_since(self, stored_after):
+        """Unexpired (key, value, expires_at) stored after `stored_after`, for reloading only what changed."""
+        with self._session() as conn:
+            rows = conn.execute(
+                f"SELECT key, value, expires_at FROM {self.table} WHERE stored_at > ? AND expires_at > ?",
+                (stored_after, time.time()),
+            ).fetchall()
+        return [(key, json.loads(value), expires_at) for key, value, expires_at in rows]
+
+    def _evict(self, conn):
+        conn.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (time.time(),))
+        if self.max_entries is None:
+            return
+        (count,) = conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} ORDER BY last_access ASC LIMIT ?)",
+                (excess,),
+            )
+
+    def compact(self):
+        """Drops expired/excess entries and reclaims file space."""
+        with self._session() as conn:
+            self._evict(conn)
+        conn = self._connect()
+        try:
+            conn.execute("VACUUM")
+        finally:
+            conn.close()
+
+    def __len__(self):
+        with self._session() as conn:
+            (count,) = conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+        return count
+
+    def stats(self):
+        """Hit/miss counts for this instance and across every process that used the store."""
+        with self._session() as conn:
+            totals = dict(conn.execute(f"SELECT name, count FROM {self.table}_stats").fetchall())
+        return {
+            "entries": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "total_hits": totals.get("hits", 0),
+            "total_misses": totals.get("misses", 0),
+        }
@@ -0,0 +1,130 @@
+# parse_cache.py
+import os
+import json
+import hashlib
+import logging
+import pandas as pd
+
+from parsers import parse_log
+from parsers.parse_log import parse_log_file, PARSER_VERSION
+
+CACHE_DIR_NAME = ".parse_cache"
+INDEX_NAME = "index.json"
+
+logger = logging.getLogger(__name__)
+
+
+def compute_sha256(file_path):
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def parser_fingerprint():
+    """PARSER_VERSION plus a digest of the parser source, so edits to parse_log.py invalidate the cache too."""
+    source_digest = compute_sha256(parse_log.__file__)[:12]
+    return f"v{PARSER_VERSION}-{source_digest}"
+
+
+def _cache_dir(full_log_path):
+    return os.path.join(os.path.dirname(os.path.abspath(full_log_path)), CACHE_DIR_NAME)
+
+
+def _load_index(cache_dir):
+    path = os.path.join(cache_dir, INDEX_NAME)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_index(cache_dir, index):
+    path = os.path.join(cache_dir, INDEX_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(index, f, indent=4)
+    os.replace(tmp_path, path)
+
+
+def file_content_hash(full_log_path):
+    """
+    SHA-256 of the evidence file.
+    The digest is remembered next to the file's size and mtime, and only recomputed when either changes.
+    """
+    cache_dir = _cache_dir(full_log_path)
+    index = _load_index(cache_dir)
+    name = os.path.basename(full_log_path)
+    stat = os.stat(full_log_path)
+
+    entry = index.get(name)
+    if entry and entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns:
+        return entry["sha256"]
+
+    digest = compute_sha256(full_log_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    index[name] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest}
+    _save_index(cache_dir, index)
+
+    # the file's content changed, its old parse is unreachable unless another file has the same content
+    if entry and entry.get("sha256") != digest:
+        _remove_cached_parses(cache_dir, entry["sha256"], index)
+    return digest
+
+
+def _remove_cached_parses(cache_dir, digest, index):
+    if any(other.get("sha256") == digest for other in index.values()):
+        return
+    for name in os.listdir(cache_dir):
+        if name.startswith(digest + "_") and name.endswith(".parquet"):
+            os.remove(os.path.join(cache_dir, name))
+
+
+def _cache_path(full_log_path, digest):
+    return os.path.join(_cache_dir(full_log_path), f"{digest}_{parser_fingerprint()}.parquet")
+
+
+def load_cached_parse(full_log_path):
+    """Returns the cached parse of this exact file content and parser, or None."""
+    path = _cache_path(full_log_path, file_content_hash(full_log_path))
+    if not os.path.exists(path):
+        return None
+    try:
+        return pd.read_parquet(path)
+    except Exception as e:
+        logger.warning("Ignoring unreadable parse cache %s: %s", path, e)
+        return None
+
+
+def save_cached_parse(full_log_path, df):
+    """Stores a parsed DataFrame for this file; stale entries for the same content are removed."""
+    digest = file_content_hash(full_log_path)
+    path = _cache_path(full_log_path, digest)
+    tmp_path = path + ".tmp"
+    try:
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        # Mixed-type columns or a missing parquet engine just mean no cache
+        logger.warning("Could not write parse cache for %s: %s", full_log_path, e)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return None
+
+    cache_dir = _cache_dir(full_log_path)
+    for name in os.listdir(cache_dir):
+        if name.startswith(digest + "_") and name.endswith(".parquet") and os.path.join(cache_dir, name) != path:
+            os.remove(os.path.join(cache_dir, name))
+    return path
+
+
+def parse_log_file_cached(full_log_path, **kwargs):
+    df = load_cached_parse(full_log_path)
+    if df is None:
+        df = parse_log_file(full_log_path, **kwargs)
+        save_cached_parse(full_log_path, df)
+    return df
@@ -1,50 +1,279 @@
 # parse_log.py
+import io
 import os
+import json
 import re
+import mmap
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 
+LOG_PATTERN = re.compile(
+    r"(?P<timestamp>\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d+)\s+"     # timestamp
+    r"(?P<level>[A-Z])/"                                        # log level (D/I/W/E)
+    r"(?P<tag>[^\(]+)"                                          # tag before PID
+    r"\(\s*(?P<pid>\d+)\):\s+"                                  # PID
+    r"(?P<message>.*)"                                          # message
+)
+CLASS_METHOD_PATTERN = re.compile(r'\b[\w$]+\.[\w$]+\([^)]*\)')
+DOMAIN_PATTERN = re.compile(r"((?:[a-zA-Z0-9-]+\.)+[a-zA-Z]{2,})")
+
+# column order of a parsed logcat .txt file
+LOG_COLUMNS = ["timestamp", "level", "tag", "pid", "message", "class_method", "domain", "record_class", "ip"]
+
+DEFAULT_CHUNK_ROWS = 50_000
+
+# bump when the parsed output changes, cached parses from older versions are ignored
+PARSER_VERSION = 3
+
+# files smaller than this are parsed serially, process start-up would dominate
+PARALLEL_MIN_BYTES = 32 * 1024 * 1024
+
+# incremental parsing of continuous-capture segments, kept inside the capture folder
+PARSED_SEGMENTS_NAME = "parsed_segments.json"
+SEGMENT_ROWS_NAME = "parsed_segments.csv"
+
+HOSTNAME_PATTERN = re.compile(r"[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}")
+
+# DNS export header -> parsed column, in output order
+DNS_COLUMN_MAP = {
+    "Timestamp": "timestamp",
+    "Query Domain": "domain",
+    "Record Type": "record_type",
+    "Record Class": "record_class",
+    "Server": "server",
+    "Service": "service",
+    "Client IP": "client_ip",
+    "Port": "port",
+}
+DNS_COLUMNS = list(DNS_COLUMN_MAP.values()) + ["class_method", "pid", "ip"]
+
 def is_valid_hostname(domain):
-    return re.match(r"^[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$", domain) is not None
+    return HOSTNAME_PATTERN.fullmatch(domain) is not None
+
+def parse_log_line(line):
+    """Parses one logcat line into a row dict, or returns None if it is not a log entry."""
+    match = LOG_PATTERN.match(line)
+    if not match:
+        return None
+
+    data = match.groupdict()
+    msg = data["message"]
+
+    # Class + method extraction (like com.example.Class.method())
+    class_method = CLASS_METHOD_PATTERN.search(msg)
+    data["class_method"] = class_method.group(0) if class_method else None
 
-def parse_log_file(full_log_path):
-    parsed_logs = []
-    
+    # Domain extraction
+    domain_match = DOMAIN_PATTERN.search(msg)
+    domain = domain_match.group(1) if domain_match else None
+    data["domain"] = domain if domain and is_valid_hostname(domain) else None
+
+    # Fill blanks for consistency
+    data["record_class"] = None
+    data["ip"] = None
+    return data
+
+def _rows_to_frame(rows, columns=LOG_COLUMNS):
+    return pd.DataFrame(rows, columns=columns)
+
+def _parse_dns_rows(df_excel):
+    """Maps a DNS resolver export onto the parsed schema column by column."""
+    present = [col for col in DNS_COLUMN_MAP if col in df_excel.columns]
+    df = df_excel[present].rename(columns=DNS_COLUMN_MAP)
+
+    # Optional columns missing from the export are blank, like row.get(col, "")
+    for col in DNS_COLUMN_MAP.values():
+        if col not in df.columns:
+            df[col] = ""
+    for col in ["class_method", "pid", "ip"]:
+        df[col] = None
+
+    valid = df["domain"].astype(str).str.fullmatch(HOSTNAME_PATTERN.pattern, na=False)
+    df["domain"] = df["domain"].astype(object).where(valid, None)
+
+    return df[DNS_COLUMNS].reset_index(drop=True)
+
+def _check_dns_columns(df_excel):
+    required_cols = ["Timestamp", "Query Domain"]
+    for col in required_cols:
+        if col not in df_excel.columns:
+            raise ValueError(f"Required column '{col}' not found.")
+
+def iter_parse_log_file(full_log_path, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Streams a log file as DataFrame chunks of at most `chunk_rows` rows.
+    Columns match parse_log_file, so chunks can be concatenated or written out one by one.
+    """
     if not os.path.exists(full_log_path):
         raise FileNotFoundError(f"File '{full_log_path}' does not exist.")
+    if chunk_rows < 1:
+        raise ValueError("chunk_rows must be at least 1.")
 
     if full_log_path.endswith(".txt"):
-        # === Parse logcat-style .txt file ===
+        # === Parse logcat-style .txt file line by line ===
+        rows = []
+        emitted = False
         with open(full_log_path, "r", encoding="utf-8", errors="ignore") as f:
-            lines = f.readlines()
+            for line in f:
+                data = parse_log_line(line)
+                if data is None:
+                    continue
+                rows.append(data)
+                if len(rows) >= chunk_rows:
+                    yield _rows_to_frame(rows)
+                    emitted = True
+                    rows = []
 
-        log_pattern = re.compile(
-            r"(?P<timestamp>\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d+)\s+"     # timestamp
-            r"(?P<level>[A-Z])/"                                        # log level (D/I/W/E)
-            r"(?P<tag>[^\(]+)"                                          # tag before PID
-            r"\(\s*(?P<pid>\d+)\):\s+"                                  # PID
-            r"(?P<message>.*)"                                          # message
-        )
+        if rows or not emitted:
+            yield _rows_to_frame(rows)
 
-        for line in lines:
-            match = log_pattern.match(line)
-            if match:
-                data = match.groupdict()
-                msg = data["message"]
+    elif full_log_path.endswith(".csv"):
+        # === Parse DNS logs from CSV in chunks ===
+        with pd.read_csv(full_log_path, chunksize=chunk_rows) as reader:
+            for df_chunk in reader:
+                _check_dns_columns(df_chunk)
+                yield _parse_dns_rows(df_chunk)
 
-                # Class + method extraction (like com.example.Class.method())
-                class_method = re.findall(r'\b[\w$]+\.[\w$]+\([^)]*\)', msg)
-                data["class_method"] = class_method[0] if class_method else None
+    elif full_log_path.endswith(".xlsx"):
+        # Excel workbooks can't be read incrementally, slice after loading
+        df_excel = pd.read_excel(full_log_path)
+        _check_dns_columns(df_excel)
+        for start in range(0, max(len(df_excel), 1), chunk_rows):
+            yield _parse_dns_rows(df_excel.iloc[start:start + chunk_rows])
 
-                # Domain extraction
-                domain_match = re.search(r"((?:[a-zA-Z0-9-]+\.)+[a-zA-Z]{2,})", msg)
-                domain = domain_match.group(1) if domain_match else None
-                data["domain"] = domain if domain and is_valid_hostname(domain) else None
+    else:
+        raise ValueError("Unsupported file type. Only .txt, .xlsx, and .csv supported.")
 
-                # Fill blanks for consistency
-                data["record_class"] = None
-                data["ip"] = None
+def list_closed_segments(capture_dir):
+    """Finished continuous-capture segments in capture order; segments still being written end in .part."""
+    if not os.path.isdir(capture_dir):
+        return []
+    return sorted(f for f in os.listdir(capture_dir) if f.startswith("capture_") and f.endswith(".txt"))
 
-                parsed_logs.append(data)
+def iter_parse_new_segments(capture_dir, processed, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Parses closed capture segments that are not in `processed` yet, while capture keeps running.
+    Yields (segment_name, chunk) and adds each segment name to `processed` once it is fully read.
+    """
+    for name in list_closed_segments(capture_dir):
+        if name in processed:
+            continue
+        for chunk in iter_parse_log_file(os.path.join(capture_dir, name), chunk_rows=chunk_rows):
+            yield name, chunk
+        processed.add(name)
+
+def _save_parsed_segments(capture_dir, processed):
+    path = os.path.join(capture_dir, PARSED_SEGMENTS_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(sorted(processed), f, indent=4)
+    os.replace(tmp_path, path)
+
+def parse_new_segments(capture_dir, chunk_rows=DEFAULT_CHUNK_ROWS, progress=None):
+    """
+    Parses the closed capture segments no earlier call has parsed and appends their rows to
+    parsed_segments.csv in `capture_dir`; the names of parsed segments are kept in parsed_segments.json.
+    The segment still being written is left for a later call. `progress(segment_name, rows)` is called
+    per chunk. Returns the names of the segments parsed by this call.
+    """
+    state_path = os.path.join(capture_dir, PARSED_SEGMENTS_NAME)
+    processed = set()
+    if os.path.exists(state_path):
+        with open(state_path, "r") as f:
+            processed = set(json.load(f))
+    initial, saved = set(processed), set(processed)
+    rows_path = os.path.join(capture_dir, SEGMENT_ROWS_NAME)
+
+    for name, chunk in iter_parse_new_segments(capture_dir, processed, chunk_rows=chunk_rows):
+        # a finished segment is recorded before the next one's rows are written
+        if processed != saved:
+            _save_parsed_segments(capture_dir, processed)
+            saved = set(processed)
+        chunk.to_csv(rows_path, mode="a", index=False, header=not os.path.exists(rows_path))
+        if progress:
+            progress(name, len(chunk))
+    if processed != saved:
+        _save_parsed_segments(capture_dir, processed)
+    return sorted(processed - initial)
+
+def load_segment_rows(capture_dir):
+    """Every row parse_new_segments has parsed from `capture_dir` so far."""
+    rows_path = os.path.join(capture_dir, SEGMENT_ROWS_NAME)
+    if not os.path.exists(rows_path):
+        return _rows_to_frame([])
+    return pd.read_csv(rows_path)
+
+def _split_byte_ranges(full_log_path, parts):
+    """Splits a file into about `parts` byte ranges, each ending right after a newline."""
+    size = os.path.getsize(full_log_path)
+    if size == 0:
+        return []
+
+    with open(full_log_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        step = max(size // parts, 1)
+        ranges = []
+        start = 0
+        while start < size:
+            end = min(start + step, size)
+            if end < size:
+                newline = mm.find(b"\n", end - 1)
+                end = size if newline == -1 else newline + 1
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+def _parse_byte_range(args):
+    full_log_path, start, end = args
+    with open(full_log_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        raw = mm[start:end]
+
+    # Same decoding and newline handling as the serial text-mode reader
+    text = io.TextIOWrapper(io.BytesIO(raw), encoding="utf-8", errors="ignore")
+    rows = []
+    for line in text:
+        data = parse_log_line(line)
+        if data is not None:
+            rows.append(data)
+    return _rows_to_frame(rows)
+
+def parse_log_file_parallel(full_log_path, workers=None):
+    """
+    Parses a logcat .txt file across a process pool.
+    The file is memory-mapped and cut into newline-aligned byte ranges, results are merged in file order.
+    """
+    if not os.path.exists(full_log_path):
+        raise FileNotFoundError(f"File '{full_log_path}' does not exist.")
+    if not full_log_path.endswith(".txt"):
+        raise ValueError("Parallel parsing only supports logcat .txt files.")
+
+    workers = workers or os.cpu_count() or 1
+    # a few ranges per worker keeps the pool busy when line density is uneven
+    ranges = _split_byte_ranges(full_log_path, workers * 4)
+    if not ranges:
+        return _rows_to_frame([])
+
+    tasks = [(full_log_path, start, end) for start, end in ranges]
+    if workers == 1 or len(tasks) == 1:
+        frames = [_parse_byte_range(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            frames = list(pool.map(_parse_byte_range, tasks))
+
+    # a shard with no value in a column has it as object, infer again so dtypes match a single-frame parse
+    return pd.concat(frames, ignore_index=True).infer_objects()
+
+def parse_log_file(full_log_path, workers=1):
+    if not os.path.exists(full_log_path):
+        raise FileNotFoundError(f"File '{full_log_path}' does not exist.")
+
+    if full_log_path.endswith(".txt") and workers != 1 and os.path.getsize(full_log_path) >= PARALLEL_MIN_BYTES:
+        # === Large logcat file, shard across processes ===
+        df = parse_log_file_parallel(full_log_path, workers=workers)
+
+    elif full_log_path.endswith(".txt"):
+        # === Parse logcat-style .txt file ===
+        chunks = list(iter_parse_log_file(full_log_path))
+        df = pd.concat(chunks, ignore_index=True).infer_objects() if len(chunks) > 1 else chunks[0]
 
     elif full_log_path.endswith(".xlsx") or full_log_path.endswith(".csv"):
         # === Parse DNS logs from Excel or CSV ===
@@ -53,33 +282,10 @@ def parse_log_file(full_log_path):
         else:
             df_excel = pd.read_csv(full_log_path)
 
-        required_cols = ["Timestamp", "Query Domain"]
-        for col in required_cols:
-            if col not in df_excel.columns:
-                raise ValueError(f"Required column '{col}' not found.")
-
-        for _, row in df_excel.iterrows():
-            data = {
-                "timestamp": row.get("Timestamp", ""),
-                "domain": row.get("Query Domain", ""),
-                "record_type": row.get("Record Type", ""),
-                "record_class": row.get("Record Class", ""),
-                "server": row.get("Server", ""),
-                "service": row.get("Service", ""),
-                "client_ip": row.get("Client IP", ""),
-                "port": row.get("Port", ""),
-                "class_method": None,
-                "pid": None,
-                "ip": None
-            }
-
-            if not is_valid_hostname(str(data["domain"])):
-                data["domain"] = None
-
-            parsed_logs.append(data)
+        _check_dns_columns(df_excel)
+        df = _parse_dns_rows(df_excel)
 
     else:
         raise ValueError("Unsupported file type. Only .txt, .xlsx, and .csv supported.")
 
-    df = pd.DataFrame(parsed_logs)
     return df
@@ -1,69 +1,153 @@
 import os
+import time
+import copy
+import argparse
+import numpy as np
 import pandas as pd
-import json
-import joblib
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import classification_report
-from model_func.ensure_model_feature import ensure_model_features 
+from sklearn.metrics import classification_report, f1_score, accuracy_score
+from model_func.features import FEATURES
+from model_func.training_store import (
+    read_training_data, migrate_csv, partition_rows, row_fingerprints, store_revision,
+    TRAINING_STORE_DIR, LABEL_COLUMN
+)
+from model_func.model_registry import save_version, activate_version, active_version, load_version, load_model_params
+
+parser = argparse.ArgumentParser(description="Retrain the global suspicious-IP model from the training store.")
+parser.add_argument("--mode", choices=["full", "incremental"], default="full",
+                    help="full: retrain on all history; incremental: add trees trained only on rows stored since the active version")
+parser.add_argument("--add-trees", type=int, default=25, help="trees added per incremental run")
+parser.add_argument("--compare", action="store_true",
+                    help="train both a full and an incremental model and evaluate them on the same holdout of new rows")
+parser.add_argument("--sample-frac", type=float, default=None, help="train on this fraction of every case")
+parser.add_argument("--max-rows", type=int, default=None, help="down-sample evenly across cases to at most this many rows")
+cli = parser.parse_args()
 
 # === PATHS ===
 model_dir = r"D:\Projects\android-leak-tool\my_android_logs\models"
 global_dataset_path = os.path.join(model_dir, "global_training_data.csv")
-model_path = os.path.join(model_dir, "suspicious_model.pkl")
-scaler_path = os.path.join(model_dir, "scaler.pkl")
-feature_list_path = os.path.join(model_dir,"feature_list.json")
-
-#checking if global dataset exist or not
-if not os.path.exists(global_dataset_path):
-    raise FileNotFoundError(f"❌ Global training dataset not found at: {global_dataset_path}")
-
-df = pd.read_csv(global_dataset_path)
-if "is_suspicious" not in df.columns:
-    raise ValueError("⚠️ 'is_suspicious' column not found. This column is required for training.")
-
-print(f"Loaded global training data with {len(df)} rows.")
-
-#timestampa based features
-if 'timestamp' in df.columns:
-    df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
-    df['hour'] = df['timestamp'].dt.hour
-    df['dayofweek'] = df['timestamp'].dt.dayofweek
-    df['is_weekend'] = (df['dayofweek'] >= 5).astype(int)
-    df['flag_odd_hour'] = df['hour'].apply(lambda h: h < 5 or h > 23 if pd.notnull(h) else 0)
-
-# defing them
-features = [
-    'flag_uncommon_tld', 'domain_count', 'ip_count',
-    'flag_foreign_ip', 'abuse_score', 'hour',
-    'dayofweek', 'is_weekend', 'flag_odd_hour'
-]
-
-#aligning them using func
-with open(feature_list_path, "w") as f:
-    json.dump(features ,f)
-
-df = ensure_model_features(df, feature_list_path)
-
-#train 
-X = df[features].fillna(0)
-y = df["is_suspicious"].astype(int)
-
-scaler = StandardScaler()
-X_scaled = scaler.fit_transform(X)
-
-X_train, X_test, y_train, y_test = train_test_split(X_scaled, y, test_size=0.25, random_state=42)
-model = RandomForestClassifier(n_estimators=100, random_state=42)
-model.fit(X_train, y_train)
-
-# === Step 4: Evaluation ===
-y_pred = model.predict(X_test)
-print("\n📊 Classification Report:")
-print(classification_report(y_test, y_pred))
-
-# === Step 5: Save Model and Scaler ===
-joblib.dump(model, model_path)
-joblib.dump(scaler, scaler_path)
-print(f"\n✅ Model saved to → {model_path}")
-print(f"✅ Scaler saved to → {scaler_path}")
+training_store = os.path.join(model_dir, TRAINING_STORE_DIR)
+
+# the old append-only CSV is imported (deduplicated) once, then renamed
+migrated = migrate_csv(training_store, global_dataset_path)
+if migrated:
+    print(f"Migrated {migrated} unique rows from {global_dataset_path}")
+
+features = FEATURES
+label_columns = features + [LABEL_COLUMN]
+model_params = load_model_params(model_dir)
+
+
+def fit_full(train_df):
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(train_df[features].fillna(0))
+    # hyperparameters from the last select_model.py run, if there was one
+    model = RandomForestClassifier(**model_params, random_state=42, n_jobs=-1)
+    model.fit(X_scaled, train_df[LABEL_COLUMN].astype(int))
+    return model, scaler
+
+
+def fit_incremental(base_model, base_scaler, new_df, add_trees):
+    """Grows `add_trees` more trees on the new rows only; the scaler stays as the old trees saw it."""
+    y_new = new_df[LABEL_COLUMN].astype(int)
+    if set(np.unique(y_new)) != set(base_model.classes_):
+        raise ValueError("New rows do not contain every class the model knows, run a full retrain instead.")
+    model = copy.deepcopy(base_model)
+    model.set_params(warm_start=True, n_estimators=base_model.n_estimators + add_trees)
+    model.fit(base_scaler.transform(new_df[features].fillna(0)), y_new)
+    model.set_params(warm_start=False)
+    return model, base_scaler
+
+
+def evaluate(model, scaler, test_df):
+    if test_df.empty:
+        return {"holdout_rows": 0}, "(no holdout rows)"
+    y_true = test_df[LABEL_COLUMN].astype(int)
+    started = time.perf_counter()
+    y_pred = model.predict(scaler.transform(test_df[features].fillna(0)))
+    return {
+        "accuracy": round(accuracy_score(y_true, y_pred), 4),
+        "f1": round(f1_score(y_true, y_pred, zero_division=0), 4),
+        "predict_seconds": round(time.perf_counter() - started, 4),
+        "holdout_rows": len(test_df),
+    }, classification_report(y_true, y_pred, zero_division=0)
+
+
+def timed_fit(func, *args):
+    started = time.perf_counter()
+    model, scaler = func(*args)
+    return model, scaler, round(time.perf_counter() - started, 3)
+
+
+# what every new version was trained on, so the next incremental run knows where to start
+trained_on = {"store_revision": store_revision(training_store), "partition_rows": partition_rows(training_store)}
+active = active_version(model_dir)
+
+if cli.mode == "full" and not cli.compare:
+    # only the feature and label columns are read, optionally down-sampled
+    df = read_training_data(training_store, features=features, sample_frac=cli.sample_frac, max_rows=cli.max_rows)
+    if df.empty:
+        raise FileNotFoundError(f"❌ No training data found in: {training_store}")
+    print(f"Loaded global training data with {len(df)} rows.")
+
+    train_df, test_df = train_test_split(df, test_size=0.25, random_state=42)
+    model, scaler, fit_seconds = timed_fit(fit_full, train_df)
+    metrics, report = evaluate(model, scaler, test_df)
+    print("\n📊 Classification Report:")
+    print(report)
+
+    version = save_version(model_dir, model, scaler, features, "full",
+                           {**trained_on, "rows": len(train_df), "fit_seconds": fit_seconds, "params": model_params,
+                            "metrics": metrics})
+    activate_version(model_dir, version)
+    print(f"\n✅ Model version {version} trained in {fit_seconds}s and activated in → {model_dir}")
+
+else:
+    if active is None:
+        raise RuntimeError("❌ The active model has no version record, run a full retrain first.")
+    base_model, base_scaler, _ = load_version(model_dir, active["version"])
+
+    new_df = read_training_data(training_store, features=features, since_rows=active.get("partition_rows", {}),
+                                sample_frac=cli.sample_frac, max_rows=cli.max_rows)
+    if new_df.empty:
+        print(f"No training rows added since {active['version']}, nothing to do.")
+        raise SystemExit(0)
+    print(f"{len(new_df)} training rows added since {active['version']}.")
+
+    # a quarter of the new rows, chosen by row hash, is held out; the active model has never seen them
+    holdout_mask = row_fingerprints(new_df, label_columns) % 4 == 0
+    holdout_df, new_train_df = new_df[holdout_mask], new_df[~holdout_mask]
+
+    results = {}
+    inc_model, inc_scaler, inc_seconds = timed_fit(fit_incremental, base_model, base_scaler, new_train_df, cli.add_trees)
+    inc_metrics, inc_report = evaluate(inc_model, inc_scaler, holdout_df)
+    results["incremental"] = save_version(
+        model_dir, inc_model, inc_scaler, features, "incremental",
+        {**trained_on, "parent": active["version"], "rows": len(new_train_df), "fit_seconds": inc_seconds,
+         "n_estimators": inc_model.n_estimators, "metrics": inc_metrics}
+    )
+    print(f"\n📊 Incremental ({inc_model.n_estimators} trees, {inc_seconds}s fit) on {len(holdout_df)} holdout rows:")
+    print(inc_report)
+
+    if cli.compare:
+        all_df = read_training_data(training_store, features=features, sample_frac=cli.sample_frac, max_rows=cli.max_rows)
+        held_out = set(row_fingerprints(holdout_df, label_columns))
+        full_train_df = all_df[~pd.Series(row_fingerprints(all_df, label_columns)).isin(held_out).to_numpy()]
+        full_model, full_scaler, full_seconds = timed_fit(fit_full, full_train_df)
+        full_metrics, full_report = evaluate(full_model, full_scaler, holdout_df)
+        results["full"] = save_version(
+            model_dir, full_model, full_scaler, features, "full",
+            {**trained_on, "rows": len(full_train_df), "fit_seconds": full_seconds, "params": model_params,
+             "metrics": full_metrics}
+        )
+        print(f"\n📊 Full retrain ({full_seconds}s fit on {len(full_train_df)} rows) on the same holdout:")
+        print(full_report)
+        print(f"{'mode':<12}{'version':<20}{'fit s':>8}{'f1':>8}{'accuracy':>10}")
+        for mode, metrics, seconds in [("incremental", inc_metrics, inc_seconds), ("full", full_metrics, full_seconds)]:
+            print(f"{mode:<12}{results[mode]:<20}{seconds:>8}{metrics.get('f1', '-'):>8}{metrics.get('accuracy', '-'):>10}")
+
+    chosen = results[cli.mode]
+    activate_version(model_dir, chosen)
+    print(f"\n✅ Model version {chosen} activated in → {model_dir}")
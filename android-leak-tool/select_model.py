@@ -0,0 +1,99 @@
+import os
+import time
+import argparse
+import tempfile
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import GridSearchCV, StratifiedKFold
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from model_func.features import FEATURES
+from model_func.training_store import read_training_data, migrate_csv, TRAINING_STORE_DIR, LABEL_COLUMN
+from model_func.model_registry import save_model_config, MODEL_CONFIG_NAME
+
+# candidate RandomForest settings; the current fixed model (100 trees, no limits) is the first one
+PARAM_GRID = {
+    "model__n_estimators": [100, 200],
+    "model__max_depth": [None, 10, 20],
+    "model__min_samples_leaf": [1, 3],
+    "model__class_weight": [None, "balanced"],
+}
+
+parser = argparse.ArgumentParser(description="Cross-validated hyperparameter search for the suspicious-IP model.")
+parser.add_argument("--folds", type=int, default=5)
+parser.add_argument("--scoring", default="f1", choices=["f1", "roc_auc", "accuracy"], help="metric that picks the winner")
+parser.add_argument("--max-rows", type=int, default=None, help="down-sample the training store to at most this many rows")
+parser.add_argument("--n-jobs", type=int, default=-1, help="parallel fits, -1 uses every core")
+cli = parser.parse_args()
+
+# === PATHS ===
+model_dir = r"D:\Projects\android-leak-tool\my_android_logs\models"
+training_store = os.path.join(model_dir, TRAINING_STORE_DIR)
+migrate_csv(training_store, os.path.join(model_dir, "global_training_data.csv"))
+
+df = read_training_data(training_store, features=FEATURES, max_rows=cli.max_rows)
+if df.empty:
+    raise FileNotFoundError(f"❌ No training data found in: {training_store}")
+X = df[FEATURES].fillna(0)
+y = df[LABEL_COLUMN].astype(int)
+print(f"Loaded {len(df)} training rows, {int(y.sum())} suspicious.")
+
+# folds are split once and reused by every candidate
+folds = list(StratifiedKFold(n_splits=cli.folds, shuffle=True, random_state=42).split(X, y))
+
+with tempfile.TemporaryDirectory() as cache_dir:
+    # the fitted scaler (and so the scaled matrix) of each fold is cached on disk and shared by all candidates
+    pipeline = Pipeline([
+        ("scaler", StandardScaler()),
+        ("model", RandomForestClassifier(random_state=42, n_jobs=1)),
+    ], memory=cache_dir)
+    search = GridSearchCV(
+        pipeline, PARAM_GRID, cv=folds, n_jobs=cli.n_jobs, refit=cli.scoring,
+        scoring={"f1": "f1", "roc_auc": "roc_auc", "accuracy": "accuracy"},
+    )
+    started = time.perf_counter()
+    search.fit(X, y)
+    search_seconds = time.perf_counter() - started
+
+results = pd.DataFrame(search.cv_results_)
+fold_rows = len(df) / cli.folds
+report = pd.DataFrame({
+    "n_estimators": results["param_model__n_estimators"],
+    "max_depth": results["param_model__max_depth"],
+    "min_samples_leaf": results["param_model__min_samples_leaf"],
+    "class_weight": results["param_model__class_weight"],
+    "f1": results["mean_test_f1"].round(4),
+    "f1_std": results["std_test_f1"].round(4),
+    "roc_auc": results["mean_test_roc_auc"].round(4),
+    "accuracy": results["mean_test_accuracy"].round(4),
+    "fit_s": results["mean_fit_time"].round(3),
+    # scoring predicts one test fold (labels and probabilities for all three metrics)
+    "score_ms_per_1k": (results["mean_score_time"] / fold_rows * 1e6).round(3),
+    "rank": results[f"rank_test_{cli.scoring}"],
+}).sort_values("rank", kind="stable")
+
+# plain predict latency of the refitted winner, the number that matters for flag_suspicious_ips
+batch = X.iloc[:1000]
+started = time.perf_counter()
+search.best_estimator_.predict(batch)
+predict_ms_per_1k = (time.perf_counter() - started) * 1000 * 1000 / max(len(batch), 1)
+
+pd.set_option("display.width", 200)
+print(f"\n📊 {len(report)} candidates x {cli.folds} folds in {search_seconds:.1f}s (ranked by {cli.scoring}):")
+print(report.head(10).to_string(index=False))
+
+best = {k.replace("model__", ""): v for k, v in search.best_params_.items()}
+best_row = report.loc[search.best_index_]
+path = save_model_config(model_dir, best, {
+    "scoring": cli.scoring,
+    "cv_score": float(search.best_score_),
+    "folds": cli.folds,
+    "rows": len(df),
+    "fit_seconds": float(best_row["fit_s"]),
+    "predict_ms_per_1k": round(predict_ms_per_1k, 3),
+    "search_seconds": round(search_seconds, 2),
+})
+print(f"\nBest: {cli.scoring} {search.best_score_:.4f}, fit {best_row['fit_s']}s per fold, "
+      f"predict {predict_ms_per_1k:.1f} ms per 1k rows")
+print(f"✅ Best configuration {best} written to → {path}")
+print(f"retrain_model.py and model_ai.py now train with it; delete {MODEL_CONFIG_NAME} to go back to the defaults.")
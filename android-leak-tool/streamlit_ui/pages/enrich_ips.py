@@ -7,7 +7,8 @@ from datetime import time
 import altair as alt
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
-from model_func.enrich_func import enrich_suspicious_ips as s
+from model_func.enrich_func import enrich_suspicious_ips as s, ENRICH_PROVIDERS, MODELS_DIR
+from model_func.offline_ipdb import build_offline_db, OfflineIPDB, OFFLINE_DB_DIR
 
 
 # Initialize session variable safely
@@ -61,10 +62,49 @@ st.subheader(f"Case Name: `{case_name}`")
 st.write(f"Case Path: `{case_folder}`")
 st.write(f"Detected `{len(suspicious_ips)}` suspicious IPs to process.")
 
+provider = st.selectbox(
+    "Lookup source",
+    options=ENRICH_PROVIDERS,
+    format_func={"auto": "Online, offline database as fallback", "online": "Online only", "offline": "Offline database only"}.get
+)
+
+offline_db_dir = os.path.join(MODELS_DIR, OFFLINE_DB_DIR)
+with st.expander("Offline IP database"):
+    if OfflineIPDB.open(offline_db_dir) is None:
+        st.write(f"No offline database built yet in `{offline_db_dir}`.")
+    else:
+        st.write(f"Offline database in `{offline_db_dir}`.")
+    geo_dump = st.text_input("Geo range dump (.csv/.tsv path)", value="")
+    asn_dump = st.text_input("ASN range dump (.csv/.tsv path)", value="")
+    tab_separated = st.checkbox("Tab-separated")
+    if st.button("Build Offline Database"):
+        if not geo_dump.strip() and not asn_dump.strip():
+            st.warning("Enter at least one range dump path.")
+        else:
+            try:
+                with st.spinner("Building offline IP database..."):
+                    built = build_offline_db(offline_db_dir, geo_csv=geo_dump.strip() or None,
+                                             asn_csv=asn_dump.strip() or None, sep="\t" if tab_separated else ",")
+                st.success(f"Built offline database ({', '.join(built)}) in `{offline_db_dir}`.")
+            except (OSError, ValueError) as e:
+                st.error(f"❌ Could not build the offline database: {e}")
+
 # start process
 if st.button("Start Enrichment"):
     with st.spinner("Fetching GeoIP & WHOIS details..."):
-        new_count = s(suspicious_ips, case_folder)
+        progress_bar = st.progress(0.0, text="Starting lookups...")
+
+        def show_progress(done, total):
+            progress_bar.progress(done / total if total else 1.0, text=f"{done}/{total} lookups done")
+
+        run_stats = {}
+        new_count = s(suspicious_ips, case_folder, progress=show_progress, stats=run_stats, provider=provider)
+        progress_bar.empty()
+    if run_stats.get("whois_needed"):
+        st.caption(
+            f"WHOIS: {run_stats['whois_network_hits']} of {run_stats['whois_needed']} answered from known networks "
+            f"({run_stats['network_hit_rate']:.0%} hit rate), {run_stats['whois_rdap_calls']} RDAP calls"
+        )
     if new_count == 0:
         st.success(" No new suspicious IPs found. Master list already up to date.")
     else:
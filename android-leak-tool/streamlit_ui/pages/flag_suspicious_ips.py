@@ -1,11 +1,12 @@
 import streamlit as st
 import pandas as pd
 import os
-import joblib
 import subprocess
 import altair as alt
-import json
-from model_func.ensure_model_feature import ensure_model_features 
+from model_func.model_server import get_model, predict_frame, latency_stats
+from model_func.features import build_features, HOME_COUNTRY
+from model_func.enrich_func import known_countries
+from model_func.training_store import append_case, migrate_csv, TRAINING_STORE_DIR
 
 st.markdown("""
     <div style='text-align: center; padding: 10px 0 5px 0;'>
@@ -33,13 +34,10 @@ st.write(f"Case Path: `{case_path}`")
 if st.button("Start Processing"):
  with st.spinner("Scanning for suspicious activity..."):
   global_model_dir = r"D:\Projects\android-leak-tool\my_android_logs\models"
-  model_path = os.path.join(global_model_dir, "suspicious_model.pkl")
-  scaler_path = os.path.join(global_model_dir, "scaler.pkl")
-  feature_list_path = os.path.join(global_model_dir, "feature_list.json")
 
+  # loaded once per process and reloaded only after the global model is retrained
   try:
-    model = joblib.load(model_path)
-    scaler = joblib.load(scaler_path)
+    bundle = get_model(global_model_dir)
   except Exception as e:
     st.error(f"❌ Could not load model or scaler from 'models' folder:\n{e}")
     st.stop()
@@ -47,26 +45,19 @@ if st.button("Start Processing"):
   # Load and preprocess log file
   df = pd.read_csv(log_file)
 
-  #Time-based feature engineering (before feature alignment)
-  if 'timestamp' in df.columns:
-    df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
-    df['hour'] = df['timestamp'].dt.hour
-    df['dayofweek'] = df['timestamp'].dt.dayofweek
-    df['is_weekend'] = (df['dayofweek'] >= 5).astype(int)
-    df['flag_odd_hour'] = df['hour'].apply(lambda h: h < 5 or h > 23 if pd.notnull(h) else 0)
+  # Same feature engineering the model was trained with (before feature alignment);
+  # countries of IPs enriched in earlier cases feed flag_foreign_ip
+  countries = known_countries()
+  df = build_features(df, countries=countries)
+  if not HOME_COUNTRY:
+    st.warning("⚠️ HOME_COUNTRY is not set, flag_foreign_ip is 0 for every row. "
+               "Set it to the country code the device is expected to talk to (e.g. HOME_COUNTRY=IN).")
+  elif "country" not in df.columns and not df["ip"].isin(countries.keys()).any():
+    st.warning("⚠️ No enriched country is known for these IPs yet, flag_foreign_ip is 0 for every row.")
 
-  # Align features with model
-  df = ensure_model_features(df, feature_list_path)
-  with open(feature_list_path, "r") as f:
-    expected_features = json.load(f)
-
-  # Extract features for model prediction
-  X = df[expected_features].fillna(0)
-  X_scaled = scaler.transform(X)
-
-  
-  df['predicted_suspicious'] = model.predict(X_scaled)
-  df['suspicion_probability'] = model.predict_proba(X_scaled)[:, 1]
+  # Align features with the model and predict in one batch, with the same bundle the training rows use below
+  df = predict_frame(df, bundle=bundle)
+  expected_features = bundle.features
 
   flagged_df = df[df['predicted_suspicious'] == 1]
   flagged_path = os.path.join(case_path, "ml_flagged_suspicious.csv")
@@ -95,21 +86,21 @@ if st.button("Start Processing"):
   ranked_path = os.path.join(case_path, "ranked_suspicious_ips.csv")
   ranked.to_csv(ranked_path, index=False)
 
-    # Append data to global training file
-  global_data_path = os.path.join(global_model_dir, "global_training_data.csv")
+    # Add this case to the global training store (re-flagging a case adds no duplicate rows)
+  training_store = os.path.join(global_model_dir, TRAINING_STORE_DIR)
+  migrate_csv(training_store, os.path.join(global_model_dir, "global_training_data.csv"))
   df_training = df[expected_features].copy()
   df_training['is_suspicious'] = df['predicted_suspicious']
-
-  df_training.to_csv(
-        global_data_path,
-        mode='a',
-        index=False,
-        header=not os.path.exists(global_data_path)
-    )
+  append_case(training_store, case_name, df_training, features=expected_features)
     # st.success("✅ Case data appended to global training set.")            for my reference
  
     # === Display Output ===
   st.success(f"{len(flagged_df)} suspicious IPs flagged.")
+  latency = latency_stats()
+  st.caption(
+      f"Model loads in this process: {latency['loads']} (last {latency['last_load_seconds']:.2f}s), "
+      f"cold predict {latency['cold_predict_seconds'] or 0:.3f}s, warm predict {latency['warm_predict_seconds'] or 0:.3f}s"
+  )
   st.subheader("📊 Top Ranked Suspicious IPs")
   st.dataframe(ranked.sort_values(by="suspicion_probability", ascending=False).head(10))
   with st.expander("📁 View full file location for ranked suspicious IPs"):
@@ -1,8 +1,14 @@
 import streamlit as st
 import os
 import re
+import sys
 import pandas as pd
 
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+from evidence_manifest import verify_case, verify_ranges, latest_records, MANIFEST_NAME
+
 
 def sanitize_key(name):
     return re.sub(r"\W|^(?=\d)", "_", name)
@@ -25,6 +31,48 @@ case_name = os.path.basename(case_path)
 st.markdown(f"### Case Name - `{case_name}`")
 st.markdown(f"**Case Path:** `{case_path}`")
 
+# === Evidence integrity, checked before anything is exported ===
+integrity_failed = []
+manifest_path = os.path.join(case_path, MANIFEST_NAME)
+if os.path.exists(manifest_path):
+    reverify = st.button("🔁 Re-verify Evidence")
+    # verified once per case and manifest state, again when new evidence is recorded or on request
+    stamp = (case_path, os.path.getmtime(manifest_path))
+    if reverify or st.session_state.get("integrity_stamp") != stamp:
+        with st.spinner("Verifying evidence files against the manifest..."):
+            st.session_state.integrity_results = verify_case(case_path)
+        st.session_state.integrity_stamp = stamp
+
+    integrity_results = st.session_state.integrity_results
+    integrity_failed = [r for r in integrity_results if not r["ok"]]
+    if integrity_failed:
+        st.error(f"❌ {len(integrity_failed)} of {len(integrity_results)} evidence files do not match the manifest.")
+        st.dataframe(pd.DataFrame([{
+            "file": r["file"],
+            "missing": r["missing"],
+            "size_changed": r["size_changed"],
+            "bad_chunks": len(r["bad_chunks"]),
+            "manifest_root_valid": r["root_valid"],
+        } for r in integrity_failed]), use_container_width=True)
+    else:
+        st.success(f"🔒 All {len(integrity_results)} evidence files match the manifest.")
+
+    # only the chunks holding the chosen bytes are re-hashed, quick even on multi-GB logs
+    with st.expander("🔎 Check part of a file"):
+        records = latest_records(case_path)
+        spot_file = st.selectbox("Evidence file", sorted(records))
+        size_mb = max(records[spot_file]["size"] / (1024 * 1024), 0.01)
+        start_mb, end_mb = st.slider("Byte range (MB)", 0.0, size_mb, (0.0, min(size_mb, 16.0)))
+        if st.button("Check Range"):
+            spot = verify_ranges(case_path, spot_file, [(int(start_mb * 1024 * 1024), int(end_mb * 1024 * 1024))])
+            if spot["ok"]:
+                st.success(f"🔒 {spot['checked_chunks']} chunks of `{spot_file}` match the manifest.")
+            else:
+                st.error(f"❌ `{spot_file}`: missing={spot['missing']}, size_changed={spot['size_changed']}, "
+                         f"bad chunks {spot['bad_chunks']} of {spot['checked_chunks']} checked.")
+else:
+    st.info("No evidence manifest in this case, file integrity can't be verified.")
+
 files =[
     f for f in os.listdir(case_path)
     if os.path.isfile(os.path.join(case_path , f)) and f.lower().endswith((".csv", ".xlsx", ".txt"))
@@ -85,6 +133,8 @@ else:
                         ).strip() or "filtered_report"
 
                         csv_data = filtered_df.to_csv(index=False).encode("utf-8")
+                        if integrity_failed:
+                            st.warning("⚠️ Evidence in this case failed verification, see the integrity check above.")
 
                         st.download_button(
                             label="📥 DOWNLOAD CSV",
@@ -1,6 +1,7 @@
 import streamlit as st
 import os
 import sys
+import threading
 
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
 if PROJECT_ROOT not in sys.path:
@@ -28,7 +29,7 @@ st.subheader("Choose Log Input Method")
 
 input_method = st.radio(
     "How do you want to add logs?",
-    options=["Extract from Android phone", "Upload log files manually"]
+    options=["Extract from Android phone", "Continuous capture from Android phone", "Upload log files manually"]
 )
 
 # Manual Upload
@@ -100,6 +101,41 @@ elif input_method == "Extract from Android phone":
         except Exception as e:
             st.error(f"Failed to extract logs: {e}")
 
+# Continuous capture
+elif input_method == "Continuous capture from Android phone":
+    st.write("Streams logcat into rotating segment files under `live_capture/` until stopped. "
+             "Capture resumes by itself if the phone is unplugged and reconnected.")
+
+    capture = st.session_state.get("live_capture")
+    running = capture is not None and capture["thread"].is_alive()
+
+    if not running:
+        if st.button("▶️ Start Capture"):
+            from extract_logs import capture_continuous
+            stop_event = threading.Event()
+            thread = threading.Thread(
+                target=capture_continuous,
+                args=(st.session_state.case_path,),
+                kwargs={"stop_event": stop_event},
+                daemon=True
+            )
+            thread.start()
+            st.session_state.live_capture = {"thread": thread, "stop_event": stop_event}
+            st.rerun()
+    else:
+        st.success("Capture running...")
+        if st.button("⏹️ Stop Capture"):
+            capture["stop_event"].set()
+            capture["thread"].join(timeout=10)
+            st.rerun()
+
+    capture_dir = os.path.join(st.session_state.case_path, "live_capture")
+    if os.path.isdir(capture_dir):
+        segments = sorted(f for f in os.listdir(capture_dir) if f.startswith("capture_") and f.endswith(".txt"))
+        st.markdown(f"**Closed segments:** `{len(segments)}`")
+        for f in segments[-5:]:
+            st.markdown(f"• `{f}`")
+
 # Back Button 
 if st.button("⬅️ Back to Case View"):
     st.switch_page("pages/case_creation.py")
\ No newline at end of file
@@ -1,12 +1,16 @@
 import streamlit as st
 import os
 import sys
-import socket
 import pandas as pd
 
 # Add parser path
 sys.path.append(os.path.abspath(os.path.join(__file__, "..", "..", "..")))
-from parsers.parse_log import parse_log_file
+from parsers.parse_log import (
+    iter_parse_log_file, parse_log_file, parse_new_segments, load_segment_rows, list_closed_segments,
+    PARALLEL_MIN_BYTES
+)
+from parsers.parse_cache import load_cached_parse, save_cached_parse
+from model_func.dns_resolver import resolve_dataframe, open_dns_cache
 
 st.set_page_config(page_title="Parse logs", layout="centered")
 st.title("EXTRACT AND RESOLVE IP's")
@@ -35,12 +39,47 @@ st.markdown(f"### Case Name - `{case_name}`")
 
 # === Show available log files ===
 log_files = [f for f in os.listdir(case_path) if f.endswith((".txt", ".xlsx", ".csv"))]
+# segments of a continuous capture are parsed as they close, each one only once
+capture_dir = os.path.join(case_path, "live_capture")
+LIVE_CAPTURE_OPTION = "live_capture/ (closed capture segments)"
+if list_closed_segments(capture_dir):
+    log_files.append(LIVE_CAPTURE_OPTION)
 selected_file = st.selectbox("Choose a log file to parse", log_files)
+# Large logcat .txt files are split across this many processes
+workers = st.number_input("Parser processes", min_value=1, max_value=os.cpu_count() or 1, value=os.cpu_count() or 1)
 
 # === Parse button ===
 if st.button("Parse"):
     full_path = os.path.join(case_path, selected_file)
-    df = parse_log_file(full_path)
+
+    live_capture = selected_file == LIVE_CAPTURE_OPTION
+    # Reuse an earlier parse of the same file content if there is one
+    df = None if live_capture else load_cached_parse(full_path)
+    if live_capture:
+        # Only segments closed since the last parse are read, rows parsed earlier are reused
+        with st.spinner("Parsing new capture segments..."):
+            new_segments = parse_new_segments(capture_dir)
+            df = load_segment_rows(capture_dir)
+        st.info(f"Parsed {len(new_segments)} new segment(s); the segment still being captured is parsed next time.")
+    elif df is not None:
+        st.info("Loaded from parse cache.")
+    elif full_path.endswith(".txt") and workers > 1 and os.path.getsize(full_path) >= PARALLEL_MIN_BYTES:
+        # Large logcat file, sharded across a process pool
+        with st.spinner(f"Parsing with {workers} processes..."):
+            df = parse_log_file(full_path, workers=int(workers))
+        save_cached_parse(full_path, df)
+    else:
+        # Stream the file in chunks so raw text is never held in memory
+        progress_text = st.empty()
+        chunks = []
+        parsed_rows = 0
+        for chunk in iter_parse_log_file(full_path):
+            chunks.append(chunk)
+            parsed_rows += len(chunk)
+            progress_text.text(f"Parsed {parsed_rows} entries so far...")
+        progress_text.empty()
+        df = pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+        save_cached_parse(full_path, df)
     st.session_state["parsed_df"] = df
     st.session_state["case_path"] = case_path  # Persist case_path
 
@@ -55,13 +94,12 @@ if "parsed_df" in st.session_state:
 
         # Spinner while resolving
         with st.spinner("Resolving domains to IPs..."):
-            def resolve_domain(domain):
-                try:
-                    return socket.gethostbyname(domain)
-                except Exception:
-                    return None
-
-            df["ip"] = df["domain"].apply(lambda d: resolve_domain(d) if pd.notna(d) else None)
+            # Each distinct domain is looked up once, concurrently, and answers
+            # are shared with the other cases through the DNS cache
+            dns_cache = open_dns_cache(os.path.dirname(case_path))
+            df = resolve_dataframe(df, cache=dns_cache)
+            cache_stats = dns_cache.stats()
+            st.caption(f"DNS cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
 
             resolved_count = df["ip"].notna().sum()
 
@@ -71,11 +109,11 @@ if "parsed_df" in st.session_state:
                 st.success(f"{resolved_count} IPs resolved. File saved as **resolved_dns_log.csv**")
 
                 # Ensure required columns
-                for col in ["timestamp", "domain", "record_class", "ip", "pid"]:
+                for col in ["timestamp", "domain", "record_class", "ip", "pid", "all_ips"]:
                     if col not in df.columns:
                         df[col] = None
 
-                output_df = df[["timestamp", "domain", "record_class", "ip", "pid"]]
+                output_df = df[["timestamp", "domain", "record_class", "ip", "pid", "all_ips"]]
                 output_df = output_df.sort_values(by="ip", ascending=False, na_position="last")
 
                 resolved_path = os.path.join(case_path, "resolved_dns_log.csv")
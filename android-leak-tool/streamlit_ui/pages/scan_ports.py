@@ -1,7 +1,8 @@
 import streamlit as st
 import os
 import pandas as pd
-from model_func.nmap_scanner import scan_ips_from_file
+from model_func.nmap_scanner import scan_ips_from_file, open_scan_cache, SCAN_PROFILES
+from model_func.scan_scheduler import scheduled_scan
 
 st.set_page_config(page_title="Port Scan", layout="wide")
 
@@ -38,23 +39,78 @@ if "port_scan_df" not in st.session_state:
     st.session_state.port_scan_df = None
 if "port_scan_msg" not in st.session_state:
     st.session_state.port_scan_msg = ""
+if "port_scan_stats" not in st.session_state:
+    st.session_state.port_scan_stats = {}
+
+cols = st.columns(2)
+with cols[0]:
+    profile = st.selectbox(
+        "Scan profile", SCAN_PROFILES, index=0,
+        help="two-phase: quick open-port sweep of every host, then version detection only on open ports"
+    )
+with cols[1]:
+    budget_minutes = st.number_input(
+        "Time budget (minutes, 0 = scan everything)", min_value=0, value=0, step=5,
+        help="Scans the highest-risk IPs first and stops when the budget runs out"
+    )
 
 if st.button("🚀 Run Port Scan"):
+    progress_bar = st.progress(0.0, text="Starting scan...")
+    live_table = st.empty()
+    live_rows = []
+
+    # results are appended to the CSV host by host; an interrupted scan resumes from its checkpoint
+    def show_progress(done, total, records):
+        live_rows.extend(records)
+        progress_bar.progress(done / total if total else 1.0, text=f"Scanned {done} of {total} IPs")
+        if live_rows:
+            live_table.dataframe(pd.DataFrame(live_rows)[["ip", "port", "state", "service", "banner", "risk_level"]],
+                                 use_container_width=True)
+
     with st.spinner("Scanning all suspicious IPs...processing may take longer than usual...😞"):
-        cache_file = os.path.join(case_path, "port_scan_cache.json")
-        df, msg = scan_ips_from_file(ip_input_file, output_csv)
+        # hosts scanned recently, in this or any other case, are not scanned again
+        scan_cache = open_scan_cache(os.path.dirname(case_path))
+        st.session_state.port_scan_stats = {}
+        if budget_minutes:
+            ranked_csv = os.path.join(case_path, "ranked_suspicious_ips.csv")
+            df, msg = scheduled_scan(ip_input_file, output_csv, ranked_csv=ranked_csv,
+                                     budget_seconds=budget_minutes * 60, cache=scan_cache, profile=profile,
+                                     stats=st.session_state.port_scan_stats, progress=show_progress)
+        else:
+            df, msg = scan_ips_from_file(ip_input_file, output_csv, cache=scan_cache, profile=profile,
+                                         stats=st.session_state.port_scan_stats, progress=show_progress)
         if not df.empty:
             st.session_state.port_scan_df = df
             st.session_state.port_scan_msg = msg
         else:
             st.session_state.port_scan_df = None
             st.session_state.port_scan_msg = msg
+    progress_bar.empty()
+    live_table.empty()
             
 if st.session_state.port_scan_df is not None:
     df = st.session_state.port_scan_df
     msg = st.session_state.port_scan_msg
     st.success(msg)
 
+    scan_stats = st.session_state.port_scan_stats
+    if scan_stats.get("scanned"):
+        if scan_stats.get("profile") == "two-phase":
+            st.caption(
+                f"Discovery {scan_stats['discovery_seconds']}s over {scan_stats['hosts_discovered']} hosts, "
+                f"version detection {scan_stats['version_seconds']}s on {scan_stats['open_ports']} open ports "
+                f"({scan_stats['hosts_with_open_ports']} hosts), total {scan_stats['total_seconds']}s"
+            )
+        elif scan_stats.get("profile") == "budgeted":
+            st.caption(
+                f"Scanned {scan_stats['scanned']} hosts ({scan_stats['scan_profile']} profile) in "
+                f"{scan_stats['total_seconds']}s of a "
+                f"{scan_stats['budget_seconds']}s budget, {scan_stats['unscanned']} left unscanned, "
+                f"per-host timeout settled at {scan_stats['host_timeout']}s"
+            )
+        else:
+            st.caption(f"Scanned {scan_stats['scanned']} hosts in {scan_stats['total_seconds']}s")
+
     st.subheader("Filter Results Before Download")
 
     cols = st.columns(2)
@@ -75,11 +131,14 @@ if st.session_state.port_scan_df is not None:
     display_df = filtered_df.rename(columns={
         "ip": "IP",
         "port": "Port",
+        "protocol": "Protocol",
+        "state": "State",
         "service": "Service",
         "banner": "Banner / Version",
         "risk_level": "Risk Level",
-        "threat": "Threat"
-    })[["IP", "Port", "Service", "Banner / Version", "Risk Level", "Threat"]]
+        "threat": "Threat",
+        "scripts": "Script Output"
+    })[["IP", "Port", "Protocol", "State", "Service", "Banner / Version", "Risk Level", "Threat", "Script Output"]]
 
     if not display_df.empty:
         st.markdown("### 📋 Filtered Scan Results")
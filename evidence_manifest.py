@@ -0,0 +1,211 @@
+# evidence_manifest.py
+# Append-only, chunked Merkle-tree manifest of the evidence files in a case folder.
+
+import os
+import mmap
+import json
+import hashlib
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+MANIFEST_NAME = "evidence_manifest.jsonl"
+CHUNK_SIZE = 4 * 1024 * 1024
+
+# domain-separated hashing so a leaf can never be passed off as an inner node
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+
+
+def hash_leaf(data):
+    leaf = hashlib.sha256(LEAF_PREFIX)
+    leaf.update(data)
+    return leaf.hexdigest()
+
+
+def merkle_root(chunk_hashes):
+    """Root over the leaf digests; an odd node at the end of a level moves up unchanged."""
+    if not chunk_hashes:
+        return hashlib.sha256(LEAF_PREFIX).hexdigest()
+    level = [bytes.fromhex(h) for h in chunk_hashes]
+    while len(level) > 1:
+        parents = [hashlib.sha256(NODE_PREFIX + level[i] + level[i + 1]).digest() for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            parents.append(level[-1])
+        level = parents
+    return level[0].hex()
+
+
+class MerkleBuilder:
+    """Builds chunk hashes, the Merkle root and a whole-file SHA-256 from data fed in any slice sizes."""
+
+    def __init__(self, chunk_size=CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.chunk_hashes = []
+        self.size = 0
+        self._sha256 = hashlib.sha256()
+        self._buffer = bytearray()
+
+    def update(self, data):
+        self._sha256.update(data)
+        self.size += len(data)
+        self._buffer += data
+        while len(self._buffer) >= self.chunk_size:
+            self.chunk_hashes.append(hash_leaf(bytes(self._buffer[:self.chunk_size])))
+            del self._buffer[:self.chunk_size]
+
+    def finish(self):
+        if self._buffer or not self.chunk_hashes:
+            self.chunk_hashes.append(hash_leaf(bytes(self._buffer)))
+            self._buffer = bytearray()
+        return {
+            "size": self.size,
+            "sha256": self._sha256.hexdigest(),
+            "chunk_size": self.chunk_size,
+            "chunk_hashes": self.chunk_hashes,
+            "merkle_root": merkle_root(self.chunk_hashes),
+        }
+
+
+def _chunk_count(size, chunk_size):
+    return max((size + chunk_size - 1) // chunk_size, 1)
+
+
+def _hash_chunks(path, chunk_size, indexes, workers, limit=None):
+    """
+    Hashes the given chunk indexes of a file in parallel (hashlib releases the GIL on large buffers).
+    `limit` ends the last chunk at that byte, e.g. the recorded size of a file that has grown since.
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        return {0: hash_leaf(b"")}
+    limit = size if limit is None else min(limit, size)
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        def hash_one(i):
+            return i, hash_leaf(mm[i * chunk_size:min((i + 1) * chunk_size, limit)])
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return dict(pool.map(hash_one, indexes))
+
+
+def build_record(path, chunk_size=CHUNK_SIZE, workers=None):
+    """Manifest record for a file already on disk, hashing its chunks in parallel."""
+    size = os.path.getsize(path)
+    count = _chunk_count(size, chunk_size)
+    hashes = _hash_chunks(path, chunk_size, range(count), workers)
+    chunk_hashes = [hashes[i] for i in range(count)]
+
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(block)
+
+    return {
+        "size": size,
+        "sha256": sha256.hexdigest(),
+        "chunk_size": chunk_size,
+        "chunk_hashes": chunk_hashes,
+        "merkle_root": merkle_root(chunk_hashes),
+    }
+
+
+def append_record(case_path, file_path, record, source="extraction"):
+    """Appends one file's record to the case manifest; earlier records are never rewritten."""
+    entry = {
+        "file": os.path.relpath(file_path, case_path),
+        "recorded_at": datetime.now().isoformat(),
+        "source": source,
+        **record,
+    }
+    with open(os.path.join(case_path, MANIFEST_NAME), "a") as f:
+        f.write(json.dumps(entry) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    return entry
+
+
+def load_manifest(case_path):
+    path = os.path.join(case_path, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return []
+    with open(path, "r") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def latest_records(case_path):
+    """Most recent manifest record for every file."""
+    latest = {}
+    for entry in load_manifest(case_path):
+        latest[entry["file"]] = entry
+    return latest
+
+
+def chunks_for_ranges(ranges, chunk_size, size):
+    """Chunk indexes overlapping the given (start, end) byte ranges."""
+    count = _chunk_count(size, chunk_size)
+    indexes = set()
+    for start, end in ranges:
+        first = max(start // chunk_size, 0)
+        last = min((max(end, start + 1) - 1) // chunk_size, count - 1)
+        indexes.update(range(first, last + 1))
+    return sorted(indexes)
+
+
+def verify_file(case_path, record, ranges=None, workers=None):
+    """
+    Re-hashes a file against its manifest record.
+    With `ranges` only the chunks overlapping those byte ranges are read.
+    """
+    path = os.path.join(case_path, record["file"])
+    result = {"file": record["file"], "missing": False, "size_changed": False,
+              "root_valid": merkle_root(record["chunk_hashes"]) == record["merkle_root"],
+              "bad_chunks": [], "checked_chunks": 0}
+
+    if not os.path.exists(path):
+        result["missing"] = True
+        result["ok"] = False
+        return result
+
+    size = os.path.getsize(path)
+    chunk_size = record["chunk_size"]
+    if size != record["size"]:
+        result["size_changed"] = True
+
+    if ranges is None:
+        indexes = list(range(_chunk_count(record["size"], chunk_size)))
+    else:
+        indexes = chunks_for_ranges(ranges, chunk_size, record["size"])
+
+    # chunks past the current end of file can't match; bytes appended after hashing are not part of any chunk
+    readable = [i for i in indexes if i * chunk_size < size or (i == 0 and size == 0)]
+    hashes = _hash_chunks(path, chunk_size, readable, workers, limit=record["size"])
+    result["bad_chunks"] = [i for i in indexes if hashes.get(i) != record["chunk_hashes"][i]]
+    result["checked_chunks"] = len(indexes)
+    result["ok"] = result["root_valid"] and not result["size_changed"] and not result["bad_chunks"]
+    return result
+
+
+def verify_case(case_path, ranges=None, workers=None):
+    """
+    Verifies every file in the manifest, files in parallel and chunks in parallel within each file.
+    `ranges` optionally maps a manifest file name to the byte ranges to check; other files are checked in full.
+    """
+    records = latest_records(case_path)
+    workers = workers or os.cpu_count() or 1
+    file_workers = min(workers, max(len(records), 1))
+    chunk_workers = max(workers // file_workers, 1)
+    with ThreadPoolExecutor(max_workers=file_workers) as pool:
+        futures = [
+            pool.submit(verify_file, case_path, record, (ranges or {}).get(name), chunk_workers)
+            for name, record in records.items()
+        ]
+        return [f.result() for f in futures]
+
+
+def verify_ranges(case_path, file_name, ranges, workers=None):
+    """
+    Checks only the chunks of one manifest file that overlap `ranges` ((start, end) byte offsets),
+    for code that re-reads part of a large evidence file. None when the file is not in the manifest.
+    """
+    record = latest_records(case_path).get(file_name)
+    if record is None:
+        return None
+    return verify_file(case_path, record, ranges=ranges, workers=workers)
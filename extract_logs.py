@@ -4,9 +4,28 @@ import subprocess
 import platform
 import ctypes
 import os
+import re
+import time
 import hashlib
+import threading
 from datetime import datetime
 import json
+from evidence_manifest import MerkleBuilder, append_record, build_record
+
+# path to the adb binary, override with the ADB environment variable (e.g. a fake adb in tests)
+ADB = os.environ.get("ADB", "adb")
+
+# continuous capture layout inside a case folder
+CAPTURE_DIR_NAME = "live_capture"
+CAPTURE_CHECKPOINT_NAME = "capture_checkpoint.json"
+SEGMENT_PART_SUFFIX = ".part"
+# how often the open segment is flushed and the resume point checkpointed
+CAPTURE_FLUSH_SECONDS = 5
+LOGCAT_TIME_PATTERN = re.compile(rb"^(\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d+)")
+
+# same words the old `findstr /i` filters matched, any one of them selects the line
+ACTIVITY_PATTERN = re.compile(rb"ActivityManager|Start|proc|cmp=", re.IGNORECASE)
+DNS_PATTERN = re.compile(rb"Dns|resolv|Query|netd", re.IGNORECASE)
 
 def hide_file(path):
     system = platform.system()
@@ -19,17 +38,41 @@ def hide_file(path):
     return path
 
 def is_device_connected():
-    result = subprocess.run(["adb", "get-state"], capture_output=True, text=True)
+    result = subprocess.run([ADB, "get-state"], capture_output=True, text=True)
     return result.stdout.strip() == "device"
 
 
 def compute_sha256(file_path):
     sha256 = hashlib.sha256()
     with open(file_path, 'rb') as f:
-        for chunk in iter(lambda: f.read(4096), b""):
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
             sha256.update(chunk)
     return sha256.hexdigest()
 
+class HashingWriter:
+    """Binary file writer that keeps a running SHA-256 and Merkle chunk hashes of everything written."""
+
+    def __init__(self, path):
+        self.path = path
+        self.merkle = MerkleBuilder()
+        self.bytes_written = 0
+        self.record = None
+        self._file = open(path, "wb")
+
+    def write(self, data):
+        self._file.write(data)
+        self.merkle.update(data)
+        self.bytes_written += len(data)
+
+    def flush(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+        self.record = self.merkle.finish()
+        return self.record["sha256"]
+
 #  MAIN FUNCTION YOU'LL CALL FROM STREAMLIT
 def extract_from_phone(case_path: str):
     if not is_device_connected():
@@ -42,28 +85,223 @@ def extract_from_phone(case_path: str):
     activity_log = os.path.join(case_path, f"app_activity_logs_{file_suffix}")
     dns_log = os.path.join(case_path, f"dns_logs_{file_suffix}")
 
-    commands = {
-        "📄 Full logcat": f"adb logcat -v time -d > \"{full_log}\"",
-        "📲 App Activity": f"adb logcat -v time -d | findstr /i \"ActivityManager Start proc cmp=\" > \"{activity_log}\"",
-        "🌐 DNS logs": f"adb logcat -v time -d | findstr /i \"Dns resolv Query netd\" > \"{dns_log}\""
+    # One dump of the log buffer, split in-process so all three files come from the same snapshot
+    outputs = {
+        "full": HashingWriter(full_log),
+        "activity": HashingWriter(activity_log),
+        "dns": HashingWriter(dns_log),
     }
+    digests = {}
+    try:
+        proc = subprocess.Popen([ADB, "logcat", "-v", "time", "-d"], stdout=subprocess.PIPE)
+        for line in proc.stdout:
+            outputs["full"].write(line)
+            if ACTIVITY_PATTERN.search(line):
+                outputs["activity"].write(line)
+            if DNS_PATTERN.search(line):
+                outputs["dns"].write(line)
+        proc.stdout.close()
+        returncode = proc.wait()
+    finally:
+        for name, writer in outputs.items():
+            digests[name] = writer.close()
 
-    for desc, cmd in commands.items():
-        result = subprocess.run(cmd, shell=True)
-        if result.returncode != 0:
-            raise RuntimeError(f"Failed to extract: {desc}")
+    if returncode != 0:
+        raise RuntimeError(f"Failed to extract logcat (adb exited with {returncode})")
 
     hashes = {
         "timestamp": timestamp,
         "log_file_hashes": {
-            os.path.basename(full_log): compute_sha256(full_log),
-            os.path.basename(activity_log): compute_sha256(activity_log),
-            os.path.basename(dns_log): compute_sha256(dns_log)
+            os.path.basename(full_log): digests["full"],
+            os.path.basename(activity_log): digests["activity"],
+            os.path.basename(dns_log): digests["dns"]
         }
     }
 
-    hash_path = os.path.join(case_path, "hashes.json")
+    # per-extraction name so earlier hash files are kept
+    hash_path = os.path.join(case_path, f"hashes_{timestamp}.json")
     with open(hash_path, "w") as f:
         json.dump(hashes, f, indent=4)
 
     hide_file(hash_path)
+
+    for writer in outputs.values():
+        append_record(case_path, writer.path, writer.record, source="extraction")
+
+
+# ---------------------------------------------------------------- continuous capture
+
+def _load_checkpoint(capture_dir):
+    path = os.path.join(capture_dir, CAPTURE_CHECKPOINT_NAME)
+    if not os.path.exists(path):
+        return {"segments": [], "next_index": 0, "last_timestamp": None, "last_line_hashes": []}
+    with open(path, "r") as f:
+        return json.load(f)
+
+def _save_checkpoint(capture_dir, checkpoint):
+    path = os.path.join(capture_dir, CAPTURE_CHECKPOINT_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f, indent=4)
+    os.replace(tmp_path, path)
+
+def _open_segment(capture_dir, checkpoint):
+    index = checkpoint["next_index"]
+    # the index is reserved on disk before the file exists, so a crash can never hand it out twice
+    checkpoint["next_index"] = index + 1
+    _save_checkpoint(capture_dir, checkpoint)
+    started = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    name = f"capture_{index:05d}_{started}.txt"
+    # written as .part and renamed once closed, so readers only ever see finished segments
+    return name, HashingWriter(os.path.join(capture_dir, name + SEGMENT_PART_SUFFIX)), time.monotonic()
+
+def _resume_point(path):
+    """(last log time, hashes of the lines at that time) in a segment, to pick up exactly after it."""
+    last_timestamp, line_hashes = None, []
+    with open(path, "rb") as f:
+        for line in f:
+            ts_match = LOGCAT_TIME_PATTERN.match(line)
+            if not ts_match:
+                continue
+            ts = ts_match.group(1).decode()
+            if ts != last_timestamp:
+                last_timestamp, line_hashes = ts, []
+            line_hashes.append(hashlib.sha1(line).hexdigest())
+    return last_timestamp, line_hashes
+
+def _close_segment(capture_dir, checkpoint, name, writer):
+    digest = writer.close()
+    if writer.bytes_written == 0:
+        os.remove(writer.path)
+        return
+    os.replace(writer.path, os.path.join(capture_dir, name))
+    append_record(os.path.dirname(capture_dir), os.path.join(capture_dir, name), writer.record, source="capture")
+    checkpoint["segments"].append({
+        "file": name,
+        "sha256": digest,
+        "bytes": writer.bytes_written,
+        "closed_at": datetime.now().isoformat(),
+    })
+    _save_checkpoint(capture_dir, checkpoint)
+
+def capture_continuous(case_path, max_segment_bytes=64 * 1024 * 1024, max_segment_seconds=600,
+                       stop_event=None, reconnect_delay=5):
+    """
+    Streams `adb logcat` into rotating segment files under <case>/live_capture until `stop_event` is set.
+    A segment closes once it reaches `max_segment_bytes` or has been open `max_segment_seconds`
+    (checked as lines arrive); closed segments are hashed and listed in capture_checkpoint.json.
+    When the device drops off USB capture waits for it and resumes from the last checkpointed log time,
+    skipping lines already written.
+    """
+    stop_event = stop_event or threading.Event()
+    capture_dir = os.path.join(case_path, CAPTURE_DIR_NAME)
+    os.makedirs(capture_dir, exist_ok=True)
+    checkpoint = _load_checkpoint(capture_dir)
+
+    # a .part left by a crash holds lines past the checkpoint, keep it as a closed segment
+    for leftover in sorted(f for f in os.listdir(capture_dir) if f.endswith(SEGMENT_PART_SUFFIX)):
+        name = leftover[:-len(SEGMENT_PART_SUFFIX)]
+        if os.path.getsize(os.path.join(capture_dir, leftover)) == 0:
+            os.remove(os.path.join(capture_dir, leftover))
+            continue
+        os.replace(os.path.join(capture_dir, leftover), os.path.join(capture_dir, name))
+        # resume after the last line that reached disk, which can be later than the last checkpoint
+        last_timestamp, line_hashes = _resume_point(os.path.join(capture_dir, name))
+        if last_timestamp and last_timestamp >= (checkpoint["last_timestamp"] or ""):
+            if last_timestamp == checkpoint["last_timestamp"]:
+                line_hashes = list(dict.fromkeys(checkpoint["last_line_hashes"] + line_hashes))
+            checkpoint["last_timestamp"], checkpoint["last_line_hashes"] = last_timestamp, line_hashes
+        record = build_record(os.path.join(capture_dir, name))
+        append_record(case_path, os.path.join(capture_dir, name), record, source="capture-recovered")
+        checkpoint["segments"].append({
+            "file": name,
+            "sha256": record["sha256"],
+            "bytes": record["size"],
+            "closed_at": datetime.now().isoformat(),
+            "recovered": True,
+        })
+        _save_checkpoint(capture_dir, checkpoint)
+
+    # one thread for the whole capture unblocks the read loop of whichever logcat is running when asked to stop
+    running = {"proc": None}
+    finished = threading.Event()
+
+    def stop_running():
+        while not finished.is_set():
+            if stop_event.wait(0.5):
+                proc = running["proc"]
+                if proc is not None and proc.poll() is None:
+                    proc.terminate()
+                return
+
+    stopper = threading.Thread(target=stop_running, daemon=True)
+    stopper.start()
+    try:
+        while not stop_event.is_set():
+            _capture_session(capture_dir, checkpoint, running, stop_event, max_segment_bytes, max_segment_seconds,
+                             reconnect_delay)
+    finally:
+        finished.set()
+        stopper.join()
+
+    return checkpoint
+
+def _capture_session(capture_dir, checkpoint, running, stop_event, max_segment_bytes, max_segment_seconds,
+                     reconnect_delay):
+    """One logcat connection, from (re)connect until logcat ends or capture is stopped."""
+    if not is_device_connected():
+        stop_event.wait(reconnect_delay)
+        return
+
+    cmd = [ADB, "logcat", "-v", "time"]
+    if checkpoint["last_timestamp"]:
+        cmd += ["-T", checkpoint["last_timestamp"]]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE)
+    running["proc"] = proc
+    if stop_event.is_set():
+        proc.terminate()
+
+    resume_ts = checkpoint["last_timestamp"].encode() if checkpoint["last_timestamp"] else None
+    seen_at_resume = set(checkpoint["last_line_hashes"])
+    name, writer, opened = _open_segment(capture_dir, checkpoint)
+    flushed = time.monotonic()
+    try:
+        for line in proc.stdout:
+            ts_match = LOGCAT_TIME_PATTERN.match(line)
+            line_hash = hashlib.sha1(line).hexdigest()
+
+            if resume_ts is not None and ts_match:
+                ts = ts_match.group(1)
+                # -T replays from the checkpoint time, drop what was written before the disconnect
+                if ts < resume_ts or (ts == resume_ts and line_hash in seen_at_resume):
+                    continue
+                resume_ts = None
+
+            writer.write(line)
+            if ts_match:
+                ts = ts_match.group(1).decode()
+                if ts != checkpoint["last_timestamp"]:
+                    checkpoint["last_timestamp"] = ts
+                    checkpoint["last_line_hashes"] = []
+                checkpoint["last_line_hashes"].append(line_hash)
+
+            if time.monotonic() - flushed >= CAPTURE_FLUSH_SECONDS:
+                # lines reach disk before the resume point that covers them does
+                writer.flush()
+                _save_checkpoint(capture_dir, checkpoint)
+                flushed = time.monotonic()
+
+            if writer.bytes_written >= max_segment_bytes or time.monotonic() - opened >= max_segment_seconds:
+                _close_segment(capture_dir, checkpoint, name, writer)
+                name, writer, opened = _open_segment(capture_dir, checkpoint)
+    finally:
+        proc.stdout.close()
+        if proc.poll() is None:
+            proc.terminate()
+        proc.wait()
+        _close_segment(capture_dir, checkpoint, name, writer)
+        _save_checkpoint(capture_dir, checkpoint)
+
+    if not stop_event.is_set():
+        # logcat ended on its own, most likely a USB disconnect
+        stop_event.wait(reconnect_delay)
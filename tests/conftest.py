@@ -0,0 +1,7 @@
+import os
+import sys
+
+# the scripts import each other as top-level modules, as when run from these folders
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "android-leak-tool"))
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+# Stand-in for the adb binary, used by the extraction tests through the ADB environment variable.
+#   FAKE_ADB_STATE  what `adb get-state` prints (default "device")
+#   FAKE_ADB_LOG    logcat fixture; `logcat -d` dumps it, `logcat -T <time>` replays lines from that time on
+#   FAKE_ADB_EXIT   exit code of `logcat` (default 0)
+#   FAKE_ADB_HOLD   seconds a streaming logcat stays connected after the fixture (default 0)
+import os
+import sys
+import time
+
+args = sys.argv[1:]
+if args[:1] == ["get-state"]:
+    print(os.environ.get("FAKE_ADB_STATE", "device"))
+    sys.exit(0)
+
+if args[:1] == ["logcat"]:
+    since = args[args.index("-T") + 1].encode() if "-T" in args else None
+    with open(os.environ["FAKE_ADB_LOG"], "rb") as f:
+        for line in f:
+            if since is None or line[:len(since)] >= since:
+                sys.stdout.buffer.write(line)
+    sys.stdout.flush()
+    if "-d" not in args:
+        time.sleep(float(os.environ.get("FAKE_ADB_HOLD", "0")))
+    sys.exit(int(os.environ.get("FAKE_ADB_EXIT", "0")))
+
+sys.exit(1)
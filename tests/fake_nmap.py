@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# Stand-in for the nmap binary, used by the port scan tests through the NMAP override.
+#   FAKE_NMAP_HOSTS  JSON fixture {ip: {"status": "up"|"down", "ports": {port: [state, service, product, version]}}}
+#   FAKE_NMAP_LOG    every invocation's arguments are appended here as one JSON line
+#   FAKE_NMAP_DELAY  seconds per target host (default 0)
+# Understands -p, --open, -sV and -oX -; anything else is accepted and ignored.
+import json
+import os
+import sys
+import time
+from xml.sax.saxutils import quoteattr
+
+args = sys.argv[1:]
+if os.environ.get("FAKE_NMAP_LOG"):
+    with open(os.environ["FAKE_NMAP_LOG"], "a") as f:
+        f.write(json.dumps(args) + "\n")
+
+with open(os.environ["FAKE_NMAP_HOSTS"], "r") as f:
+    hosts = json.load(f)
+
+options_with_value = {"-p", "--host-timeout", "-oX", "-T"}
+targets, skip = [], False
+for i, arg in enumerate(args):
+    if skip:
+        skip = False
+    elif arg in options_with_value:
+        skip = True
+    elif not arg.startswith("-"):
+        targets.append(arg)
+
+ports = [int(p) for p in args[args.index("-p") + 1].split(",")] if "-p" in args else []
+only_open = "--open" in args
+versions = "-sV" in args
+
+out = ['<?xml version="1.0"?>', "<nmaprun>"]
+for ip in targets:
+    time.sleep(float(os.environ.get("FAKE_NMAP_DELAY", "0")))
+    host = hosts.get(ip, {"status": "down"})
+    if host["status"] != "up":
+        continue
+    out.append(f'<host><status state="up"/><address addr={quoteattr(ip)} addrtype="ipv4"/><ports>')
+    listed = 0
+    for port in ports:
+        state, service, product, version = host["ports"].get(str(port), ["closed", "", "", ""])
+        if state == "closed" or (only_open and state not in ("open", "open|filtered")):
+            continue
+        listed += 1
+        detail = f" product={quoteattr(product)} version={quoteattr(version)}" if versions and product else ""
+        out.append(f'<port protocol="tcp" portid="{port}"><state state={quoteattr(state)}/>'
+                   f'<service name={quoteattr(service)}{detail}/></port>')
+    if not only_open and len(ports) > listed:
+        out.append(f'<extraports state="closed" count="{len(ports) - listed}"/>')
+    out.append("</ports></host>")
+out.append("</nmaprun>")
+print("\n".join(out))
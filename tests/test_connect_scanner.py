@@ -0,0 +1,111 @@
+import socket
+import threading
+
+import pytest
+
+from model_func import connect_scanner
+from model_func.connect_scanner import connect_scan, parse_ports
+
+
+class Listener:
+    """Local TCP listener; `greeting` is sent on connect, `reply` after the client's first bytes."""
+
+    def __init__(self, greeting=b"", reply=b""):
+        self.greeting = greeting
+        self.reply = reply
+        self.sock = socket.socket()
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen()
+        self.port = self.sock.getsockname()[1]
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn):
+        with conn:
+            try:
+                if self.greeting:
+                    conn.sendall(self.greeting)
+                if self.reply and conn.recv(1024):
+                    conn.sendall(self.reply)
+                conn.recv(1024)
+            except OSError:
+                pass
+
+    def close(self):
+        self.sock.close()
+
+
+@pytest.fixture
+def listeners():
+    opened = []
+
+    def make(**kwargs):
+        listener = Listener(**kwargs)
+        opened.append(listener)
+        return listener
+
+    yield make
+    for listener in opened:
+        listener.close()
+
+
+def closed_port():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def test_parse_ports():
+    assert parse_ports("22, 80,8000-8002,22") == [22, 80, 8000, 8001, 8002]
+    assert parse_ports([443, 80, 443]) == [80, 443]
+
+
+def test_open_closed_and_banners(listeners, monkeypatch):
+    ssh = listeners(greeting=b"SSH-2.0-Stub_1.0\r\nmore\r\n")
+    http = listeners(reply=b"HTTP/1.0 200 OK\r\nServer: stub\r\n\r\n")
+    silent = listeners()
+    closed = closed_port()
+    monkeypatch.setattr(connect_scanner, "HTTP_PORTS", {http.port})
+    monkeypatch.setattr(connect_scanner, "BANNER_TIMEOUT", 0.2)
+
+    seen = []
+    results = connect_scan(["127.0.0.1"], ports=[ssh.port, http.port, silent.port, closed], timeout=1.0,
+                           on_result=lambda ip, records: seen.append(ip))
+
+    found = {r["port"]: r for r in results["127.0.0.1"]}
+    assert set(found) == {ssh.port, http.port, silent.port}
+    assert found[ssh.port]["banner"] == "SSH-2.0-Stub_1.0"
+    assert found[http.port]["banner"] == "HTTP/1.0 200 OK"
+    assert found[silent.port]["banner"] == ""
+    assert all(r["state"] == "open" for r in found.values())
+    assert seen == ["127.0.0.1"]
+
+
+def test_socket_cap(listeners, monkeypatch):
+    read_banner = connect_scanner._read_banner
+    in_flight = {"now": 0, "max": 0}
+
+    async def counting_read_banner(*args):
+        in_flight["now"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        try:
+            return await read_banner(*args)
+        finally:
+            in_flight["now"] -= 1
+
+    # silent services keep each connection open for the whole banner wait
+    monkeypatch.setattr(connect_scanner, "BANNER_TIMEOUT", 0.2)
+    monkeypatch.setattr(connect_scanner, "_read_banner", counting_read_banner)
+    ports = [listeners().port for _ in range(10)]
+    results = connect_scan(["127.0.0.1"], ports=ports, max_sockets=3)
+    assert len(results["127.0.0.1"]) == 10
+    assert in_flight["max"] == 3
@@ -0,0 +1,86 @@
+import socket
+import threading
+import time
+
+import pandas as pd
+
+from model_func.dns_resolver import resolve_domains, resolve_dataframe
+
+
+class StubResolver:
+    """lookup() stand-in: answers from a table, hangs on `hang`, raises gaierror for codes in `errors`."""
+
+    def __init__(self, answers=None, hang=(), errors=None, delay=0.0):
+        self.answers = answers or {}
+        self.hang = set(hang)
+        self.errors = errors or {}
+        self.delay = delay
+        self.calls = []
+        self.release = threading.Event()
+
+    def __call__(self, domain):
+        self.calls.append(domain)
+        if domain in self.hang:
+            self.release.wait(5)
+            return []
+        if domain in self.errors:
+            raise socket.gaierror(self.errors[domain], "stub error")
+        time.sleep(self.delay)
+        return self.answers.get(domain, [])
+
+
+def test_each_distinct_domain_is_looked_up_once():
+    stub = StubResolver({"a.com": ["1.1.1.1"], "b.com": ["2.2.2.2", "::2"]})
+    result = resolve_domains(["a.com", "b.com", "a.com", None, ""], lookup=stub)
+    assert result == {"a.com": ["1.1.1.1"], "b.com": ["2.2.2.2", "::2"]}
+    assert sorted(stub.calls) == ["a.com", "b.com"]
+
+
+def test_timeout_is_not_reported_as_nxdomain():
+    stub = StubResolver({"ok.com": ["1.1.1.1"]}, hang=["slow.com"], errors={"missing.com": socket.EAI_NONAME})
+    try:
+        result = resolve_domains(["ok.com", "slow.com", "missing.com"], lookup=stub, timeout=0.2)
+    finally:
+        stub.release.set()
+    assert result["ok.com"] == ["1.1.1.1"]
+    assert result["missing.com"] == []
+    assert result["slow.com"] is None
+
+
+def test_hung_lookups_do_not_time_out_queued_domains():
+    hung = [f"hang{i}.com" for i in range(4)]
+    fast = {f"fast{i}.com": [f"10.0.0.{i}"] for i in range(8)}
+    stub = StubResolver(fast, hang=hung, delay=0.05)
+    timer = threading.Timer(1.0, stub.release.set)
+    timer.start()
+    try:
+        result = resolve_domains(hung + list(fast), lookup=stub, concurrency=4, timeout=0.5)
+    finally:
+        timer.cancel()
+        stub.release.set()
+    assert all(result[d] is None for d in hung)
+    assert {d: result[d] for d in fast} == fast
+
+
+def test_resolve_dataframe_fills_first_and_all_ips():
+    stub = StubResolver({"a.com": ["1.1.1.1", "2.2.2.2"]}, errors={"b.com": socket.EAI_NONAME})
+    df = resolve_dataframe(pd.DataFrame({"domain": ["a.com", "b.com", "a.com"]}), lookup=stub)
+    assert df["ip"].tolist()[0::2] == ["1.1.1.1", "1.1.1.1"]
+    assert df["all_ips"].iloc[0] == "1.1.1.1;2.2.2.2"
+    assert pd.isna(df["ip"].iloc[1])
+
+
+def test_cache_keeps_nxdomain_but_not_timeouts(tmp_path):
+    from model_func.dns_resolver import open_dns_cache
+
+    cache = open_dns_cache(str(tmp_path))
+    stub = StubResolver({"ok.com": ["1.1.1.1"]}, hang=["slow.com"], errors={"missing.com": socket.EAI_NONAME})
+    try:
+        resolve_domains(["ok.com", "slow.com", "missing.com"], lookup=stub, timeout=0.2, cache=cache)
+    finally:
+        stub.release.set()
+
+    cached = cache.get_many(["ok.com", "slow.com", "missing.com"])
+    assert cached["ok.com"]["answers"] == ["1.1.1.1"]
+    assert cached["missing.com"]["answers"] == []
+    assert "slow.com" not in cached
@@ -0,0 +1,59 @@
+import time
+
+from model_func import enrich_cache
+from model_func.enrich_cache import EnrichmentCache
+from model_func.network_index import NetworkIndex
+
+
+def _whois(start, end, org):
+    return {"asn": "64500", "asn_description": org, "org_name": org, "cidr": None,
+            "start_address": start, "end_address": end, "created": None, "updated": None}
+
+
+def test_network_index_only_reads_networks_stored_since_last_call(tmp_path, monkeypatch):
+    cache = EnrichmentCache(str(tmp_path))
+    cache.put_whois({"10.0.0.1": _whois("10.0.0.0", "10.0.255.255", "FIRST")})
+    index = cache.network_index()
+    assert index.lookup("10.0.3.4")["org_name"] == "FIRST"
+
+    added = []
+    original = NetworkIndex.add_whois
+    monkeypatch.setattr(NetworkIndex, "add_whois", lambda self, rec: added.append(rec["org_name"]) or original(self, rec))
+    monkeypatch.setattr(enrich_cache, "NETWORK_RELOAD_MARGIN", 0)
+    time.sleep(0.01)
+    cache.put_whois({"10.1.0.1": _whois("10.1.0.0", "10.1.255.255", "SECOND")})
+
+    again = EnrichmentCache(str(tmp_path)).network_index()
+    assert again is index
+    assert added == ["SECOND"]
+    assert again.lookup("10.1.2.3")["org_name"] == "SECOND"
+    assert again.lookup("10.0.3.4")["org_name"] == "FIRST"
+
+
+def test_network_index_is_rebuilt_once_a_network_expires(tmp_path):
+    cache = EnrichmentCache(str(tmp_path))
+    cache.networks.put_many({"10.0.0.0-10.0.255.255": _whois("10.0.0.0", "10.0.255.255", "SHORT")}, ttl=0.05)
+    cache.networks.put_many({"10.1.0.0-10.1.255.255": _whois("10.1.0.0", "10.1.255.255", "LONG")})
+    assert cache.network_index().lookup("10.0.0.1")["org_name"] == "SHORT"
+
+    time.sleep(0.1)
+    index = cache.network_index()
+    assert index.lookup("10.0.0.1") is None
+    assert index.lookup("10.1.0.1")["org_name"] == "LONG"
+
+
+def test_networks_are_capped_and_compacted(tmp_path):
+    cache = EnrichmentCache(str(tmp_path), max_networks=2)
+    records = {f"10.{i}.0.1": _whois(f"10.{i}.0.0", f"10.{i}.255.255", f"NET{i}") for i in range(3)}
+    cache.put_whois(dict(list(records.items())[:2]))
+    time.sleep(0.01)
+    # reusing NET0 marks it as recently used, so NET1 is the one evicted
+    cache.put_whois({"10.0.9.9": records["10.0.0.1"]}, reused={"10.0.9.9"})
+    time.sleep(0.01)
+    cache.put_whois({"10.2.0.1": records["10.2.0.1"]})
+    assert sorted(rec["org_name"] for _, rec in cache.networks.items()) == ["NET0", "NET2"]
+
+    # a lower cap takes effect at the next compaction
+    smaller = EnrichmentCache(str(tmp_path), max_networks=1)
+    smaller.compact()
+    assert [rec["org_name"] for _, rec in smaller.networks.items()] == ["NET2"]
@@ -0,0 +1,111 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from model_func.enrich_engine import EnrichmentEngine, IP_API_BATCH_SIZE, empty_geo, empty_whois
+
+
+class StubProviders(BaseHTTPRequestHandler):
+    """ip-api /batch and RDAP /ip/<ip> stand-in; `fail` holds status codes to answer before succeeding."""
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body=None, headers=None):
+        payload = json.dumps(body).encode() if body is not None else b""
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        state = self.server.state
+        items = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        state["batches"].append(len(items))
+        if state["geo_fail"]:
+            return self._reply(state["geo_fail"].pop(0), headers={"X-Ttl": "0"})
+        self._reply(200, [{"status": "success", "query": item["query"], "lat": 1.5, "lon": 2.5, "countryCode": "NL"}
+                          for item in items])
+
+    def do_GET(self):
+        state = self.server.state
+        ip = self.path.rsplit("/", 1)[-1]
+        state["rdap"].append(ip)
+        if ip in state["rdap_down"]:
+            return self._reply(503)
+        self._reply(200, {
+            "name": "STUB-NET",
+            "startAddress": "10.0.0.0",
+            "endAddress": "10.0.255.255",
+            "cidr0_cidrs": [{"v4prefix": "10.0.0.0", "length": 16}],
+            "arin_originas0_originautnums": [64500],
+            "events": [{"eventAction": "registration", "eventDate": "2001-01-01"}],
+        })
+
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubProviders)
+    server.state = {"batches": [], "rdap": [], "geo_fail": [], "rdap_down": set()}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _engine(server, **kwargs):
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    return EnrichmentEngine(geo_url=url, rdap_url=url, geo_batch_per_min=6000, rdap_per_sec=1000,
+                            backoff=0.01, timeout=5, **kwargs)
+
+
+def test_geo_is_batched_and_whois_parsed(stub):
+    geo_ips = [f"10.0.{i // 256}.{i % 256}" for i in range(IP_API_BATCH_SIZE + 20)]
+    progress = []
+    geo, whois = _engine(stub).enrich(geo_ips, geo_ips[:3], progress=lambda done, total: progress.append(done))
+
+    assert sorted(stub.state["batches"]) == [20, IP_API_BATCH_SIZE]
+    assert geo[geo_ips[0]] == {"lat": 1.5, "lon": 2.5, "country": "NL"}
+    assert len(geo) == len(geo_ips)
+    assert whois[geo_ips[0]]["cidr"] == "10.0.0.0/16"
+    assert whois[geo_ips[0]]["asn"] == "64500"
+    assert whois[geo_ips[0]]["created"] == "2001-01-01"
+    assert progress[-1] == len(geo_ips) + 3
+
+
+def test_rate_limited_batch_is_retried(stub):
+    stub.state["geo_fail"] = [429, 503]
+    geo, _ = _engine(stub).enrich(["10.0.0.1"], [])
+    assert len(stub.state["batches"]) == 3
+    assert geo["10.0.0.1"]["country"] == "NL"
+
+
+def test_failures_fall_back_to_empty_records(stub):
+    stub.state["geo_fail"] = [500] * 10
+    stub.state["rdap_down"] = {"10.0.0.2"}
+    geo, whois = _engine(stub, retries=2).enrich(["10.0.0.1"], ["10.0.0.1", "10.0.0.2"])
+    assert geo["10.0.0.1"] == empty_geo()
+    assert whois["10.0.0.2"] == empty_whois()
+    assert stub.state["rdap"].count("10.0.0.2") == 3
+    assert whois["10.0.0.1"]["org_name"] == "STUB-NET"
+
+
+def test_networks_found_during_a_run_answer_later_lookups(stub):
+    from model_func.network_index import NetworkIndex
+
+    ips = [f"10.0.{i}.1" for i in range(31)]
+    reused = set()
+    engine = _engine(stub, workers=8)
+    _, whois = engine.enrich([], ips, network_index=NetworkIndex(), reused=reused)
+
+    # only the lookups already in flight before the first answer reach RDAP
+    assert len(stub.state["rdap"]) + len(reused) == len(ips)
+    assert len(stub.state["rdap"]) <= 8
+    assert engine.rdap_calls == len(stub.state["rdap"])
+    assert all(whois[ip]["cidr"] == "10.0.0.0/16" for ip in ips)
@@ -0,0 +1,39 @@
+import pandas as pd
+
+from model_func import enrich_func
+from model_func.enrich_engine import WHOIS_FIELDS
+
+
+class StubEngine:
+    """Engine stand-in answering every lookup with fixed records."""
+
+    rdap_calls = 0
+
+    def enrich(self, geo_ips, whois_ips, progress=None, network_index=None, reused=None):
+        geo = {ip: {"lat": 1.0, "lon": 2.0, "country": "NL"} for ip in geo_ips}
+        return geo, {ip: {k: None for k in WHOIS_FIELDS} for ip in whois_ips}
+
+
+def _run_case(tmp_path, name, ranked):
+    case = tmp_path / name
+    case.mkdir()
+    pd.DataFrame(ranked).to_csv(case / "ranked_suspicious_ips.csv", index=False)
+    return enrich_func.enrich_suspicious_ips(ranked["ip"], str(case), engine=StubEngine(), provider="online")
+
+
+def test_master_report_follows_the_latest_case(tmp_path, monkeypatch):
+    models = tmp_path / "models"
+    models.mkdir()
+    monkeypatch.setattr(enrich_func, "MODELS_DIR", str(models))
+
+    _run_case(tmp_path, "c1", {"ip": ["10.0.0.1", "10.0.0.2"], "timestamp": ["2024-01-01 10:00:00"] * 2,
+                               "risk_level": ["Low", "Low"], "suspicion_probability": [0.1, 0.2]})
+    # 10.0.0.1 is already enriched, c2 still updates its case and risk
+    new = _run_case(tmp_path, "c2", {"ip": ["10.0.0.1"], "timestamp": ["2024-02-01 10:00:00"],
+                                     "risk_level": ["High"], "suspicion_probability": [0.95]})
+    assert new == 0
+
+    report = enrich_func.load_master_report(str(models / enrich_func.MASTER_REPORT_NAME)).set_index("ip")
+    assert report.loc["10.0.0.1", ["case_name", "risk_level", "suspicion_probability"]].tolist() == ["c2", "High", 0.95]
+    assert report.loc["10.0.0.2", ["case_name", "risk_level"]].tolist() == ["c1", "Low"]
+    assert report.loc["10.0.0.1", "country"] == "NL"
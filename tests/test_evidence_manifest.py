@@ -0,0 +1,54 @@
+import pytest
+
+from evidence_manifest import append_record, build_record, verify_case, verify_ranges, chunks_for_ranges
+
+CHUNK = 16
+
+
+@pytest.fixture
+def case(tmp_path):
+    # 100 bytes in 16-byte chunks: 0-15, 16-31, ..., 96-99
+    evidence = tmp_path / "logcat.txt"
+    evidence.write_bytes(bytes(range(100)))
+    append_record(str(tmp_path), str(evidence), build_record(str(evidence), chunk_size=CHUNK))
+    return tmp_path
+
+
+def tamper(path, offset):
+    data = bytearray(path.read_bytes())
+    data[offset] ^= 0xFF
+    path.write_bytes(bytes(data))
+
+
+def test_chunks_for_ranges():
+    assert chunks_for_ranges([(0, 16)], CHUNK, 100) == [0]
+    assert chunks_for_ranges([(15, 17), (90, 500)], CHUNK, 100) == [0, 1, 5, 6]
+
+
+def test_tampering_inside_the_range_is_found(case):
+    tamper(case / "logcat.txt", 40)
+    result = verify_ranges(str(case), "logcat.txt", [(32, 64)])
+    assert not result["ok"]
+    assert result["bad_chunks"] == [2] and result["checked_chunks"] == 2
+
+
+def test_tampering_outside_the_range_is_not_read(case):
+    tamper(case / "logcat.txt", 80)
+    assert verify_ranges(str(case), "logcat.txt", [(0, 32)])["ok"]
+    # a full verification still finds it
+    [result] = verify_case(str(case))
+    assert result["bad_chunks"] == [5]
+
+
+def test_file_that_grew_after_hashing(case):
+    with open(case / "logcat.txt", "ab") as f:
+        f.write(b"appended later")
+    [result] = verify_case(str(case))
+    # the hashed bytes are intact, including the last partial chunk, but the file is not the recorded one
+    assert result["size_changed"] and result["bad_chunks"] == [] and not result["ok"]
+    spot = verify_ranges(str(case), "logcat.txt", [(90, 100)])
+    assert spot["size_changed"] and spot["bad_chunks"] == []
+
+
+def test_unknown_file(case):
+    assert verify_ranges(str(case), "other.txt", [(0, 10)]) is None
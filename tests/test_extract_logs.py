@@ -0,0 +1,162 @@
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+import extract_logs
+from evidence_manifest import load_manifest
+
+FAKE_ADB = os.path.join(os.path.dirname(__file__), "fake_adb.py")
+
+LOGCAT = (
+    b"06-01 10:00:00.100 I/ActivityManager( 100): Start proc com.example.app\n"
+    b"06-01 10:00:00.200 D/netd    ( 200): Dns query example.com\n"
+    b"06-01 10:00:01.000 I/chatty  ( 300): nothing interesting\n"
+    b"06-01 10:00:02.000 D/resolv  ( 200): Query tracker.test returned 1.2.3.4\n"
+)
+
+
+@pytest.fixture
+def fake_adb(tmp_path, monkeypatch):
+    if sys.platform == "win32":
+        pytest.skip("fake adb is a POSIX script")
+    log = tmp_path / "logcat.txt"
+    log.write_bytes(LOGCAT)
+    monkeypatch.setattr(extract_logs, "ADB", FAKE_ADB)
+    monkeypatch.setenv("FAKE_ADB_LOG", str(log))
+    return log
+
+
+def _case_files(case, prefix):
+    return [case / name for name in os.listdir(case) if name.startswith(prefix)]
+
+
+def test_single_pass_split_and_hashes(tmp_path, fake_adb):
+    case = tmp_path / "case"
+    case.mkdir()
+    extract_logs.extract_from_phone(str(case))
+
+    [full] = _case_files(case, "full_app_logs_")
+    [activity] = _case_files(case, "app_activity_logs_")
+    [dns] = _case_files(case, "dns_logs_")
+    assert full.read_bytes() == LOGCAT
+    assert activity.read_bytes().count(b"\n") == 1
+    assert dns.read_bytes().count(b"\n") == 2
+
+    [hash_file] = [p for p in case.iterdir() if "hashes_" in p.name]
+    hashes = json.loads(hash_file.read_text())["log_file_hashes"]
+    for path in (full, activity, dns):
+        assert hashes[path.name] == extract_logs.compute_sha256(str(path))
+
+    recorded = {entry["file"]: entry["sha256"] for entry in load_manifest(str(case))}
+    assert recorded == {path.name: hashes[path.name] for path in (full, activity, dns)}
+
+
+def test_no_device(tmp_path, fake_adb, monkeypatch):
+    monkeypatch.setenv("FAKE_ADB_STATE", "unauthorized")
+    with pytest.raises(RuntimeError, match="No Android device"):
+        extract_logs.extract_from_phone(str(tmp_path))
+
+
+def test_adb_failure_is_raised(tmp_path, fake_adb, monkeypatch):
+    monkeypatch.setenv("FAKE_ADB_EXIT", "1")
+    with pytest.raises(RuntimeError, match="adb exited with 1"):
+        extract_logs.extract_from_phone(str(tmp_path))
+
+
+def _captured_lines(case):
+    capture_dir = case / extract_logs.CAPTURE_DIR_NAME
+    lines = []
+    for name in sorted(os.listdir(capture_dir)):
+        if name.startswith("capture_") and name.endswith(".txt"):
+            lines += (capture_dir / name).read_bytes().splitlines(keepends=True)
+    return lines
+
+
+def _run_capture(case, stop_after, **kwargs):
+    stop = threading.Event()
+    threading.Timer(stop_after, stop.set).start()
+    return extract_logs.capture_continuous(str(case), stop_event=stop, reconnect_delay=0.1, **kwargs)
+
+
+def test_capture_reconnects_without_duplicating_lines(tmp_path, fake_adb):
+    # fake logcat ends after the fixture, as on a USB disconnect, and is replayed with -T on every reconnect
+    checkpoint = _run_capture(tmp_path, stop_after=1.0)
+    assert b"".join(_captured_lines(tmp_path)) == LOGCAT
+    names = [segment["file"] for segment in checkpoint["segments"]]
+    assert len(names) == len(set(names)) == 1
+
+
+CAPTURE_SCRIPT = """
+import sys
+sys.path[:0] = {paths!r}
+import extract_logs
+extract_logs.ADB = {adb!r}
+extract_logs.CAPTURE_FLUSH_SECONDS = 0
+extract_logs.capture_continuous({case!r}, reconnect_delay=0.1)
+"""
+
+
+def test_capture_resumes_after_kill(tmp_path, fake_adb, monkeypatch):
+    # logcat stays connected, the capture process is killed with the segment still open
+    monkeypatch.setenv("FAKE_ADB_HOLD", "30")
+    script = CAPTURE_SCRIPT.format(paths=sys.path, adb=FAKE_ADB, case=str(tmp_path))
+    proc = subprocess.Popen([sys.executable, "-c", script], start_new_session=True)
+    part_dir = tmp_path / extract_logs.CAPTURE_DIR_NAME
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        parts = list(part_dir.glob("*.part")) if part_dir.exists() else []
+        if parts and parts[0].read_bytes() == LOGCAT:
+            break
+        time.sleep(0.05)
+    # kill -9 the capture and its logcat together
+    os.killpg(proc.pid, signal.SIGKILL)
+    proc.wait()
+
+    monkeypatch.setenv("FAKE_ADB_HOLD", "0")
+    checkpoint = _run_capture(tmp_path, stop_after=1.0)
+    assert b"".join(_captured_lines(tmp_path)) == LOGCAT
+    assert checkpoint["segments"][0]["recovered"] is True
+    names = [segment["file"] for segment in checkpoint["segments"]]
+    assert len({name[:13] for name in names}) == len(names)
+
+
+def test_incremental_parse_reads_only_closed_unparsed_segments(tmp_path, fake_adb, monkeypatch):
+    from parsers.parse_log import parse_new_segments, load_segment_rows, PARSED_SEGMENTS_NAME
+
+    # logcat stays connected; the first three lines fill a segment, the fourth stays in the open .part
+    monkeypatch.setenv("FAKE_ADB_HOLD", "30")
+    monkeypatch.setattr(extract_logs, "CAPTURE_FLUSH_SECONDS", 0)
+    stop = threading.Event()
+    capture = threading.Thread(target=extract_logs.capture_continuous, args=(str(tmp_path),),
+                               kwargs={"stop_event": stop, "max_segment_bytes": 150, "reconnect_delay": 0.1})
+    capture.start()
+    capture_dir = tmp_path / extract_logs.CAPTURE_DIR_NAME
+    try:
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            parts = list(capture_dir.glob("*.part")) if capture_dir.exists() else []
+            if parts and parts[0].stat().st_size and list(capture_dir.glob("capture_*.txt")):
+                break
+            time.sleep(0.05)
+
+        [first] = parse_new_segments(str(capture_dir))
+        assert load_segment_rows(str(capture_dir))["timestamp"].tolist() == [
+            "06-01 10:00:00.100", "06-01 10:00:00.200", "06-01 10:00:01.000"
+        ]
+        # nothing closed since, nothing parsed again
+        assert parse_new_segments(str(capture_dir)) == []
+    finally:
+        stop.set()
+        capture.join(timeout=10)
+
+    [second] = parse_new_segments(str(capture_dir))
+    assert second > first
+    rows = load_segment_rows(str(capture_dir))
+    assert len(rows) == LOGCAT.count(b"\n") and rows["timestamp"].is_unique
+    assert json.loads((capture_dir / PARSED_SEGMENTS_NAME).read_text()) == [first, second]
@@ -0,0 +1,51 @@
+import logging
+
+import pandas as pd
+
+from model_func.features import build_features, FEATURES
+
+
+def log_frame():
+    return pd.DataFrame({
+        "timestamp": ["2024-01-06 03:10:00", "2024-01-08 14:00:00"],
+        "domain": ["cdn.example.com", "drop.example.tk"],
+        "ip": ["203.0.113.5", "198.51.100.7"],
+        "domain_count": [12, 3],
+        "ip_count": [9, 1],
+        "abuse_score": [87, 0],
+    })
+
+
+def test_counts_are_derived_from_the_log():
+    df = log_frame()
+    df = pd.concat([df, pd.DataFrame({"timestamp": ["2024-01-08 15:00:00"], "domain": ["cdn.example.com"],
+                                      "ip": ["198.51.100.7"], "abuse_score": [5]})], ignore_index=True)
+    df = build_features(df, home_country="IN")
+    assert set(FEATURES).issubset(df.columns)
+    # distinct domains per IP and distinct IPs per domain, whatever the stored columns held
+    assert list(df["domain_count"]) == [1, 2, 2]
+    assert list(df["ip_count"]) == [2, 1, 2]
+    # abuse_score has no local source, it stays on the 0-100 scale the scaler was fitted on
+    assert list(df["abuse_score"]) == [87, 0, 5]
+    assert list(df["flag_uncommon_tld"]) == [0, 1, 0]
+    assert list(df["flag_odd_hour"]) == [1, 0, 0]
+    assert list(df["is_weekend"]) == [1, 0, 0]
+
+
+def test_counts_are_kept_without_their_source_columns():
+    df = build_features(log_frame().drop(columns=["domain"]), home_country="IN")
+    assert list(df["domain_count"]) == [12, 3]
+    assert list(df["ip_count"]) == [9, 1]
+
+
+def test_foreign_ip_from_known_countries():
+    countries = {"203.0.113.5": "IN", "198.51.100.7": "RU"}
+    df = build_features(log_frame(), home_country="IN", countries=countries)
+    assert list(df["flag_foreign_ip"]) == [0, 1]
+
+
+def test_country_data_without_home_country_is_not_foreign(caplog):
+    with caplog.at_level(logging.WARNING, logger="model_func.features"):
+        df = build_features(log_frame(), home_country="", countries={"203.0.113.5": "US"})
+    assert list(df["flag_foreign_ip"]) == [0, 0]
+    assert "HOME_COUNTRY" in caplog.text
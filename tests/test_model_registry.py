@@ -0,0 +1,49 @@
+import os
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+from model_func import model_server
+from model_func.model_registry import save_version, activate_version, active_version, VERSIONS_DIR
+from model_func.model_server import get_model, predict_frame, MODEL_FILE, SCALER_FILE, FEATURE_LIST_FILE
+
+
+def train(features, suspicious_when):
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.random((40, len(features))), columns=features)
+    y = (X[suspicious_when] > 0.5).astype(int)
+    scaler = StandardScaler().fit(X)
+    return RandomForestClassifier(n_estimators=5, random_state=0).fit(scaler.transform(X), y), scaler
+
+
+def test_activation_swaps_the_whole_version_at_once(tmp_path):
+    model_server.clear_cache()
+    model_dir = str(tmp_path)
+    first = save_version(model_dir, *train(["a", "b"], "a"), ["a", "b"], "full")
+    second = save_version(model_dir, *train(["a", "b", "c"], "c"), ["a", "b", "c"], "full")
+
+    activate_version(model_dir, first)
+    assert get_model(model_dir).features == ["a", "b"]
+
+    activate_version(model_dir, second)
+    bundle = get_model(model_dir)
+    assert active_version(model_dir)["version"] == second
+    assert bundle.model_dir == os.path.join(model_dir, VERSIONS_DIR, second)
+    assert bundle.features == ["a", "b", "c"] and bundle.scaler.n_features_in_ == 3
+    # nothing is copied to the top level, the active-version file is the only thing that changes
+    assert not any(os.path.exists(os.path.join(model_dir, name)) for name in [MODEL_FILE, SCALER_FILE, FEATURE_LIST_FILE])
+
+    df = predict_frame(pd.DataFrame({"a": [0.1, 0.1], "b": [0.5, 0.5], "c": [0.9, 0.1]}), model_dir)
+    assert list(df["predicted_suspicious"]) == [1, 0]
+
+
+def test_version_numbers_skip_folders_left_without_metadata(tmp_path):
+    model_dir = str(tmp_path)
+    first = save_version(model_dir, *train(["a"], "a"), ["a"], "full")
+    # a run that crashed after creating its folder, before writing meta.json
+    os.makedirs(os.path.join(model_dir, VERSIONS_DIR, "v0002-full"))
+    second = save_version(model_dir, *train(["a"], "a"), ["a"], "full")
+    assert (first, second) == ("v0001-full", "v0003-full")
+    assert os.listdir(os.path.join(model_dir, VERSIONS_DIR, "v0002-full")) == []
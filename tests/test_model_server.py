@@ -0,0 +1,40 @@
+import json
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+from model_func import model_server
+from model_func.model_server import get_model, predict_frame, MODEL_FILE, SCALER_FILE, FEATURE_LIST_FILE
+
+
+def write_model(model_dir, features, suspicious_when):
+    """A tiny model over `features` that flags rows whose `suspicious_when` feature is high."""
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.random((40, len(features))), columns=features)
+    y = (X[suspicious_when] > 0.5).astype(int)
+    scaler = StandardScaler().fit(X)
+    model = RandomForestClassifier(n_estimators=5, random_state=0).fit(scaler.transform(X), y)
+    joblib.dump(model, os.path.join(model_dir, MODEL_FILE))
+    joblib.dump(scaler, os.path.join(model_dir, SCALER_FILE))
+    with open(os.path.join(model_dir, FEATURE_LIST_FILE), "w") as f:
+        json.dump(features, f)
+
+
+def test_prediction_uses_the_callers_bundle_across_a_swap(tmp_path):
+    model_server.clear_cache()
+    model_dir = str(tmp_path)
+    write_model(model_dir, ["a", "b"], "a")
+    bundle = get_model(model_dir)
+
+    # retrained with a different feature list between the caller's get_model and predict_frame
+    write_model(model_dir, ["a", "b", "c"], "c")
+    os.utime(os.path.join(model_dir, MODEL_FILE), ns=(1, 1))
+
+    df = predict_frame(pd.DataFrame({"a": [0.9, 0.1], "b": [0.5, 0.5]}), bundle=bundle)
+    assert "c" not in df.columns
+    assert list(df["predicted_suspicious"]) == [1, 0]
+    assert get_model(model_dir).features == ["a", "b", "c"]
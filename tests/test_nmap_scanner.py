@@ -0,0 +1,173 @@
+import json
+import os
+import socket
+import sqlite3
+import sys
+
+import pandas as pd
+import pytest
+
+from model_func import nmap_scanner
+from model_func.nmap_scanner import (
+    parse_nmap_xml, scan_hosts, two_phase_scan, scan_ips_from_file, open_scan_cache, scan_cache_key,
+    DEFAULT_SCAN_ARGS, SCAN_CACHE_TTL, SCAN_EMPTY_TTL
+)
+
+FAKE_NMAP = os.path.join(os.path.dirname(__file__), "fake_nmap.py")
+
+HOSTS = {
+    "10.0.0.1": {"status": "up", "ports": {
+        "22": ["open", "ssh", "OpenSSH", "8.9"],
+        "80": ["open", "http", "nginx", "1.25"],
+        "3389": ["filtered", "ms-wbt-server", "", ""],
+    }},
+    "10.0.0.2": {"status": "up", "ports": {
+        "3389": ["open|filtered", "ms-wbt-server", "", ""],
+        "445": ["filtered", "microsoft-ds", "", ""],
+    }},
+    "10.0.0.3": {"status": "down"},
+}
+
+
+@pytest.fixture
+def fake_nmap(tmp_path, monkeypatch):
+    if sys.platform == "win32":
+        pytest.skip("fake nmap is a POSIX script")
+    hosts = tmp_path / "hosts.json"
+    hosts.write_text(json.dumps(HOSTS))
+    log = tmp_path / "nmap_calls.jsonl"
+    monkeypatch.setattr(nmap_scanner, "NMAP", FAKE_NMAP)
+    monkeypatch.setenv("FAKE_NMAP_HOSTS", str(hosts))
+    monkeypatch.setenv("FAKE_NMAP_LOG", str(log))
+    return log
+
+
+def nmap_calls(log):
+    return [json.loads(line) for line in log.read_text().splitlines()] if log.exists() else []
+
+
+def by_port(records):
+    return {r["port"]: r for r in records}
+
+
+def test_parse_xml_versions_and_scripts():
+    xml_text = """<?xml version="1.0"?><nmaprun>
+      <host><status state="up"/><address addr="192.0.2.7" addrtype="ipv4"/><ports>
+        <port protocol="tcp" portid="443"><state state="open"/>
+          <service name="https" product="Apache httpd" version="2.4.58" extrainfo="Ubuntu"/>
+          <script id="ssl-cert" output="Subject: commonName=example.test&#10;  Issuer: x"/></port>
+        <port protocol="tcp" portid="25"><state state="closed"/><service name="smtp"/></port>
+      </ports></host>
+      <host><status state="up"/><address addr="192.0.2.8" addrtype="ipv4"/></host>
+    </nmaprun>"""
+    parsed = parse_nmap_xml(xml_text)
+    assert parsed["192.0.2.8"] == []
+    [record] = parsed["192.0.2.7"]
+    assert record["port"] == 443
+    assert record["banner"] == "Apache httpd 2.4.58 (Ubuntu)"
+    assert record["scripts"] == "ssl-cert: Subject: commonName=example.test Issuer: x"
+    assert parse_nmap_xml("") == {}
+
+
+def test_open_filtered_and_down_hosts(fake_nmap):
+    results = scan_hosts(list(HOSTS), ports="22,80,445,3389", batch_size=2, fallback=False)
+
+    first = by_port(results["10.0.0.1"])
+    assert set(first) == {22, 80}
+    assert first[22]["banner"] == "OpenSSH 8.9"
+    assert (first[22]["risk_level"], first[22]["tag"]) == ("high", "suspicious")
+
+    # open|filtered is listed but not rated, plain filtered is not reported
+    [unconfirmed] = results["10.0.0.2"]
+    assert (unconfirmed["port"], unconfirmed["state"]) == (3389, "open|filtered")
+    assert (unconfirmed["risk_level"], unconfirmed["tag"]) == ("info", "normal")
+
+    # a down host is absent from the XML and comes back with no records
+    assert results["10.0.0.3"] == []
+    calls = nmap_calls(fake_nmap)
+    assert len(calls) == 2
+    assert all("-oX" in call for call in calls)
+
+
+def test_two_phase_versions_every_group_in_shared_batches(tmp_path, fake_nmap, monkeypatch):
+    # six hosts with six different open-port sets, each version run sleeps per host
+    services = {22: "ssh", 80: "http", 443: "https", 3389: "ms-wbt-server", 445: "microsoft-ds", 8080: "http-proxy"}
+    hosts = {f"10.0.1.{i}": {"status": "up", "ports": {str(port): ["open", name, "svc", str(i)]}}
+             for i, (port, name) in enumerate(services.items(), start=1)}
+    (tmp_path / "hosts.json").write_text(json.dumps(hosts))
+    monkeypatch.setenv("FAKE_NMAP_DELAY", "0.3")
+
+    seen, timings = {}, {}
+    results = two_phase_scan(list(hosts), ports=",".join(map(str, services)), workers=2, batch_size=3,
+                             on_result=lambda ip, records: seen.update({ip: records}), timings=timings)
+
+    version_runs = [args for args in nmap_calls(fake_nmap) if "-sV" in args]
+    assert len(version_runs) == timings["version_runs"] == 2
+    # the two batches ran side by side, not one after the other
+    assert timings["version_seconds"] < 1.6
+    for (ip, host), port in zip(hosts.items(), services):
+        # every host is versioned on its own port only, even though its batch probed the union
+        [record] = results[ip]
+        assert (record["port"], record["banner"]) == (port, f"svc {host['ports'][str(port)][3]}")
+    assert seen == results
+
+
+def test_scan_file_writes_csv(tmp_path, fake_nmap):
+    ips = tmp_path / "ips.csv"
+    pd.DataFrame({"ip": list(HOSTS)}).to_csv(ips, index=False)
+    df, message = scan_ips_from_file(str(ips), str(tmp_path / "out" / "port_scan.csv"), ports="22,80,445,3389")
+    assert df[["ip", "port"]].values.tolist() == [["10.0.0.1", 22], ["10.0.0.1", 80], ["10.0.0.2", 3389]]
+    assert pd.read_csv(tmp_path / "out" / "port_scan.csv")["port"].tolist() == [22, 80, 3389]
+    assert "3 scanned" in message
+
+
+def _expiry_seconds(cache, key):
+    with sqlite3.connect(cache.db_path) as conn:
+        stored_at, expires_at = conn.execute(
+            f"SELECT stored_at, expires_at FROM {cache.table} WHERE key = ?", (key,)).fetchone()
+    return expires_at - stored_at
+
+
+def test_cache_skips_rescans_and_expires_empty_results_sooner(tmp_path, fake_nmap):
+    ips = tmp_path / "ips.csv"
+    pd.DataFrame({"ip": list(HOSTS)}).to_csv(ips, index=False)
+    cache = open_scan_cache(str(tmp_path))
+    ports = "22,80,445,3389"
+
+    scan_ips_from_file(str(ips), str(tmp_path / "a.csv"), cache=cache, ports=ports)
+    calls = len(nmap_calls(fake_nmap))
+    df, message = scan_ips_from_file(str(ips), str(tmp_path / "b.csv"), cache=cache, ports=ports)
+    assert len(nmap_calls(fake_nmap)) == calls
+    assert "3 from cache" in message
+    assert len(df) == 3
+
+    profile = f"full {' '.join(DEFAULT_SCAN_ARGS)}"
+    assert _expiry_seconds(cache, scan_cache_key("10.0.0.1", ports, profile)) == pytest.approx(SCAN_CACHE_TTL)
+    assert _expiry_seconds(cache, scan_cache_key("10.0.0.3", ports, profile)) == pytest.approx(SCAN_EMPTY_TTL)
+
+
+def test_connect_fallback_results_do_not_replace_nmap(tmp_path, fake_nmap, monkeypatch):
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen()
+    port = str(listener.getsockname()[1])
+    ips = tmp_path / "ips.csv"
+    pd.DataFrame({"ip": ["127.0.0.1"]}).to_csv(ips, index=False)
+    cache = open_scan_cache(str(tmp_path))
+
+    try:
+        monkeypatch.setattr(nmap_scanner, "NMAP", str(tmp_path / "no-nmap"))
+        df, _ = scan_ips_from_file(str(ips), str(tmp_path / "a.csv"), cache=cache, ports=port)
+        assert df["port"].tolist() == [int(port)]
+        # still without nmap, the connect result is reused
+        _, message = scan_ips_from_file(str(ips), str(tmp_path / "b.csv"), cache=cache, ports=port)
+        assert "1 from cache" in message
+
+        # once nmap is back the host is scanned with it
+        monkeypatch.setattr(nmap_scanner, "NMAP", FAKE_NMAP)
+        stats = {}
+        scan_ips_from_file(str(ips), str(tmp_path / "c.csv"), cache=cache, ports=port, stats=stats)
+        assert (stats["scanned"], stats["from_cache"]) == (1, 0)
+        assert len(nmap_calls(fake_nmap)) == 1
+    finally:
+        listener.close()
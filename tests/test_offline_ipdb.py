@@ -0,0 +1,92 @@
+import pandas as pd
+import pytest
+
+from model_func import enrich_func
+from model_func.enrich_cache import EnrichmentCache
+from model_func.enrich_engine import empty_geo
+from model_func.offline_ipdb import build_offline_db, OfflineIPDB, OFFLINE_DB_DIR
+
+ASN_DUMP = """start_ip,end_ip,asn,asn_description
+10.0.0.0,10.255.255.255,1,WIDE
+10.1.0.0,10.1.0.255,2,NESTED
+10.1.0.0,10.1.0.15,3,DEEPER
+10.5.0.0,10.5.0.255,4,SIBLING
+2001:db8::,2001:db8:ffff:ffff:ffff:ffff:ffff:ffff,5,V6WIDE
+2001:db8:1::,2001:db8:1::ff,6,V6NESTED
+"""
+
+
+def _build(tmp_path, asn=ASN_DUMP, geo=None):
+    (tmp_path / "asn.csv").write_text(asn)
+    if geo:
+        (tmp_path / "geo.csv").write_text(geo)
+    out = tmp_path / OFFLINE_DB_DIR
+    build_offline_db(str(out), asn_csv=str(tmp_path / "asn.csv"), geo_csv=str(tmp_path / "geo.csv") if geo else None)
+    return OfflineIPDB(str(out))
+
+
+def test_most_specific_nested_range_answers(tmp_path):
+    db = _build(tmp_path)
+    ips = ["10.1.0.5", "10.1.0.100", "10.1.1.1", "10.5.0.1", "10.6.0.0", "11.0.0.0", "2001:db8:1::1", "2001:db8:2::1"]
+    found = db.lookup_frame(ips)["asn_description"].tolist()
+    assert found[:5] == ["DEEPER", "NESTED", "WIDE", "SIBLING", "WIDE"]
+    assert pd.isna(found[5])
+    assert found[6:] == ["V6NESTED", "V6WIDE"]
+
+
+def test_partially_overlapping_ranges_are_rejected(tmp_path):
+    with pytest.raises(ValueError, match="overlap"):
+        _build(tmp_path, asn="start_ip,end_ip,asn\n10.0.0.0,10.0.0.100,1\n10.0.0.50,10.0.0.200,2\n")
+
+
+class OnlineStub:
+    """Engine stand-in: WHOIS answers, GeoIP fails (empty record), as when ip-api is down."""
+
+    rdap_calls = 0
+
+    def enrich(self, geo_ips, whois_ips, progress=None, network_index=None, reused=None):
+        self.rdap_calls += len(whois_ips)
+        whois = {ip: {"asn": "64500", "asn_description": "ONLINE", "org_name": "ONLINE", "cidr": None,
+                      "start_address": None, "end_address": None, "created": None, "updated": None}
+                 for ip in whois_ips}
+        return {ip: empty_geo() for ip in geo_ips}, whois
+
+
+def test_auto_mode_caches_the_provider_that_answered_online(tmp_path, monkeypatch):
+    models = tmp_path / "models"
+    case = tmp_path / "case"
+    models.mkdir()
+    case.mkdir()
+    _build(models, geo="network,country,lat,lon\n10.0.0.0/8,NL,52.0,5.0\n")
+    monkeypatch.setattr(enrich_func, "MODELS_DIR", str(models))
+    pd.DataFrame({"ip": ["10.1.2.3"], "timestamp": ["2024-01-01 10:00:00"], "risk_level": ["high"],
+                  "suspicion_probability": [0.9]}).to_csv(case / "ranked_suspicious_ips.csv", index=False)
+
+    stats = {}
+    enrich_func.enrich_suspicious_ips(["10.1.2.3"], str(case), engine=OnlineStub(), stats=stats, provider="auto")
+
+    row = pd.read_csv(case / "suspicious_ip_geo_whois.csv").iloc[0]
+    assert row["country"] == "NL"
+    assert row["asn_description"] == "ONLINE"
+    cache = EnrichmentCache(str(models))
+    # the offline geo answer is not cached, the online WHOIS answer is
+    assert cache.geo.get_many(["10.1.2.3"]) == {}
+    assert cache.whois.get_many(["10.1.2.3"])["10.1.2.3"]["asn_description"] == "ONLINE"
+    assert stats["offline_answers"] == 1
+    assert stats["whois_rdap_calls"] == 1
+
+
+def test_offline_mode_makes_no_rdap_calls(tmp_path, monkeypatch):
+    models = tmp_path / "models"
+    case = tmp_path / "case"
+    models.mkdir()
+    case.mkdir()
+    _build(models)
+    monkeypatch.setattr(enrich_func, "MODELS_DIR", str(models))
+    pd.DataFrame({"ip": ["10.1.2.3", "10.5.0.1"], "timestamp": ["2024-01-01 10:00:00"] * 2}).to_csv(
+        case / "ranked_suspicious_ips.csv", index=False)
+
+    stats = {}
+    enrich_func.enrich_suspicious_ips(["10.1.2.3", "10.5.0.1"], str(case), stats=stats, provider="offline")
+    assert stats["whois_needed"] == 2
+    assert stats["whois_rdap_calls"] == 0
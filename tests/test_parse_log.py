@@ -0,0 +1,47 @@
+import pandas as pd
+import pytest
+
+from parsers import parse_log
+from parsers.parse_log import parse_log_file, parse_log_file_parallel
+
+
+def write_log(path):
+    lines = []
+    for i in range(400):
+        stamp = f"01-02 03:04:{i % 60:02d}.{i:03d}"
+        if i % 7 == 0:
+            # Windows line ending
+            lines.append(f"{stamp} D/Net( {1000 + i}): lookup api{i}.example.com\r\n")
+        elif i % 11 == 0:
+            # multi-byte characters, some right where a shard may be cut
+            lines.append(f"{stamp} I/Ünïcødé( {1000 + i}): café ☕ résumé{i}.exämple.org ok\n")
+        elif i % 13 == 0:
+            lines.append(f"garbage line {i} without a logcat header\n")
+        elif i % 17 == 0:
+            # invalid UTF-8 is dropped by both readers
+            lines.append(f"{stamp} W/Bad( {1000 + i}): \udcff raw bytes\n")
+        else:
+            lines.append(f"{stamp} E/App( {1000 + i}): com.example.Thing.call(arg) host{i}.example.net\n")
+    data = "".join(lines).encode("utf-8", errors="surrogateescape")
+    path.write_bytes(data + b"01-02 03:05:00.999 D/Tail( 42): last line without newline")
+    return str(path)
+
+
+@pytest.mark.parametrize("workers", [2, 3, 4, 7])
+def test_parallel_parse_matches_serial(tmp_path, monkeypatch, workers):
+    log_path = write_log(tmp_path / "logcat.txt")
+    serial = parse_log_file(log_path)
+    assert len(serial) > 300
+
+    # small enough that the sharded path runs; shards end mid-file at many line boundaries
+    monkeypatch.setattr(parse_log, "PARALLEL_MIN_BYTES", 1)
+    assert len(parse_log._split_byte_ranges(log_path, workers * 4)) > 1
+    parallel = parse_log_file(log_path, workers=workers)
+    pd.testing.assert_frame_equal(parallel, serial)
+    pd.testing.assert_frame_equal(parse_log_file_parallel(log_path, workers=workers), serial)
+
+
+def test_parallel_parse_of_an_empty_file(tmp_path):
+    log_path = tmp_path / "empty.txt"
+    log_path.write_bytes(b"")
+    assert parse_log_file_parallel(str(log_path), workers=2).empty
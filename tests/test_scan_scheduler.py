@@ -0,0 +1,39 @@
+import pandas as pd
+
+from model_func.scan_scheduler import scheduled_scan
+from test_nmap_scanner import fake_nmap, nmap_calls, HOSTS  # noqa: F401  (fixture)
+
+
+def write_targets(tmp_path, ips):
+    path = tmp_path / "ips.csv"
+    pd.DataFrame({"ip": ips}).to_csv(path, index=False)
+    return str(path)
+
+
+def test_batches_cut_by_the_deadline_are_budget_not_failed(tmp_path, fake_nmap, monkeypatch):
+    # every host takes longer than the whole budget
+    monkeypatch.setenv("FAKE_NMAP_DELAY", "3")
+    output_csv = tmp_path / "case" / "port_scan.csv"
+    stats = {}
+    scheduled_scan(write_targets(tmp_path, ["10.0.0.1", "10.0.0.2"]), str(output_csv),
+                   budget_seconds=1, workers=1, batch_size=1, stats=stats)
+
+    unscanned = pd.read_csv(tmp_path / "case" / "port_scan_unscanned.csv")
+    assert set(unscanned["ip"]) == {"10.0.0.1", "10.0.0.2"}
+    assert set(unscanned["reason"]) == {"budget"}
+    assert stats["failed"] == 0
+
+
+def test_budgeted_scan_uses_the_selected_profile(tmp_path, fake_nmap):
+    output_csv = tmp_path / "case" / "port_scan.csv"
+    stats = {}
+    df, _ = scheduled_scan(write_targets(tmp_path, list(HOSTS)), str(output_csv), ports="22,80,445,3389",
+                           workers=2, batch_size=3, profile="two-phase", stats=stats)
+
+    calls = nmap_calls(fake_nmap)
+    # one open-port sweep, then version detection only on the host with confirmed open ports
+    assert [args for args in calls if "--open" in args]
+    [version_run] = [args for args in calls if "-sV" in args]
+    assert version_run[-1] == "10.0.0.1" and version_run[version_run.index("-p") + 1] == "22,80"
+    assert stats["scan_profile"] == "two-phase"
+    assert set(df.loc[df["ip"] == "10.0.0.1", "port"]) == {22, 80}
@@ -0,0 +1,58 @@
+import json
+import os
+
+import pandas as pd
+
+from model_func import training_store
+from model_func.features import FEATURES
+from model_func.training_store import (
+    append_case, migrate_csv, read_training_data, partition_rows, LABEL_COLUMN, LEGACY_CASE_ID, INDEX_NAME
+)
+
+
+def feature_frame(rows, start=0):
+    df = pd.DataFrame({feat: range(start, start + rows) for feat in FEATURES})
+    df[LABEL_COLUMN] = [i % 2 for i in range(rows)]
+    return df
+
+
+def test_case_ids_sharing_a_partition_share_one_index_entry(tmp_path):
+    store = str(tmp_path)
+    assert append_case(store, "case 1", feature_frame(3)) == 3
+    assert append_case(store, "case_1", feature_frame(5)) == 2
+
+    assert partition_rows(store) == {"case_1": 5}
+    # the rows are counted once, not once per spelling of the case id
+    assert len(read_training_data(store)) == 5
+    assert len(read_training_data(store, cases=["case 1"])) == 5
+    assert len(read_training_data(store, since_rows={"case 1": 3})) == 2
+
+
+def test_old_unsanitized_index_entries_are_merged(tmp_path):
+    store = str(tmp_path)
+    append_case(store, "case_1", feature_frame(5))
+    with open(tmp_path / INDEX_NAME) as f:
+        index = json.load(f)
+    # an index written before keys were sanitized, with a stale entry for the same partition
+    index["partitions"]["case 1"] = {**index["partitions"]["case_1"], "rows": 3, "revision": 0}
+    with open(tmp_path / INDEX_NAME, "w") as f:
+        json.dump(index, f)
+
+    assert partition_rows(store) == {"case_1": 5}
+    assert len(read_training_data(store)) == 5
+
+
+def test_migrate_csv_writes_the_partition_once(tmp_path, monkeypatch):
+    csv_path = tmp_path / "global_training_data.csv"
+    # two chunks sharing rows
+    pd.concat([feature_frame(4), feature_frame(4, start=2)]).to_csv(csv_path, index=False)
+    writes = []
+    write_partition = training_store._write_partition
+    monkeypatch.setattr(training_store, "_write_partition",
+                        lambda *args: writes.append(args[1]) or write_partition(*args))
+
+    store = str(tmp_path / "store")
+    assert migrate_csv(store, str(csv_path), chunksize=4) == 6
+    assert writes == [LEGACY_CASE_ID]
+    assert partition_rows(store) == {LEGACY_CASE_ID: 6}
+    assert os.path.exists(str(csv_path) + ".migrated")